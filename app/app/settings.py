@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.1/ref/settings/
 """
 
 import os
+from importlib.util import find_spec
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -37,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'core',
@@ -89,6 +91,26 @@ DATABASES = {
 }
 
 
+# Password hashing, stored hashes with another iteration count are
+# rehashed at the next successful login
+
+PASSWORD_HASHERS = [
+    'core.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+PASSWORD_HASHER_ITERATIONS = int(
+    os.environ.get('PASSWORD_HASHER_ITERATIONS', 120000))
+
+# hash passwords in a pool of WORKERS processes instead of the request
+# thread, 0 disables it. Past MAX_PENDING queued hashes requests get a 503
+PASSWORD_HASHING_POOL = {
+    'WORKERS': int(os.environ.get('PASSWORD_HASHING_WORKERS', 0)),
+    'MAX_PENDING': int(os.environ.get('PASSWORD_HASHING_MAX_PENDING', 32)),
+    'TIMEOUT': 10,
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -129,6 +151,70 @@ STATIC_URL = '/static/'
 STATIC_ROOT = '/vol/web/static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/vol/web/media'
+# core.views.serve_media streams media from django unless MEDIA_SENDFILE
+# hands the body to the proxy: 'x-accel-redirect' for nginx with an
+# internal location at MEDIA_ACCEL_REDIRECT_PREFIX aliasing MEDIA_ROOT, or
+# 'x-sendfile' for apache and lighttpd
+MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE') or None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+# uploads are stored once per content, see core.storage
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
 # default custom user model always before migrations
 AUTH_USER_MODEL = 'core.User'
 APPEND_SLASH = False
+
+# json goes through orjson when it is installed, clients sending
+# Accept: application/msgpack get msgpack when msgpack is installed
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+if find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append(
+        'core.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].append(
+        'core.renderers.MessagePackParser')
+
+# pagination of the recipe api list endpoints when the request does not pick
+# a mode: None (unpaginated), 'keyset' or 'limit_offset'
+RECIPE_API_DEFAULT_PAGINATION = os.environ.get('RECIPE_API_DEFAULT_PAGINATION')
+
+# serialise the list endpoints with the compiled read path of
+# recipe.fastpath instead of the DRF serialisers
+RECIPE_API_FAST_SERIALIZERS = True
+
+# serve recipe lists and details from the denormalised tag and ingredient
+# summaries of recipe.summary instead of the relation tables
+RECIPE_API_SUMMARIES = False
+
+# per user cache of the tag and ingredient listings, the local backend is per
+# process, use core.cache.SharedCache (OPTIONS: alias, timeout) to share it
+# between workers through a django cache alias. Api writes reach every worker
+# through the version counters, orm writes reach other workers once the
+# entries time out
+RECIPE_LIST_CACHE = {
+    'BACKEND': 'core.cache.LocalLRUCache',
+    'OPTIONS': {'max_bytes': 64 * 1024 * 1024, 'timeout': 300},
+}
+
+# token -> user cache of the api authentication, entries live for TIMEOUT
+# seconds. The local backend is per process so a deactivation reaches other
+# workers once their entry expires, core.cache.SharedCache invalidates all
+TOKEN_AUTH_CACHE = {
+    'BACKEND': 'core.cache.LocalLRUCache',
+    'OPTIONS': {'max_bytes': 16 * 1024 * 1024},
+    'TIMEOUT': 60,
+}
+
+# threads rendering the recipe image variants after an upload, with 0 the
+# upload request renders them inline. WEBP falls back to JPEG when pillow
+# lacks webp support
+RECIPE_IMAGE_WORKERS = int(os.environ.get('RECIPE_IMAGE_WORKERS', 2))
+RECIPE_IMAGE_FORMAT = os.environ.get('RECIPE_IMAGE_FORMAT', 'WEBP')
@@ -0,0 +1,112 @@
+"""cache backends shared by the api caches"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+
+
+class LocalLRUCache:
+    """in process cache evicting the least recently used entries
+
+    Entries are bounded by their total size as reported to `set` and, with
+    a timeout, expire that many seconds after being set. The cache is local
+    to the worker process.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, timeout=None):
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if not self._live(key):
+                return default
+            self._data.move_to_end(key)
+            return self._data[key][0]
+
+    def set(self, key, value, size=1):
+        with self._lock:
+            self._set(key, value, size)
+
+    def add(self, key, value, size=1):
+        """set the key unless it is present, return the stored value"""
+        with self._lock:
+            if self._live(key):
+                self._data.move_to_end(key)
+                return self._data[key][0]
+            self._set(key, value, size)
+            return value
+
+    def delete(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def _set(self, key, value, size):
+        self._pop(key)
+        if size > self.max_bytes:
+            return
+        expires = (time.monotonic() + self.timeout
+                   if self.timeout is not None else None)
+        self._data[key] = (value, size, expires)
+        self.size += size
+        while self.size > self.max_bytes:
+            self._pop(next(iter(self._data)))
+
+    def _live(self, key):
+        """whether the key is stored and unexpired, expired keys are dropped
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return False
+        if entry[2] is not None and entry[2] <= time.monotonic():
+            self._pop(key)
+            return False
+        return True
+
+    def _pop(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SharedCache:
+    """cache stored in a django cache alias, shared by every worker"""
+
+    def __init__(self, alias='default', timeout=300, key_prefix=''):
+        self.alias = alias
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key, default=None):
+        return self.cache.get(self.key_prefix + key, default)
+
+    def set(self, key, value, size=1):
+        self.cache.set(self.key_prefix + key, value, self.timeout)
+
+    def add(self, key, value, size=1):
+        """set the key unless it is present, return the stored value"""
+        if self.cache.add(self.key_prefix + key, value, self.timeout):
+            return value
+        return self.get(key, value)
+
+    def delete(self, key):
+        self.cache.delete(self.key_prefix + key)
+
+    def clear(self):
+        self.cache.clear()
@@ -0,0 +1,16 @@
+"""password hashers with work factors taken from the settings"""
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2 with PASSWORD_HASHER_ITERATIONS iterations
+
+    Keeps the `pbkdf2_sha256` algorithm name, so stored hashes with another
+    iteration count still verify and are rehashed at the next login.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'PASSWORD_HASHER_ITERATIONS',
+                       PBKDF2PasswordHasher.iterations)
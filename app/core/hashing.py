@@ -0,0 +1,122 @@
+"""password hashing off the request thread
+
+With PASSWORD_HASHING_POOL['WORKERS'] above zero, `User.set_password` and
+`User.check_password` hash in a process pool instead of the worker thread.
+At most MAX_PENDING operations queue for the pool; beyond that requests
+fail fast with 503 instead of piling up behind each other.
+"""
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class HashingUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many logins in progress, try again shortly.'
+    default_code = 'hashing_unavailable'
+
+
+def _make_password(password):
+    return hashers.make_password(password)
+
+
+def _check_password(password, encoded):
+    """whether the password matches and the hash needs an upgrade"""
+    upgrades = []
+    is_correct = hashers.check_password(password, encoded, upgrades.append)
+    return is_correct, bool(upgrades)
+
+
+class HashingPool:
+    """process pool with a bounded number of pending operations"""
+
+    def __init__(self, workers, max_pending, timeout):
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._workers = workers
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self._workers)
+            return self._executor
+
+    def run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingUnavailable()
+        try:
+            future = self.executor.submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda future: self._slots.release())
+        try:
+            return future.result(self.timeout)
+        except TimeoutError:
+            raise HashingUnavailable()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hashing_pool():
+    """pool configured by PASSWORD_HASHING_POOL, None when disabled"""
+    global _pool
+    config = getattr(settings, 'PASSWORD_HASHING_POOL', None) or {}
+    if not config.get('WORKERS'):
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = HashingPool(config['WORKERS'],
+                                config.get('MAX_PENDING', 32),
+                                config.get('TIMEOUT', 10))
+        return _pool
+
+
+@receiver(setting_changed)
+def reset_hashing_pool(setting, **kwargs):
+    # forked workers keep the settings they started with
+    global _pool
+    if setting in ('PASSWORD_HASHING_POOL', 'PASSWORD_HASHERS',
+                   'PASSWORD_HASHER_ITERATIONS'):
+        with _pool_lock:
+            if _pool is not None:
+                _pool.shutdown()
+            _pool = None
+
+
+def make_password(password):
+    """hash the password, in the pool when enabled"""
+    pool = get_hashing_pool()
+    if pool is None or password is None:
+        return hashers.make_password(password)
+    return pool.run(_make_password, password)
+
+
+def check_password(password, encoded, setter=None):
+    """django's check_password, hashing in the pool when enabled"""
+    pool = get_hashing_pool()
+    if pool is None:
+        return hashers.check_password(password, encoded, setter)
+    if password is None or not hashers.is_password_usable(encoded):
+        return False
+    is_correct, must_update = pool.run(_check_password, password, encoded)
+    if is_correct and must_update and setter:
+        setter(password)
+    return is_correct
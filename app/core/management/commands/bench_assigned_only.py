@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Tag, Ingredient
+from core.profiling import seed_library, seed_user, timed, viewset_queryset
+from recipe.views import TagViewSet, IngredientViewSet
+
+
+class Command(BaseCommand):
+    """Compare the old DISTINCT join and the EXISTS assigned_only query
+
+    Seeds a library with zipf distributed tag and ingredient usage inside
+    a transaction that is rolled back afterwards.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=20000)
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument('--per-recipe', type=int, default=8)
+        parser.add_argument('--skew', type=float, default=1.2,
+                            help='zipf exponent of the usage distribution')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--explain', action='store_true',
+                            help='print EXPLAIN ANALYZE for each query')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        with transaction.atomic():
+            user = seed_user()
+            self.stdout.write('Seeding library...')
+            seed_library(user, options['recipes'], options['tags'],
+                         options['ingredients'], options['per_recipe'],
+                         options['skew'])
+            for model, viewset in ((Tag, TagViewSet),
+                                   (Ingredient, IngredientViewSet)):
+                self.compare(model, viewset, user, options)
+            transaction.set_rollback(True)
+
+    def compare(self, model, viewset, user, options):
+        """time both plans for one model"""
+        queries = (
+            ('distinct join', model.objects.filter(
+                user=user, recipe__isnull=False
+            ).order_by('-name').distinct()),
+            ('exists', viewset_queryset(
+                viewset, user, {'assigned_only': 1})),
+            ('exists + usage_count', viewset_queryset(
+                viewset, user, {'assigned_only': 1, 'usage_count': 1})),
+        )
+        self.stdout.write(self.style.MIGRATE_HEADING(model.__name__))
+        for label, queryset in queries:
+            rows = len(list(queryset))
+            median, best = timed(lambda: list(queryset.all()),
+                                 options['repeat'])
+            self.stdout.write(
+                f'  {label:<22} rows={rows:<6} '
+                f'median={median:8.2f}ms best={best:8.2f}ms')
+            if options['explain']:
+                self.stdout.write(queryset.explain(analyze=True))
@@ -0,0 +1,54 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from core.profiling import seed_user
+from user.serialisers import AuthtokenSerializer
+
+
+class Command(BaseCommand):
+    """Measure logins per second and core through AuthtokenSerializer
+
+    Logins run on a single thread, the CPU time they use gives the rate one
+    core sustains. The user is created inside a transaction that is rolled
+    back afterwards.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=50)
+        parser.add_argument('--iterations', type=int,
+                            help='PBKDF2 iterations, defaults to '
+                                 'PASSWORD_HASHER_ITERATIONS')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        iterations = (options['iterations'] or
+                      settings.PASSWORD_HASHER_ITERATIONS)
+        with override_settings(PASSWORD_HASHER_ITERATIONS=iterations), \
+                transaction.atomic():
+            user = seed_user()
+            self.stdout.write(f'PBKDF2 iterations: {iterations}')
+            for label, email, password in (
+                    ('valid login', user.email, 'benchpass'),
+                    ('wrong password', user.email, 'wrongpass'),
+                    ('unknown email', 'nobody@bench.com', 'benchpass')):
+                self.measure(label, email, password, options['logins'])
+            transaction.set_rollback(True)
+
+    def measure(self, label, email, password, logins):
+        """run the logins and report their rate"""
+        request = APIRequestFactory().post('/')
+        data = {'email': email, 'password': password}
+        wall, cpu = time.perf_counter(), time.process_time()
+        for _ in range(logins):
+            AuthtokenSerializer(
+                data=data, context={'request': request}).is_valid()
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        self.stdout.write(
+            f'  {label:<15} {logins / cpu:8.1f} logins/s per core '
+            f'{wall / logins * 1000:8.2f}ms per login')
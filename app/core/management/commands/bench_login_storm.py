@@ -0,0 +1,106 @@
+import json
+import statistics
+import threading
+import time
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(values, fraction):
+    """nearest rank percentile of the values"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Command(BaseCommand):
+    """Compare recipe read latency with and without a login storm
+
+    Runs against a server at --base-url: readers list recipes with a token
+    first alone, then while login threads post to the token endpoint. Run
+    it once with PASSWORD_HASHING_WORKERS=0 on the server and once with the
+    hashing pool enabled to compare both modes.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://localhost:8000')
+        parser.add_argument('--email', required=True)
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--logins', type=int, default=16,
+                            help='concurrent login threads of the storm')
+        parser.add_argument('--duration', type=float, default=10.0,
+                            help='seconds of each phase')
+
+    def request(self, path, data=None, token=None):
+        """status code of a request to the server"""
+        headers = {'Content-Type': 'application/json'}
+        if token:
+            headers['Authorization'] = f'Token {token}'
+        body = json.dumps(data).encode('utf-8') if data else None
+        request = Request(self.base_url + path, body, headers)
+        try:
+            with urlopen(request) as response:
+                return response.status, response.read()
+        except HTTPError as error:
+            return error.code, error.read()
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        self.base_url = options['base_url'].rstrip('/')
+        credentials = {'email': options['email'],
+                       'password': options['password']}
+        code, body = self.request('/api/user/token/', credentials)
+        if code != 200:
+            raise CommandError(f'Login failed with {code}: {body!r}')
+        token = json.loads(body.decode('utf-8'))['token']
+
+        for label, storm in (('reads alone', False),
+                             ('reads during login storm', True)):
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.phase(token, credentials, storm, options)
+
+    def phase(self, token, credentials, storm, options):
+        """run readers, and login threads for the storm, for a duration"""
+        deadline = time.monotonic() + options['duration']
+        latencies, logins = [], []
+        lock = threading.Lock()
+
+        def read():
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                code, _ = self.request('/api/recipe/recipe/?limit=20',
+                                       token=token)
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    latencies.append((code, elapsed))
+
+        def login():
+            while time.monotonic() < deadline:
+                code, _ = self.request('/api/user/token/', credentials)
+                with lock:
+                    logins.append(code)
+
+        threads = [threading.Thread(target=read)
+                   for _ in range(options['readers'])]
+        if storm:
+            threads.extend(threading.Thread(target=login)
+                           for _ in range(options['logins']))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        timings = [elapsed for code, elapsed in latencies if code == 200]
+        if not timings:
+            raise CommandError('No successful recipe reads')
+        self.stdout.write(
+            f'  reads={len(timings)} failed={len(latencies) - len(timings)} '
+            f'p50={statistics.median(timings):.1f}ms '
+            f'p99={percentile(timings, 0.99):.1f}ms')
+        if storm:
+            self.stdout.write(
+                f'  logins ok={logins.count(200)} '
+                f'rejected 503={logins.count(503)} '
+                f'other={len(logins) - logins.count(200) - logins.count(503)}')
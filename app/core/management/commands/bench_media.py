@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished
+from django.db import close_old_connections
+from django.test import RequestFactory, override_settings
+from django.utils.http import http_date
+from django.views.static import serve
+
+from core.profiling import timed
+from core.views import serve_media
+
+
+class Command(BaseCommand):
+    """Compare media throughput of serve_media and the static() route
+
+    Requests run in process against a temporary media root, the response
+    bodies are read as a WSGI server without sendfile would. Under a server
+    with wsgi.file_wrapper the full file responses of serve_media are sent
+    with sendfile and never pass through Python.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=4 * 1024 * 1024,
+                            help='bytes of the served file')
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        media_root = tempfile.mkdtemp()
+        try:
+            name = 'uploads/recipe/ab/cd/' + 'abcd' * 16 + '.jpg'
+            path = os.path.join(media_root, name)
+            os.makedirs(os.path.dirname(path))
+            with open(path, 'wb') as file:
+                file.write(os.urandom(options['size']))
+            # closing a response finishes the request, keep the connection
+            # like the test client does
+            request_finished.disconnect(close_old_connections)
+            with override_settings(MEDIA_ROOT=media_root):
+                self.compare(name, media_root, options)
+        finally:
+            request_finished.connect(close_old_connections)
+            shutil.rmtree(media_root)
+
+    def compare(self, name, media_root, options):
+        factory = RequestFactory()
+        mtime = http_date(os.stat(os.path.join(media_root, name)).st_mtime)
+        cases = (
+            ('static() serve', lambda: serve(
+                factory.get('/'), name, document_root=media_root)),
+            ('serve_media', lambda: serve_media(factory.get('/'), name)),
+            ('serve_media range 64KB', lambda: serve_media(
+                factory.get('/', HTTP_RANGE='bytes=0-65535'), name)),
+            ('serve_media 304', lambda: serve_media(
+                factory.get('/', HTTP_IF_MODIFIED_SINCE=mtime), name)),
+        )
+        for label, view in cases:
+            sent = []
+
+            def run():
+                sent.clear()
+                for _ in range(options['requests']):
+                    response = view()
+                    if response.streaming:
+                        sent.extend(len(chunk)
+                                    for chunk in response.streaming_content)
+                    response.close()
+            median, best = timed(run, options['repeat'])
+            seconds = median / 1000
+            self.stdout.write(
+                f'  {label:<24} {options["requests"] / seconds:10.1f} req/s '
+                f'{sum(sent) / seconds / 1024 / 1024:10.1f} MB/s')
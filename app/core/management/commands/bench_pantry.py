@@ -0,0 +1,76 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from core.models import Ingredient, Recipe
+from core.profiling import seed_library, seed_user, timed, zipf_weights
+from recipe.pantry import PantryIndex
+
+
+class Command(BaseCommand):
+    """Time ranking a library by pantry coverage, indexed and in SQL
+
+    Seeds a library inside a transaction that is rolled back afterwards,
+    builds its pantry index, then ranks pantries of a few sizes, picked
+    with the same skew as the seeded links, through the index and through
+    a grouped query over the ingredient links.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--ingredients', type=int, default=5000)
+        parser.add_argument('--per-recipe', type=int, default=8)
+        parser.add_argument('--pantry-sizes', type=int, nargs='+',
+                            default=[5, 20, 50])
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        with transaction.atomic():
+            user = seed_user()
+            self.stdout.write('Seeding library...')
+            seed_library(user, options['recipes'], 10,
+                         options['ingredients'],
+                         per_recipe=options['per_recipe'])
+            start = time.perf_counter()
+            index = PantryIndex.build(user.id)
+            self.stdout.write(
+                f'index built in {time.perf_counter() - start:.2f}s, '
+                f'{index.nbytes() / 2 ** 20:.1f}MB')
+
+            ingredient_ids = list(Ingredient.objects.filter(
+                user=user).order_by('id').values_list('id', flat=True))
+            weights = zipf_weights(len(ingredient_ids), 1.2)
+            rng = random.Random(0)
+            for size in options['pantry_sizes']:
+                pantry = set()
+                while len(pantry) < min(size, len(ingredient_ids)):
+                    pantry.update(rng.choices(ingredient_ids, weights))
+                self.query(user, index, sorted(pantry), options)
+            transaction.set_rollback(True)
+
+    def query(self, user, index, pantry, options):
+        """time one pantry through the index and in SQL"""
+        page_size = options['page_size']
+        matches, page = index.match(pantry, limit=page_size)
+        ranked = Recipe.objects.filter(user=user).annotate(
+            size=Count('ingredients'),
+            hits=Count('ingredients', filter=Q(ingredients__in=pantry)),
+        ).filter(Q(hits__gt=0) | Q(size=0)).annotate(
+            missing=F('size') - F('hits')
+        ).order_by('missing', '-id').values_list('id', 'missing')
+        if list(ranked[:page_size]) != page:
+            self.stderr.write(f'  pantry of {len(pantry)} ranked differently')
+
+        self.stdout.write(f'pantry of {len(pantry)} ingredients, '
+                          f'matches={matches}')
+        for label, func in (
+                ('index', lambda: index.match(pantry, limit=page_size)),
+                ('sql', lambda: list(ranked[:page_size]))):
+            median, best = timed(func, options['repeat'])
+            self.stdout.write(f'  {label:<8} median={median:8.2f}ms '
+                              f'best={best:8.2f}ms')
@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.models import Tag, Recipe
+from core.profiling import seed_library, seed_user, timed, viewset_queryset
+from recipe.views import RecipeViewSet
+
+
+class Command(BaseCommand):
+    """Time the first page of recipes filtered or ordered by time and price
+
+    Seeds a library inside a transaction that is rolled back afterwards.
+    Every query runs with the (user, time_minute, id) and (user, price, id)
+    indexes, then again after dropping them within the transaction, which
+    leaves only the per user scan of the (user, id) index.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=500000)
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--explain', action='store_true',
+                            help='print EXPLAIN ANALYZE for each query')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        with transaction.atomic():
+            user = seed_user()
+            self.stdout.write('Seeding library...')
+            seed_library(user, options['recipes'], options['tags'],
+                         options['ingredients'])
+            tags = Tag.objects.filter(user=user).order_by('id')
+            queries = self.queries(tags.first().id, tags.last().id)
+            self.stdout.write(self.style.MIGRATE_HEADING('with indexes'))
+            for label, params in queries:
+                self.query(label, user, params, options)
+            indexes = [index for index in Recipe._meta.indexes
+                       if {'time_minute', 'price'} & set(index.fields)]
+            with connection.schema_editor() as editor:
+                for index in indexes:
+                    editor.remove_index(Recipe, index)
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {Recipe._meta.db_table}')
+            self.stdout.write(self.style.MIGRATE_HEADING('without indexes'))
+            for label, params in queries:
+                self.query(label, user, params, options)
+            transaction.set_rollback(True)
+
+    def queries(self, popular_tag, rare_tag):
+        """labelled query params, the tags are the most and least used"""
+        return (
+            ('under 30 minutes', {'time_minute__lte': 30}),
+            ('under $10', {'price__lte': 10}),
+            ('under 30 minutes and $10',
+             {'time_minute__lte': 30, 'price__lte': 10}),
+            ('cheapest first', {'ordering': 'price'}),
+            ('quickest under $10',
+             {'price__lte': 10, 'ordering': 'time_minute'}),
+            ('quick, cheap, popular tag',
+             {'time_minute__lte': 30, 'price__lte': 10,
+              'tags': popular_tag}),
+            ('quick, cheap, rare tag',
+             {'time_minute__lte': 30, 'price__lte': 10, 'tags': rare_tag}),
+        )
+
+    def query(self, label, user, params, options):
+        """time the first page of one query"""
+        def first_page():
+            queryset = viewset_queryset(RecipeViewSet, user, params)
+            return list(queryset.values_list(
+                'id', flat=True)[:options['page_size']])
+
+        matches = viewset_queryset(RecipeViewSet, user, params).count()
+        median, best = timed(first_page, options['repeat'])
+        self.stdout.write(
+            f'  {label:<28} matches={matches:<8} '
+            f'median={median:8.2f}ms best={best:8.2f}ms')
+        if options['explain']:
+            queryset = viewset_queryset(RecipeViewSet, user, params)
+            self.stdout.write(queryset.values_list('id', flat=True)[
+                :options['page_size']].explain(analyze=True))
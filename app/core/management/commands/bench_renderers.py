@@ -0,0 +1,60 @@
+import io
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core import renderers
+from core.profiling import seed_library, seed_user, timed, viewset_queryset
+from recipe.serialisers import RecipeDetailSerializer
+from recipe.views import RecipeViewSet
+
+
+class Command(BaseCommand):
+    """Compare render and parse time of the api renderers
+
+    Seeds a library inside a transaction that is rolled back afterwards
+    and times rendering its recipe detail representations with the DRF
+    json renderer, the orjson backed one and msgpack.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        with transaction.atomic():
+            user = seed_user()
+            seed_library(user, options['recipes'], 50, 200)
+            request = Request(APIRequestFactory().get('/'))
+            request.user = user
+            data = RecipeDetailSerializer(
+                viewset_queryset(RecipeViewSet, user, action='retrieve'),
+                many=True, context={'request': request}).data
+            transaction.set_rollback(True)
+
+        cases = [
+            ('drf json', JSONRenderer, JSONParser),
+            ('orjson' if renderers.orjson else 'orjson (not installed)',
+             renderers.FastJSONRenderer, renderers.FastJSONParser),
+        ]
+        if renderers.msgpack:
+            cases.append(('msgpack', renderers.MessagePackRenderer,
+                          renderers.MessagePackParser))
+        self.stdout.write(f'{options["recipes"]} recipes')
+        for label, renderer_class, parser_class in cases:
+            renderer = renderer_class()
+            body = renderer.render(data)
+            median, best = timed(lambda: renderer.render(data),
+                                 options['repeat'])
+            line = (f'  {label:<24} {len(body) / 1024:8.1f}KB '
+                    f'render median={median:7.2f}ms best={best:7.2f}ms')
+            parse = parser_class().parse
+            median, _ = timed(lambda: parse(io.BytesIO(body)),
+                              options['repeat'])
+            line += f' parse median={median:7.2f}ms'
+            self.stdout.write(line)
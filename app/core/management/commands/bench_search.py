@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.profiling import (FOOD_WORDS, seed_library, seed_user, timed,
+                            viewset_queryset)
+from recipe.views import RecipeViewSet, TagViewSet
+
+
+class Command(BaseCommand):
+    """Time the first page of recipe and tag searches
+
+    Seeds a library with searchable titles and names inside a transaction
+    that is rolled back afterwards. Each timing covers building the search
+    query, the typo lookup of names and fetching the best ranked page.
+    """
+    searches = ('saffron', 'chicken', 'spicy chicken curry', 'chikcen',
+                'saffron risotto', 'smokey tomatoe soup')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000000)
+        parser.add_argument('--tags', type=int, default=200)
+        parser.add_argument('--ingredients', type=int, default=2000)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--explain', action='store_true',
+                            help='print EXPLAIN ANALYZE for each search')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        with transaction.atomic():
+            user = seed_user()
+            self.stdout.write('Seeding library...')
+            seed_library(user, options['recipes'], options['tags'],
+                         options['ingredients'], words=FOOD_WORDS)
+            for viewset in (RecipeViewSet, TagViewSet):
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    viewset.__name__))
+                for text in self.searches:
+                    self.search(viewset, user, text, options)
+            transaction.set_rollback(True)
+
+    def search(self, viewset, user, text, options):
+        """time one search"""
+        def first_page():
+            queryset = viewset_queryset(viewset, user, {'search': text})
+            return list(queryset.values_list(
+                'id', flat=True)[:options['page_size']])
+
+        matches = viewset_queryset(viewset, user, {'search': text}).count()
+        median, best = timed(first_page, options['repeat'])
+        self.stdout.write(
+            f'  {text!r:<24} matches={matches:<8} '
+            f'median={median:8.2f}ms best={best:8.2f}ms')
+        if options['explain']:
+            queryset = viewset_queryset(viewset, user, {'search': text})
+            self.stdout.write(queryset.values_list('id', flat=True)[
+                :options['page_size']].explain(analyze=True))
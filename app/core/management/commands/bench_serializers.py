@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.profiling import seed_library, seed_user, timed, viewset_queryset
+from recipe.fastpath import CompiledSerializer
+from recipe.serialisers import RecipeSerializer, RecipeDetailSerializer
+from recipe.views import RecipeViewSet
+
+
+class Command(BaseCommand):
+    """Compare DRF serialisers and the compiled fast path on recipe lists
+
+    Seeds a library inside a transaction that is rolled back afterwards and
+    times querying, serialising and rendering the whole list both ways.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--ingredients', type=int, default=200)
+        parser.add_argument('--per-recipe', type=int, default=5)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        with transaction.atomic():
+            user = seed_user()
+            self.stdout.write('Seeding library...')
+            seed_library(user, options['recipes'], options['tags'],
+                         options['ingredients'], options['per_recipe'])
+            request = Request(APIRequestFactory().get('/'))
+            request.user = user
+            for serializer_class, action in (
+                    (RecipeSerializer, 'list'),
+                    (RecipeDetailSerializer, 'retrieve')):
+                queryset = viewset_queryset(RecipeViewSet, user,
+                                            action=action)
+                self.compare(serializer_class, queryset,
+                             {'request': request}, options)
+            transaction.set_rollback(True)
+
+    def compare(self, serializer_class, queryset, context, options):
+        """time both paths for one serialiser"""
+        renderer = JSONRenderer()
+
+        def drf():
+            return renderer.render(serializer_class(
+                queryset.all(), many=True, context=context).data)
+
+        def fast():
+            compiled = CompiledSerializer(serializer_class, context)
+            return renderer.render(compiled.serialize(
+                compiled.rows(queryset.all())))
+
+        if drf() != fast():
+            self.stderr.write(f'{serializer_class.__name__}: output differs')
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            serializer_class.__name__))
+        for label, func in (('drf', drf), ('fast path', fast)):
+            median, best = timed(func, options['repeat'])
+            self.stdout.write(
+                f'  {label:<10} {options["recipes"] / median * 1000:10.0f} '
+                f'rows/s median={median:8.2f}ms best={best:8.2f}ms')
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipe.summary import (REFRESH_BATCH_SIZE, id_ranges, refresh_summaries,
+                            stale_summaries)
+
+
+class Command(BaseCommand):
+    """Report the recipes whose summary is missing or out of date
+
+    Fails when any is found, unless --fix refreshes them.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=REFRESH_BATCH_SIZE,
+                            help='recipe ids compared per statement')
+        parser.add_argument('--fix', action='store_true',
+                            help='refresh the stale summaries')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        stale = 0
+        for start, stop in id_ranges(options['batch_size']):
+            with transaction.atomic():
+                recipe_ids = stale_summaries(start, stop)
+                if options['fix']:
+                    refresh_summaries(recipe_ids)
+            for recipe_id in recipe_ids:
+                self.stdout.write(f'recipe {recipe_id}')
+            stale += len(recipe_ids)
+        if stale and not options['fix']:
+            raise CommandError(f'{stale} stale recipe summaries')
+        action = 'Refreshed' if stale else 'Found'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {stale} stale recipe summaries'))
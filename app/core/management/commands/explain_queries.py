@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.profiling import viewset_queryset
+from recipe.views import TagViewSet, IngredientViewSet, RecipeViewSet
+
+
+class Command(BaseCommand):
+    """Print EXPLAIN output for the canonical queries of each viewset"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email',
+                            help='user whose queries are explained, '
+                                 'defaults to the first user')
+        parser.add_argument('--analyze', action='store_true',
+                            help='run the queries with EXPLAIN ANALYZE')
+
+    def get_user(self, email):
+        users = get_user_model().objects.order_by('id')
+        if email:
+            users = users.filter(email=email)
+        user = users.first()
+        if user is None:
+            raise CommandError('No matching user found')
+        return user
+
+    def canonical_queries(self, user):
+        """label and queryset of every query the viewsets issue"""
+        tag_ids = ','.join(str(pk) for pk in user.tag_set.values_list(
+            'id', flat=True)[:2]) or '0'
+        ingredient_ids = ','.join(str(pk) for pk in user.ingredient_set.
+                                  values_list('id', flat=True)[:2]) or '0'
+        recipe = user.recipe_set.first()
+        queries = [
+            ('tags', TagViewSet, {}),
+            ('tags assigned_only', TagViewSet, {'assigned_only': 1}),
+            ('ingredients', IngredientViewSet, {}),
+            ('ingredients assigned_only', IngredientViewSet,
+             {'assigned_only': 1}),
+            ('recipes', RecipeViewSet, {}),
+            ('recipes by tags', RecipeViewSet, {'tags': tag_ids}),
+            ('recipes by ingredients', RecipeViewSet,
+             {'ingredients': ingredient_ids}),
+        ]
+        for label, viewset, params in queries:
+            yield label, viewset_queryset(viewset, user, params)
+        if recipe is not None:
+            yield 'recipe detail', viewset_queryset(
+                RecipeViewSet, user, action='retrieve').filter(pk=recipe.pk)
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        user = self.get_user(options['email'])
+        # not every backend knows the analyze option, only pass it when set
+        explain_options = {'analyze': True} if options['analyze'] else {}
+        for label, queryset in self.canonical_queries(user):
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write('')
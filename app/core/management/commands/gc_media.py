@@ -0,0 +1,58 @@
+import os
+import time
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Recipe
+from core.storage import IMAGE_FIELDS
+
+
+class Command(BaseCommand):
+    """Delete stored blobs no recipe names anymore
+
+    Blobs written in the last --min-age seconds are kept, an upload may be
+    about to commit the recipe naming them.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directory', default='uploads/recipe',
+                            help='media directory to collect')
+        parser.add_argument('--min-age', type=int, default=3600,
+                            help='seconds since the last write of a blob')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='only report the orphaned blobs')
+
+    def referenced_names(self):
+        names = set()
+        for recipe in Recipe.objects.exclude(image='').exclude(
+                image=None).values_list(*IMAGE_FIELDS).iterator():
+            names.update(recipe)
+        return names
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        try:
+            root = default_storage.path(options['directory'])
+        except NotImplementedError:
+            raise CommandError('The media storage has no local paths')
+        referenced = self.referenced_names()
+        cutoff = time.time() - options['min_age']
+        removed = freed = 0
+        for dirpath, dirnames, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, default_storage.location)
+                name = name.replace(os.sep, '/')
+                stat = os.stat(path)
+                if name in referenced or stat.st_mtime > cutoff:
+                    continue
+                removed += 1
+                freed += stat.st_size
+                if options['dry_run']:
+                    self.stdout.write(name)
+                else:
+                    os.remove(path)
+        action = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {removed} blobs, {freed / 1024 / 1024:.1f} MB'))
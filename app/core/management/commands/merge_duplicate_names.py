@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Tag, Ingredient
+from recipe.matrix import invalidate_indexes
+from recipe.bulk import batches
+from recipe.cache import invalidate_lists
+from recipe.conditional import bump_versions
+from recipe.names import merge_duplicates
+from recipe.summary import REFRESH_BATCH_SIZE, refresh_summaries
+
+
+class Command(BaseCommand):
+    """Merge tags and ingredients whose names normalise alike
+
+    Duplicates merge into the oldest row of their name and their recipe
+    links move to it. Core migration 0015 merged the rows existing then,
+    this is for after a change of the name normalisation.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append',
+                            dest='users', help='only merge this user id')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        for model in (Tag, Ingredient):
+            collection = model._meta.model_name
+            with transaction.atomic():
+                merged, recipe_ids = merge_duplicates(model, options['users'])
+                for batch in batches(recipe_ids, REFRESH_BATCH_SIZE):
+                    refresh_summaries(batch)
+                for user_id, count in merged.items():
+                    bump_versions(user_id, [collection])
+                    self.stdout.write(
+                        f'user {user_id}: merged {count} {collection}s')
+            for user_id in merged:
+                invalidate_lists(user_id, collection)
+                invalidate_indexes(user_id)
+            self.stdout.write(self.style.SUCCESS(
+                f'Merged {sum(merged.values())} {collection}s of '
+                f'{len(merged)} users'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from recipe.similar import METRICS, precompute_user
+from recipe.stats import counted_user_ids
+
+
+class Command(BaseCommand):
+    """Store the most similar recipes of every recipe
+
+    Meant to run offline, each user is computed in its own transaction.
+    The api serves the stored neighbours until the user's library changes.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append',
+                            dest='users', help='only compute this user id')
+        parser.add_argument('--metric', choices=METRICS, default=METRICS[0])
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        stored = 0
+        users = options['users'] or counted_user_ids()
+        for user_id in users:
+            count = precompute_user(user_id, options['metric'])
+            self.stdout.write(f'user {user_id}: {count} recipes')
+            stored += count
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored neighbours of {stored} recipes of {len(users)} users'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipe.summary import REFRESH_BATCH_SIZE, id_ranges, refresh_range
+
+
+class Command(BaseCommand):
+    """Recompute the tag and ingredient summaries of every recipe
+
+    Each id range is written by one statement in its own transaction, so
+    the command can run against a live database.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=REFRESH_BATCH_SIZE,
+                            help='recipe ids refreshed per statement')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        rebuilt = 0
+        for start, stop in id_ranges(options['batch_size']):
+            with transaction.atomic():
+                rebuilt += refresh_range(start, stop)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {rebuilt} recipe summaries'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from recipe.stats import counted_user_ids, reconcile_user
+
+
+class Command(BaseCommand):
+    """Recompute the recipe counters from the rows and correct any drift
+
+    Meant to run periodically, each user is recounted in its own
+    transaction while the api keeps writing.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append',
+                            dest='users', help='only recount this user id')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        corrected = 0
+        users = options['users'] or counted_user_ids()
+        for user_id in users:
+            fixed = reconcile_user(user_id)
+            if fixed:
+                self.stdout.write(f'user {user_id}: {fixed} counters')
+            corrected += fixed
+        self.stdout.write(self.style.SUCCESS(
+            f'Corrected {corrected} counters of {len(users)} users'))
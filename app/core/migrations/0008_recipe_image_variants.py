@@ -0,0 +1,28 @@
+# Generated by Django 2.1.15 on 2026-10-18 05:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_collectionversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_medium',
+            field=models.ImageField(editable=False, null=True, upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_status',
+            field=models.CharField(blank=True, choices=[('processing', 'processing'), ('ready', 'ready'), ('failed', 'failed')], editable=False, max_length=16),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_thumbnail',
+            field=models.ImageField(editable=False, null=True, upload_to=''),
+        ),
+    ]
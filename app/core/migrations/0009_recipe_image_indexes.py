@@ -0,0 +1,29 @@
+# Generated by Django 2.1.15 on 2026-10-18 05:20
+
+import core.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(db_index=True, null=True, upload_to=core.models.recipe_image_file_path),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image_medium',
+            field=models.ImageField(db_index=True, editable=False, null=True, upload_to=''),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image_thumbnail',
+            field=models.ImageField(db_index=True, editable=False, null=True, upload_to=''),
+        ),
+    ]
@@ -0,0 +1,143 @@
+# Generated by Django 2.1.15 on 2026-10-18 05:35
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+# weighted document of a recipe: title (A), tag names (B), ingredient
+# names (C), in the text search configuration of recipe.search.
+#
+# The functions here run with plans cached while bulk writes grow the
+# tables, possibly planned from statistics of the empty tables. Sequential
+# scans are off and the ids are collected first, so every lookup stays an
+# index probe of the rows concerned.
+SEARCH_VECTOR_FUNCTION = """
+CREATE FUNCTION core_recipe_search_vector(integer, text)
+RETURNS tsvector LANGUAGE sql STABLE SET enable_seqscan = off AS $$
+    SELECT setweight(to_tsvector('english', coalesce($2, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(name, ' ') FROM core_tag
+            WHERE id = ANY(ARRAY(
+                SELECT tag_id FROM core_recipe_tags WHERE recipe_id = $1))
+        ), '')), 'B') ||
+        setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(name, ' ') FROM core_ingredient
+            WHERE id = ANY(ARRAY(
+                SELECT ingredient_id FROM core_recipe_ingredients
+                WHERE recipe_id = $1))
+        ), '')), 'C')
+$$
+"""
+
+# inserts and title updates compute the vector of the row itself
+RECIPE_TRIGGER = """
+CREATE FUNCTION core_recipe_search_vector_row() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.search_vector := core_recipe_search_vector(NEW.id, NEW.title);
+    RETURN NEW;
+END
+$$;
+CREATE TRIGGER core_recipe_search_vector_row
+BEFORE INSERT OR UPDATE OF title ON core_recipe
+FOR EACH ROW EXECUTE PROCEDURE core_recipe_search_vector_row();
+"""
+
+# links added or removed refresh their recipes once per statement, the
+# transition table holds the changed links
+LINK_TRIGGERS = """
+CREATE FUNCTION core_recipe_search_vector_links() RETURNS trigger
+LANGUAGE plpgsql SET enable_seqscan = off AS $$
+BEGIN
+    UPDATE core_recipe
+    SET search_vector = core_recipe_search_vector(id, title)
+    WHERE id = ANY(ARRAY(SELECT DISTINCT recipe_id FROM changed_links));
+    RETURN NULL;
+END
+$$;
+CREATE TRIGGER core_recipe_tags_search_insert
+AFTER INSERT ON core_recipe_tags REFERENCING NEW TABLE AS changed_links
+FOR EACH STATEMENT EXECUTE PROCEDURE core_recipe_search_vector_links();
+CREATE TRIGGER core_recipe_tags_search_delete
+AFTER DELETE ON core_recipe_tags REFERENCING OLD TABLE AS changed_links
+FOR EACH STATEMENT EXECUTE PROCEDURE core_recipe_search_vector_links();
+CREATE TRIGGER core_recipe_ingredients_search_insert
+AFTER INSERT ON core_recipe_ingredients
+REFERENCING NEW TABLE AS changed_links
+FOR EACH STATEMENT EXECUTE PROCEDURE core_recipe_search_vector_links();
+CREATE TRIGGER core_recipe_ingredients_search_delete
+AFTER DELETE ON core_recipe_ingredients
+REFERENCING OLD TABLE AS changed_links
+FOR EACH STATEMENT EXECUTE PROCEDURE core_recipe_search_vector_links();
+"""
+
+# renamed tags and ingredients refresh the recipes linking them
+RENAME_TRIGGER = """
+CREATE FUNCTION core_{model}_search_vector_rename() RETURNS trigger
+LANGUAGE plpgsql SET enable_seqscan = off AS $$
+BEGIN
+    UPDATE core_recipe
+    SET search_vector = core_recipe_search_vector(id, title)
+    WHERE id = ANY(ARRAY(
+        SELECT DISTINCT l.recipe_id FROM core_recipe_{table} l
+        JOIN new_rows n ON n.id = l.{model}_id
+        JOIN old_rows o ON o.id = n.id
+        WHERE n.name IS DISTINCT FROM o.name
+    ));
+    RETURN NULL;
+END
+$$;
+CREATE TRIGGER core_{model}_search_vector_rename
+AFTER UPDATE ON core_{model}
+REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE core_{model}_search_vector_rename();
+"""
+
+DROP_RENAME_TRIGGER = """
+DROP TRIGGER core_{model}_search_vector_rename ON core_{model};
+DROP FUNCTION core_{model}_search_vector_rename();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_image_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(
+            [SEARCH_VECTOR_FUNCTION, RECIPE_TRIGGER, LINK_TRIGGERS] + [
+                RENAME_TRIGGER.format(model=model, table=table)
+                for model, table in (('tag', 'tags'),
+                                     ('ingredient', 'ingredients'))
+            ] + ['UPDATE core_recipe SET search_vector = '
+                 'core_recipe_search_vector(id, title)'],
+            [DROP_RENAME_TRIGGER.format(model='ingredient'),
+             DROP_RENAME_TRIGGER.format(model='tag'),
+             'DROP FUNCTION core_recipe_search_vector_links() CASCADE',
+             'DROP FUNCTION core_recipe_search_vector_row() CASCADE',
+             'DROP FUNCTION core_recipe_search_vector(integer, text)'],
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='core_recipe_search__c01407_gin'),
+        ),
+        # typo tolerant lookups of tag and ingredient names
+        migrations.RunSQL(
+            ['CREATE INDEX core_tag_name_trgm_idx '
+             'ON core_tag USING gin (name gin_trgm_ops)',
+             'CREATE INDEX core_ingredient_name_trgm_idx '
+             'ON core_ingredient USING gin (name gin_trgm_ops)'],
+            ['DROP INDEX core_ingredient_name_trgm_idx',
+             'DROP INDEX core_tag_name_trgm_idx'],
+        ),
+    ]
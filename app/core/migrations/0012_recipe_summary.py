@@ -0,0 +1,40 @@
+# Generated by Django 2.1.15 on 2026-10-18 06:46
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# summaries of the existing recipes, see recipe.summary
+RELATED_JSON = """
+coalesce((SELECT jsonb_agg(jsonb_build_object('id', x.id, 'name', x.name)
+                           ORDER BY x.id)
+          FROM core_recipe_{table} l JOIN core_{model} x ON x.id = l.{model}_id
+          WHERE l.recipe_id = r.id), '[]'::jsonb)
+"""
+
+BACKFILL = f"""
+INSERT INTO core_recipesummary (recipe_id, tags, ingredients)
+SELECT r.id, {RELATED_JSON.format(table='tags', model='tag')},
+    {RELATED_JSON.format(table='ingredients', model='ingredient')}
+FROM core_recipe r
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_recipe_time_price_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSummary',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='core.Recipe')),
+                ('tags', django.contrib.postgres.fields.jsonb.JSONField(default=list)),
+                ('ingredients', django.contrib.postgres.fields.jsonb.JSONField(default=list)),
+            ],
+        ),
+        migrations.RunSQL(BACKFILL, migrations.RunSQL.noop),
+    ]
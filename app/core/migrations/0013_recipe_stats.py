@@ -0,0 +1,155 @@
+# Generated by Django 2.1.15 on 2026-10-18 07:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# recipes written move the counters of their users by the signed sums of
+# the changed rows, one statement per event
+RECIPE_STATS_UPSERT = """
+    INSERT INTO core_recipestats AS s
+        (user_id, recipe_count, time_minute_total, price_total)
+    SELECT user_id, sum(n), sum(time_minute * n), sum(price * n)
+    FROM ({changes}) changes
+    GROUP BY user_id
+    HAVING sum(n) <> 0 OR sum(time_minute * n) <> 0 OR sum(price * n) <> 0
+    ON CONFLICT (user_id) DO UPDATE SET
+        recipe_count = s.recipe_count + EXCLUDED.recipe_count,
+        time_minute_total = s.time_minute_total + EXCLUDED.time_minute_total,
+        price_total = s.price_total + EXCLUDED.price_total;
+"""
+ADDED = 'SELECT user_id, time_minute, price, 1 AS n FROM new_rows'
+REMOVED = 'SELECT user_id, time_minute, price, -1 AS n FROM old_rows'
+
+RECIPE_STATS_TRIGGERS = f"""
+CREATE FUNCTION core_recipe_stats() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        {RECIPE_STATS_UPSERT.format(changes=ADDED)}
+    ELSIF TG_OP = 'DELETE' THEN
+        {RECIPE_STATS_UPSERT.format(changes=REMOVED)}
+    ELSE
+        {RECIPE_STATS_UPSERT.format(changes=f'{ADDED} UNION ALL {REMOVED}')}
+    END IF;
+    RETURN NULL;
+END
+$$;
+CREATE TRIGGER core_recipe_stats_insert
+AFTER INSERT ON core_recipe REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE core_recipe_stats();
+CREATE TRIGGER core_recipe_stats_update
+AFTER UPDATE ON core_recipe
+REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE core_recipe_stats();
+CREATE TRIGGER core_recipe_stats_delete
+AFTER DELETE ON core_recipe REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE core_recipe_stats();
+"""
+
+# links added or removed move the usage counters of their tags or
+# ingredients. As in 0010, the plans are cached while bulk writes grow the
+# tables, so sequential scans are off.
+USAGE_TRIGGERS = """
+CREATE FUNCTION core_{model}_usage() RETURNS trigger
+LANGUAGE plpgsql SET enable_seqscan = off AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO core_{model}usage AS u ({model}_id, user_id, recipe_count)
+        SELECT x.id, x.user_id, l.added
+        FROM (SELECT {model}_id, count(*) AS added FROM new_links
+              GROUP BY {model}_id) l
+        JOIN core_{model} x ON x.id = l.{model}_id
+        ON CONFLICT ({model}_id) DO UPDATE
+        SET recipe_count = u.recipe_count + EXCLUDED.recipe_count;
+    ELSE
+        UPDATE core_{model}usage u SET recipe_count = u.recipe_count - l.removed
+        FROM (SELECT {model}_id, count(*) AS removed FROM old_links
+              GROUP BY {model}_id) l
+        WHERE u.{model}_id = l.{model}_id;
+    END IF;
+    RETURN NULL;
+END
+$$;
+CREATE TRIGGER core_recipe_{table}_usage_insert
+AFTER INSERT ON core_recipe_{table} REFERENCING NEW TABLE AS new_links
+FOR EACH STATEMENT EXECUTE PROCEDURE core_{model}_usage();
+CREATE TRIGGER core_recipe_{table}_usage_delete
+AFTER DELETE ON core_recipe_{table} REFERENCING OLD TABLE AS old_links
+FOR EACH STATEMENT EXECUTE PROCEDURE core_{model}_usage();
+"""
+
+# counters of the existing rows
+BACKFILL = [
+    """
+    INSERT INTO core_recipestats
+        (user_id, recipe_count, time_minute_total, price_total)
+    SELECT user_id, count(*), sum(time_minute), sum(price)
+    FROM core_recipe GROUP BY user_id
+    """,
+] + [
+    f"""
+    INSERT INTO core_{model}usage ({model}_id, user_id, recipe_count)
+    SELECT x.id, x.user_id, count(*)
+    FROM core_{model} x JOIN core_recipe_{table} l ON l.{model}_id = x.id
+    GROUP BY x.id
+    """
+    for model, table in (('tag', 'tags'), ('ingredient', 'ingredients'))
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipe_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientUsage',
+            fields=[
+                ('ingredient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='usage', serialize=False, to='core.Ingredient')),
+                ('recipe_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecipeStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recipe_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('recipe_count', models.BigIntegerField(default=0)),
+                ('time_minute_total', models.BigIntegerField(default=0)),
+                ('price_total', models.DecimalField(decimal_places=2, default=0, max_digits=15)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TagUsage',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='usage', serialize=False, to='core.Tag')),
+                ('recipe_count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='ingredientusage',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='tagusage',
+            index=models.Index(fields=['user', '-recipe_count', 'tag'], name='core_tagusa_user_id_74de4e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ingredientusage',
+            index=models.Index(fields=['user', '-recipe_count', 'ingredient'], name='core_ingred_user_id_6dade4_idx'),
+        ),
+        migrations.RunSQL(
+            [RECIPE_STATS_TRIGGERS] + [
+                USAGE_TRIGGERS.format(model=model, table=table)
+                for model, table in (('tag', 'tags'),
+                                     ('ingredient', 'ingredients'))
+            ] + BACKFILL,
+            ['DROP FUNCTION core_ingredient_usage() CASCADE',
+             'DROP FUNCTION core_tag_usage() CASCADE',
+             'DROP FUNCTION core_recipe_stats() CASCADE'],
+        ),
+    ]
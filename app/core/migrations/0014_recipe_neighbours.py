@@ -0,0 +1,24 @@
+# Generated by Django 2.1.15 on 2026-10-18 07:21
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_recipe_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeNeighbours',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='neighbours', serialize=False, to='core.Recipe')),
+                ('metric', models.CharField(max_length=16)),
+                ('versions', django.contrib.postgres.fields.jsonb.JSONField(default=list)),
+                ('neighbours', django.contrib.postgres.fields.jsonb.JSONField(default=list)),
+            ],
+        ),
+    ]
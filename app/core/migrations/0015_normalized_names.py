@@ -0,0 +1,113 @@
+# Generated by Django 2.1.15 on 2026-10-18 07:25
+
+from django.db import migrations, models
+
+
+# names compare trimmed, with runs of whitespace collapsed, lowercased,
+# see recipe.names
+NORMALIZE_FUNCTION = """
+CREATE FUNCTION core_normalize_name(text) RETURNS text
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT lower(regexp_replace(
+        regexp_replace($1, '^\\s+|\\s+$', '', 'g'), '\\s+', ' ', 'g'))
+$$
+"""
+
+# every write of a row normalises its name, whatever the client sent
+NORMALIZE_TRIGGER = """
+CREATE FUNCTION core_{model}_normalize_name() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.normalized_name := core_normalize_name(NEW.name);
+    RETURN NEW;
+END
+$$;
+CREATE TRIGGER core_{model}_normalize_name
+BEFORE INSERT OR UPDATE ON core_{model}
+FOR EACH ROW EXECUTE PROCEDURE core_{model}_normalize_name();
+UPDATE core_{model} SET normalized_name = core_normalize_name(name);
+"""
+
+DROP_NORMALIZE_TRIGGER = """
+DROP TRIGGER core_{model}_normalize_name ON core_{model};
+DROP FUNCTION core_{model}_normalize_name();
+"""
+
+# existing duplicates merge into the oldest row of their name, their recipe
+# links move to it and the summaries of the recipes are rebuilt; the link
+# triggers move the usage counters and search vectors
+MERGE_DUPLICATES = """
+CREATE TEMP TABLE merged_{model} AS
+SELECT id, keep FROM (
+    SELECT id, first_value(id) OVER (
+        PARTITION BY user_id, normalized_name ORDER BY id) AS keep
+    FROM core_{model}
+) x WHERE id <> keep;
+CREATE TEMP TABLE merged_{model}_recipes AS
+SELECT DISTINCT l.recipe_id FROM core_recipe_{table} l
+JOIN merged_{model} m ON m.id = l.{model}_id;
+INSERT INTO core_recipe_{table} (recipe_id, {model}_id)
+SELECT DISTINCT l.recipe_id, m.keep FROM core_recipe_{table} l
+JOIN merged_{model} m ON m.id = l.{model}_id
+ON CONFLICT (recipe_id, {model}_id) DO NOTHING;
+DELETE FROM core_recipe_{table} l USING merged_{model} m
+WHERE l.{model}_id = m.id;
+DELETE FROM core_{model}usage u USING merged_{model} m
+WHERE u.{model}_id = m.id;
+DELETE FROM core_{model} x USING merged_{model} m WHERE x.id = m.id;
+UPDATE core_recipesummary s SET {table} = coalesce((
+    SELECT jsonb_agg(jsonb_build_object('id', x.id, 'name', x.name)
+                     ORDER BY x.id)
+    FROM core_recipe_{table} l JOIN core_{model} x ON x.id = l.{model}_id
+    WHERE l.recipe_id = s.recipe_id), '[]'::jsonb)
+WHERE s.recipe_id IN (SELECT recipe_id FROM merged_{model}_recipes);
+DROP TABLE merged_{model}, merged_{model}_recipes;
+"""
+
+# the deferred foreign key checks of the deletes run before the constraints
+# are added, ALTER TABLE refuses tables with pending trigger events
+CHECK_CONSTRAINTS = 'SET CONSTRAINTS ALL IMMEDIATE'
+
+MODELS = (('tag', 'tags'), ('ingredient', 'ingredients'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_recipe_neighbours'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='normalized_name',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='normalized_name',
+            field=models.CharField(default='', editable=False, max_length=255),
+        ),
+        migrations.RunSQL(
+            [NORMALIZE_FUNCTION] + [
+                NORMALIZE_TRIGGER.format(model=model)
+                for model, table in MODELS
+            ],
+            [DROP_NORMALIZE_TRIGGER.format(model=model)
+             for model, table in reversed(MODELS)] +
+            ['DROP FUNCTION core_normalize_name(text)'],
+        ),
+        migrations.RunSQL(
+            [MERGE_DUPLICATES.format(model=model, table=table)
+             for model, table in MODELS] + [CHECK_CONSTRAINTS],
+            migrations.RunSQL.noop,
+        ),
+        migrations.AlterUniqueTogether(
+            name='ingredient',
+            unique_together={('user', 'normalized_name')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='tag',
+            unique_together={('user', 'normalized_name')},
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 2.1.15 on 2026-10-18 12:40
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# neighbours are stored per recipe and metric, the table is recreated rather
+# than moving its primary key, precompute_similar_recipes fills it again
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_normalized_names'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='RecipeNeighbours',
+        ),
+        migrations.CreateModel(
+            name='RecipeNeighbours',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=16)),
+                ('versions', django.contrib.postgres.fields.jsonb.JSONField(default=list)),
+                ('neighbours', django.contrib.postgres.fields.jsonb.JSONField(default=list)),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbours', to='core.Recipe')),
+            ],
+            options={
+                'unique_together': {('recipe', 'metric')},
+            },
+        ),
+    ]
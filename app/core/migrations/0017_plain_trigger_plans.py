@@ -0,0 +1,98 @@
+# Generated by Django 2.1.15 on 2026-10-18 13:05
+
+from importlib import import_module
+
+from django.db import migrations
+
+
+search = import_module('core.migrations.0010_recipe_search')
+stats = import_module('core.migrations.0013_recipe_stats')
+
+MODELS = (('tag', 'tags'), ('ingredient', 'ingredients'))
+
+# the search and usage functions of 0010 and 0013 without their session
+# settings, the lookups are plain joins on the indexed link columns
+SEARCH_VECTOR_FUNCTION = """
+CREATE OR REPLACE FUNCTION core_recipe_search_vector(integer, text)
+RETURNS tsvector LANGUAGE sql STABLE AS $$
+    SELECT setweight(to_tsvector('english', coalesce($2, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(x.name, ' ') FROM core_recipe_tags l
+            JOIN core_tag x ON x.id = l.tag_id WHERE l.recipe_id = $1
+        ), '')), 'B') ||
+        setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(x.name, ' ') FROM core_recipe_ingredients l
+            JOIN core_ingredient x ON x.id = l.ingredient_id
+            WHERE l.recipe_id = $1
+        ), '')), 'C')
+$$;
+ALTER FUNCTION core_recipe_search_vector(integer, text) RESET ALL;
+"""
+
+LINKS_FUNCTION = """
+CREATE OR REPLACE FUNCTION core_recipe_search_vector_links()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE core_recipe r
+    SET search_vector = core_recipe_search_vector(r.id, r.title)
+    FROM (SELECT DISTINCT recipe_id FROM changed_links) l
+    WHERE r.id = l.recipe_id;
+    RETURN NULL;
+END
+$$;
+ALTER FUNCTION core_recipe_search_vector_links() RESET ALL;
+"""
+
+RENAME_FUNCTION = """
+CREATE OR REPLACE FUNCTION core_{model}_search_vector_rename()
+RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE core_recipe r
+    SET search_vector = core_recipe_search_vector(r.id, r.title)
+    FROM (
+        SELECT DISTINCT l.recipe_id FROM core_recipe_{table} l
+        JOIN new_rows n ON n.id = l.{model}_id
+        JOIN old_rows o ON o.id = n.id
+        WHERE n.name IS DISTINCT FROM o.name
+    ) l
+    WHERE r.id = l.recipe_id;
+    RETURN NULL;
+END
+$$;
+ALTER FUNCTION core_{model}_search_vector_rename() RESET ALL;
+"""
+
+USAGE_FUNCTION = 'ALTER FUNCTION core_{model}_usage() RESET ALL'
+
+
+def function_only(sql):
+    """the CREATE FUNCTION statement of a migration's sql, as a replace"""
+    create = sql[:sql.index('CREATE TRIGGER')]
+    return create.replace('CREATE FUNCTION', 'CREATE OR REPLACE FUNCTION')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_recipe_neighbours_per_metric'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [SEARCH_VECTOR_FUNCTION, LINKS_FUNCTION] + [
+                RENAME_FUNCTION.format(model=model, table=table)
+                for model, table in MODELS
+            ] + [USAGE_FUNCTION.format(model=model) for model, _ in MODELS],
+            [search.SEARCH_VECTOR_FUNCTION.replace(
+                'CREATE FUNCTION', 'CREATE OR REPLACE FUNCTION'),
+             function_only(search.LINK_TRIGGERS)] + [
+                function_only(search.RENAME_TRIGGER.format(
+                    model=model, table=table))
+                for model, table in MODELS
+            ] + [
+                f'ALTER FUNCTION core_{model}_usage() '
+                f'SET enable_seqscan = off'
+                for model, _ in MODELS
+            ],
+        ),
+    ]
@@ -2,9 +2,14 @@ from django.db import models
 from django.contrib.auth.models import (AbstractBaseUser, BaseUserManager,
                                         PermissionsMixin)
 from django.conf import settings
+from django.contrib.postgres.fields import JSONField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 import uuid
 import os
 
+from core import hashing
+
 
 def recipe_image_file_path(instance, filename):
     """generate file name"""
@@ -46,17 +51,39 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     USERNAME_FIELD = 'email'
 
+    def set_password(self, raw_password):
+        """hash the password, in the hashing pool when enabled"""
+        self.password = hashing.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        """check the password, in the hashing pool when enabled"""
+        def setter(raw_password):
+            self.set_password(raw_password)
+            # the password is stored right away, no change to report
+            self._password = None
+            self.save(update_fields=['password'])
+        return hashing.check_password(raw_password, self.password, setter)
+
 # tag models
 
 
 class Tag(models.Model):
     """tag model"""
     name = models.CharField(max_length=255)
+    # kept by the database, see recipe.names
+    normalized_name = models.CharField(max_length=255, editable=False,
+                                       default='')
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        # per user listings ordered by name
+        indexes = [models.Index(fields=['user', 'name'])]
+        unique_together = ('user', 'normalized_name')
+
     def __str__(self):
         """string repr"""
         return self.name
@@ -67,11 +94,18 @@ class Tag(models.Model):
 class Ingredient(models.Model):
     """ingredients model"""
     name = models.CharField(max_length=255)
+    # kept by the database, see recipe.names
+    normalized_name = models.CharField(max_length=255, editable=False,
+                                       default='')
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
 
+    class Meta:
+        indexes = [models.Index(fields=['user', 'name'])]
+        unique_together = ('user', 'normalized_name')
+
     def __str__(self):
         """string repr"""
         return self.name
@@ -81,6 +115,15 @@ class Ingredient(models.Model):
 
 class Recipe(models.Model):
     """recipe model"""
+    IMAGE_PROCESSING = 'processing'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+    IMAGE_STATUSES = (
+        (IMAGE_PROCESSING, 'processing'),
+        (IMAGE_READY, 'ready'),
+        (IMAGE_FAILED, 'failed'),
+    )
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE
     )
@@ -90,8 +133,129 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # indexed to find the recipes still naming a stored blob
+    image = models.ImageField(null=True, upload_to=recipe_image_file_path,
+                              db_index=True)
+    # resized copies of the image, written by recipe.images
+    image_thumbnail = models.ImageField(null=True, editable=False,
+                                        db_index=True)
+    image_medium = models.ImageField(null=True, editable=False,
+                                     db_index=True)
+    image_status = models.CharField(max_length=16, blank=True,
+                                    choices=IMAGE_STATUSES, editable=False)
+    # title, tag and ingredient names, kept up to date by database triggers
+    # (migration 0010), see recipe.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        # per user listings ordered by id, filtered or ordered by time and
+        # price, the last one covers time and price bounds together
+        indexes = [
+            models.Index(fields=['user', 'id']),
+            models.Index(fields=['user', 'time_minute', 'id']),
+            models.Index(fields=['user', 'price', 'id']),
+            models.Index(fields=['user', 'price', 'time_minute', 'id']),
+            GinIndex(fields=['search_vector']),
+        ]
 
     def __str__(self):
         """string representation"""
         return self.title
+
+
+class RecipeSummary(models.Model):
+    """tag and ingredient ids and names of a recipe, see recipe.summary"""
+    recipe = models.OneToOneField(Recipe, on_delete=models.CASCADE,
+                                  primary_key=True, related_name='summary')
+    # [{"id": .., "name": ..}] in id order
+    tags = JSONField(default=list)
+    ingredients = JSONField(default=list)
+
+    def __str__(self):
+        """string representation"""
+        return f'summary of recipe {self.recipe_id}'
+
+
+class RecipeNeighbours(models.Model):
+    """most similar recipes of a recipe, precomputed, see recipe.similar"""
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE,
+                               related_name='neighbours')
+    metric = models.CharField(max_length=16)
+    # versions of the user's collections they were computed at
+    versions = JSONField(default=list)
+    # [{"id": .., "score": ..}] most similar first
+    neighbours = JSONField(default=list)
+
+    class Meta:
+        unique_together = ('recipe', 'metric')
+
+    def __str__(self):
+        """string representation"""
+        return f'{self.metric} neighbours of recipe {self.recipe_id}'
+
+
+class RecipeStats(models.Model):
+    """recipe counters of a user, kept by database triggers"""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL,
+                                on_delete=models.CASCADE, primary_key=True,
+                                related_name='recipe_stats')
+    recipe_count = models.BigIntegerField(default=0)
+    time_minute_total = models.BigIntegerField(default=0)
+    price_total = models.DecimalField(max_digits=15, decimal_places=2,
+                                      default=0)
+
+    def __str__(self):
+        """string representation"""
+        return f'{self.recipe_count} recipes of user {self.user_id}'
+
+
+class TagUsage(models.Model):
+    """number of recipes linking a tag, kept by database triggers"""
+    tag = models.OneToOneField(Tag, on_delete=models.CASCADE,
+                               primary_key=True, related_name='usage')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+                             on_delete=models.CASCADE)
+    recipe_count = models.IntegerField(default=0)
+
+    class Meta:
+        # most used tags of a user
+        indexes = [models.Index(fields=['user', '-recipe_count', 'tag'])]
+
+    def __str__(self):
+        """string representation"""
+        return f'tag {self.tag_id} in {self.recipe_count} recipes'
+
+
+class IngredientUsage(models.Model):
+    """number of recipes linking an ingredient, kept by database triggers"""
+    ingredient = models.OneToOneField(Ingredient, on_delete=models.CASCADE,
+                                      primary_key=True, related_name='usage')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+                             on_delete=models.CASCADE)
+    recipe_count = models.IntegerField(default=0)
+
+    class Meta:
+        # most used ingredients of a user
+        indexes = [
+            models.Index(fields=['user', '-recipe_count', 'ingredient'])]
+
+    def __str__(self):
+        """string representation"""
+        return (f'ingredient {self.ingredient_id} in '
+                f'{self.recipe_count} recipes')
+
+
+class CollectionVersion(models.Model):
+    """write counter of a user's collection or object, drives api etags"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE
+    )
+    collection = models.CharField(max_length=64)
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'collection')
+
+    def __str__(self):
+        """string representation"""
+        return f'{self.collection} v{self.version}'
@@ -0,0 +1,124 @@
+"""helpers shared by the benchmark and query inspection commands"""
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Tag, Ingredient, Recipe, RecipeSummary
+from recipe.summary import REFRESH_BATCH_SIZE, refresh_summaries
+
+
+def viewset_queryset(viewset_class, user, params=None, action='list'):
+    """queryset a viewset builds for a GET request of the user"""
+    request = Request(APIRequestFactory().get('/', params or {}))
+    request.user = user
+    view = viewset_class(request=request, action=action,
+                         format_kwarg=None, kwargs={})
+    return view.get_queryset()
+
+
+def zipf_weights(count, skew):
+    """weights of a zipf distribution over count ranks"""
+    return [1 / (rank ** skew) for rank in range(1, count + 1)]
+
+
+def seed_user(email='bench@bench.com'):
+    """create the user owning the seeded rows"""
+    return get_user_model().objects.create_user(email, 'benchpass')
+
+
+# words of the seeded titles and names when they have to be searchable
+FOOD_WORDS = (
+    'chicken', 'beef', 'pork', 'lamb', 'salmon', 'tuna', 'prawn', 'tofu',
+    'egg', 'rice', 'noodle', 'pasta', 'bread', 'potato', 'tomato', 'onion',
+    'garlic', 'ginger', 'chilli', 'pepper', 'carrot', 'spinach', 'mushroom',
+    'lentil', 'chickpea', 'bean', 'cheese', 'butter', 'cream', 'yogurt',
+    'lemon', 'lime', 'mango', 'apple', 'banana', 'coconut', 'almond',
+    'walnut', 'honey', 'chocolate', 'vanilla', 'cinnamon', 'saffron',
+    'cumin', 'basil', 'mint', 'curry', 'soup', 'salad', 'stew', 'roast',
+    'grilled', 'fried', 'baked', 'spicy', 'creamy', 'smoky', 'sweet',
+    'sour', 'crispy', 'pie', 'tart', 'cake', 'pudding', 'risotto', 'tacos',
+)
+
+
+def unique_names(names):
+    """names numbered on repeats, names are unique per user"""
+    seen = {}
+    for name in names:
+        seen[name] = seen.get(name, 0) + 1
+        yield name if seen[name] == 1 else f'{name} {seen[name]}'
+
+
+def seed_library(user, recipes, tags, ingredients, per_recipe=5, skew=1.2,
+                 seed=0, words=None):
+    """bulk create a recipe library with skewed tag/ingredient usage
+
+    The most popular tag or ingredient is linked to a large share of the
+    recipes, the tail to only a few, like "salt" versus "saffron". With
+    words, titles and names are made of skewed picks of them.
+    """
+    rng = random.Random(seed)
+    if words is None:
+        def name(prefix, i, count):
+            return f'{prefix} {i}'
+    else:
+        word_weights = zipf_weights(len(words), 1)
+
+        def name(prefix, i, count):
+            return ' '.join(rng.choices(words, word_weights, k=count))
+    Tag.objects.bulk_create(
+        [Tag(user=user, name=tag_name) for tag_name in unique_names(
+            name('tag', i, 1) for i in range(tags))])
+    Ingredient.objects.bulk_create(
+        [Ingredient(user=user, name=ingredient_name)
+         for ingredient_name in unique_names(
+            name('ingredient', i, 2) for i in range(ingredients))])
+    Recipe.objects.bulk_create(
+        [Recipe(user=user, title=name('recipe', i, 3),
+                time_minute=rng.randint(5, 240),
+                price=rng.randint(100, 99999) / 100)
+         for i in range(recipes)],
+        batch_size=5000)
+
+    recipe_ids = list(Recipe.objects.filter(
+        user=user).values_list('id', flat=True))
+    for model, related, field in (
+            (Recipe.tags.through, Tag, 'tag_id'),
+            (Recipe.ingredients.through, Ingredient, 'ingredient_id')):
+        related_ids = list(related.objects.filter(
+            user=user).order_by('id').values_list('id', flat=True))
+        weights = zipf_weights(len(related_ids), skew)
+        links = []
+        for recipe_id in recipe_ids:
+            picked = set(rng.choices(related_ids, weights, k=per_recipe))
+            links.extend(model(recipe_id=recipe_id, **{field: related_id})
+                         for related_id in picked)
+        model.objects.bulk_create(links, batch_size=10000)
+    for start in range(0, len(recipe_ids), REFRESH_BATCH_SIZE):
+        refresh_summaries(recipe_ids[start:start + REFRESH_BATCH_SIZE])
+    analyze_tables()
+    return recipe_ids
+
+
+def analyze_tables():
+    """refresh planner statistics after seeding"""
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for model in (Tag, Ingredient, Recipe, Recipe.tags.through,
+                      Recipe.ingredients.through, RecipeSummary):
+            cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+
+def timed(func, repeat):
+    """median and best wall time of func in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), min(timings)
@@ -0,0 +1,109 @@
+"""api renderers and parsers backed by orjson and msgpack
+
+Both libraries are optional. Without orjson the json classes behave like
+the DRF ones they extend, the msgpack classes are only listed in the
+settings when msgpack is installed.
+"""
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# non str keys as the stdlib encoder, datetimes through the DRF encoder
+ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                  if orjson else 0)
+
+
+def is_utf8(encoding):
+    return encoding.lower().replace('-', '').replace('_', '') == 'utf8'
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer encoding with orjson when it is installed
+
+    Types orjson does not know, like Decimal or lazy strings, go through
+    the DRF encoder. Indented output and non default json settings are left
+    to the stdlib encoder.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii or
+                not self.compact or not self.strict or
+                self.get_indent(accepted_media_type,
+                                renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default,
+                               option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # integers over 64 bits and other values only the stdlib takes
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        # escaped like JSONRenderer to keep the output a javascript subset
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser decoding with orjson when it is installed"""
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            data = stream.read()
+            return orjson.loads(data if is_utf8(encoding)
+                                else data.decode(encoding))
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class MessagePackRenderer(BaseRenderer):
+    """compact binary representation for service to service clients"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+    encoder_class = JSONRenderer.encoder_class
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImproperlyConfigured('MessagePackRenderer needs msgpack')
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=self.encoder_class().default,
+                             use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    """parses request bodies sent as msgpack"""
+    media_type = 'application/msgpack'
+    renderer_class = MessagePackRenderer
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImproperlyConfigured('MessagePackParser needs msgpack')
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, TypeError, msgpack.UnpackException) as exc:
+            raise ParseError('MessagePack parse error - %s' % str(exc))
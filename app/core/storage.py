@@ -0,0 +1,110 @@
+"""content addressed storage of the uploaded media
+
+Files are named by the sha256 of their content, so the same photo uploaded
+for many recipes is stored once. A blob is shared by every recipe naming it
+and only removed once no recipe does, see `release_recipe_images` and the
+`gc_media` command.
+"""
+import hashlib
+import os
+import tempfile
+import time
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db.models import Q
+
+from core.models import Recipe
+
+
+# fields of Recipe naming a blob
+IMAGE_FIELDS = ('image', 'image_thumbnail', 'image_medium')
+
+# seconds a blob stays after its last write, an upload of the same content
+# may be about to commit a reference to it
+RELEASE_GRACE = 60
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """file system storage naming every file by its content hash
+
+    The directory and extension of the requested name are kept, the file
+    goes to `<directory>/ab/cd/abcd<...><extension>`. Saving content that
+    is already stored only refreshes the blob's modification time.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # the final name is only known once the content is hashed
+        return name
+
+    def _save(self, name, content):
+        directory, basename = os.path.split(name)
+        extension = os.path.splitext(basename)[1].lower()
+        os.makedirs(self.path(directory), exist_ok=True)
+
+        if hasattr(content, 'temporary_file_path'):
+            # already spooled to disk by the upload handler, hash in place
+            digest = hashlib.sha256()
+            for chunk in content.chunks():
+                digest.update(chunk)
+            return self._store(directory, digest.hexdigest(), extension,
+                               content.temporary_file_path())
+
+        fd, temp_path = tempfile.mkstemp(dir=self.path(directory),
+                                         prefix='.upload-')
+        try:
+            digest = hashlib.sha256()
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+            return self._store(directory, digest.hexdigest(), extension,
+                               temp_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _store(self, directory, digest, extension, source_path):
+        """move the source into place unless the blob exists"""
+        name = '/'.join(filter(None, (directory.replace('\\', '/'),
+                                      digest[:2], digest[2:4],
+                                      digest + extension)))
+        path = self.path(name)
+        if os.path.exists(path):
+            os.utime(path)
+            return name
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        file_move_safe(source_path, path, allow_overwrite=True)
+        os.chmod(path, self.file_permissions_mode or 0o644)
+        return name
+
+    def delete_stale(self, name, min_age):
+        """delete the blob unless it was written in the last min_age seconds
+        """
+        try:
+            if time.time() - os.path.getmtime(self.path(name)) < min_age:
+                return False
+        except FileNotFoundError:
+            return False
+        self.delete(name)
+        return True
+
+
+def image_references(names):
+    """recipes naming any of the blobs"""
+    query = Q()
+    for field in IMAGE_FIELDS:
+        query |= Q(**{f'{field}__in': names})
+    return Recipe.objects.filter(query)
+
+
+def release_recipe_images(names, storage=None):
+    """delete the blobs no recipe names anymore"""
+    storage = storage or default_storage
+    names = {name for name in names if name}
+    if not names or not hasattr(storage, 'delete_stale'):
+        return
+    for recipe in image_references(names).values_list(*IMAGE_FIELDS):
+        names.difference_update(recipe)
+    for name in names:
+        storage.delete_stale(name, RELEASE_GRACE)
@@ -0,0 +1,49 @@
+import time
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from core.cache import LocalLRUCache
+
+
+class LocalLRUCacheTests(SimpleTestCase):
+    """size bounded in process cache"""
+
+    def test_evicts_least_recently_used(self):
+        """entries over the size budget are evicted oldest first"""
+        cache = LocalLRUCache(max_bytes=10)
+        cache.set('a', 1, size=4)
+        cache.set('b', 2, size=4)
+        cache.get('a')
+        cache.set('c', 3, size=4)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.size, 8)
+
+    def test_oversized_value_not_stored(self):
+        """a value larger than the budget is skipped"""
+        cache = LocalLRUCache(max_bytes=10)
+        cache.set('a', 1, size=11)
+
+        self.assertEqual(len(cache), 0)
+
+    def test_add_keeps_existing(self):
+        """add only stores missing keys"""
+        cache = LocalLRUCache()
+
+        self.assertEqual(cache.add('a', 1), 1)
+        self.assertEqual(cache.add('a', 2), 1)
+
+    def test_timeout(self):
+        """entries expire timeout seconds after being set"""
+        cache = LocalLRUCache(timeout=60)
+        cache.set('a', 1)
+        cache.add('b', 2)
+
+        with patch('core.cache.time.monotonic',
+                   return_value=time.monotonic() + 61):
+            self.assertIsNone(cache.get('a'))
+            self.assertEqual(cache.add('b', 3), 3)
+        self.assertEqual(len(cache), 1)
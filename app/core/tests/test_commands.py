@@ -1,9 +1,17 @@
+from io import StringIO
 from unittest.mock import patch
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core.models import (Ingredient, IngredientUsage, Recipe,
+                         RecipeNeighbours, RecipeStats, RecipeSummary, Tag,
+                         TagUsage)
+
 
 class CommandsTestCase(TestCase):
 
@@ -23,3 +31,167 @@ class CommandsTestCase(TestCase):
             gi.side_effect = [OperationalError] * 5 + [True]
             call_command('wait_for_db')
             self.assertEqual(gi.call_count, 6)
+
+    def test_explain_queries(self):
+        """Test explaining the canonical viewset queries"""
+        user = get_user_model().objects.create_user('ex@ex.com', 'expass')
+        user.recipe_set.create(title='Dal', time_minute=20, price=2.00)
+        out = StringIO()
+
+        call_command('explain_queries', email='ex@ex.com', stdout=out)
+
+        self.assertIn('tags assigned_only', out.getvalue())
+        self.assertIn('recipe detail', out.getvalue())
+
+    def test_bench_login(self):
+        """Test the login benchmark reports every case"""
+        out = StringIO()
+
+        call_command('bench_login', logins=1, iterations=1000, stdout=out)
+
+        self.assertIn('iterations: 1000', out.getvalue())
+        self.assertIn('unknown email', out.getvalue())
+
+    def test_bench_media(self):
+        """Test the media benchmark compares both routes"""
+        out = StringIO()
+
+        call_command('bench_media', size=1024, requests=2, repeat=1,
+                     stdout=out)
+
+        self.assertIn('static() serve', out.getvalue())
+        self.assertIn('serve_media range', out.getvalue())
+
+    def test_bench_serializers(self):
+        """Test the serializer benchmark times both paths"""
+        out, err = StringIO(), StringIO()
+
+        call_command('bench_serializers', recipes=20, tags=5, ingredients=5,
+                     repeat=1, stdout=out, stderr=err)
+
+        self.assertIn('RecipeDetailSerializer', out.getvalue())
+        self.assertIn('fast path', out.getvalue())
+        self.assertEqual(err.getvalue(), '')
+
+    def test_bench_renderers(self):
+        """Test the renderer benchmark times every renderer"""
+        out = StringIO()
+
+        call_command('bench_renderers', recipes=5, repeat=1, stdout=out)
+
+        self.assertIn('5 recipes', out.getvalue())
+        self.assertIn('drf json', out.getvalue())
+
+    def test_bench_search(self):
+        """Test the search benchmark times every search"""
+        out = StringIO()
+
+        call_command('bench_search', recipes=20, tags=5, ingredients=5,
+                     repeat=1, stdout=out)
+
+        self.assertIn('TagViewSet', out.getvalue())
+        self.assertIn("'chikcen'", out.getvalue())
+
+    def test_bench_recipe_filters(self):
+        """Test the filter benchmark times queries with and without indexes"""
+        out = StringIO()
+
+        call_command('bench_recipe_filters', recipes=20, tags=5,
+                     ingredients=5, repeat=1, stdout=out)
+
+        self.assertIn('without indexes', out.getvalue())
+        self.assertIn('quick, cheap, rare tag', out.getvalue())
+
+    def test_check_and_rebuild_recipe_summaries(self):
+        """Test stale summaries are reported, fixed and rebuilt"""
+        user = get_user_model().objects.create_user('s@s.com', 'pass')
+        recipe = Recipe.objects.create(user=user, title='dal',
+                                       time_minute=30, price='3.00')
+        recipe.tags.add(Tag.objects.create(user=user, name='vegan'))
+        RecipeSummary.objects.filter(recipe=recipe).update(tags=[])
+        out = StringIO()
+
+        with self.assertRaises(CommandError):
+            call_command('check_recipe_summaries', stdout=out)
+        self.assertIn(f'recipe {recipe.id}', out.getvalue())
+        call_command('check_recipe_summaries', fix=True, stdout=out)
+        call_command('check_recipe_summaries', stdout=out)
+        RecipeSummary.objects.all().delete()
+        call_command('rebuild_recipe_summaries', stdout=out)
+
+        self.assertIn('Rebuilt 1 recipe summaries', out.getvalue())
+        self.assertEqual(RecipeSummary.objects.get().tags[0]['name'],
+                         'vegan')
+
+    def test_reconcile_recipe_stats(self):
+        """Test drifted counters are recomputed from the rows"""
+        user = get_user_model().objects.create_user('r@r.com', 'pass')
+        recipe = Recipe.objects.create(user=user, title='dal',
+                                       time_minute=30, price='3.00')
+        tag = Tag.objects.create(user=user, name='vegan')
+        recipe.tags.add(tag)
+        RecipeStats.objects.filter(user=user).update(recipe_count=7)
+        TagUsage.objects.filter(tag=tag).update(recipe_count=0)
+        out = StringIO()
+
+        call_command('reconcile_recipe_stats', stdout=out)
+        call_command('reconcile_recipe_stats', users=[user.id], stdout=out)
+
+        self.assertIn(f'user {user.id}: 2 counters', out.getvalue())
+        self.assertIn('Corrected 0 counters of 1 users', out.getvalue())
+        self.assertEqual(RecipeStats.objects.get(user=user).recipe_count, 1)
+        self.assertEqual(TagUsage.objects.get(tag=tag).recipe_count, 1)
+
+    def test_bench_pantry(self):
+        """Test the pantry benchmark ranks through the index and in SQL"""
+        out = StringIO()
+        err = StringIO()
+
+        call_command('bench_pantry', recipes=30, ingredients=10,
+                     per_recipe=3, pantry_sizes=[2], repeat=1, stdout=out,
+                     stderr=err)
+
+        self.assertIn('pantry of 2 ingredients', out.getvalue())
+        self.assertEqual(err.getvalue(), '')
+
+    def test_precompute_similar_recipes(self):
+        """Test neighbours are stored for every recipe of the users"""
+        user = get_user_model().objects.create_user('n@n.com', 'pass')
+        tag = Tag.objects.create(user=user, name='vegan')
+        for title in ('dal', 'khichdi'):
+            Recipe.objects.create(user=user, title=title, time_minute=30,
+                                  price='3.00').tags.add(tag)
+        out = StringIO()
+
+        call_command('precompute_similar_recipes', metric='cosine',
+                     stdout=out)
+
+        self.assertIn('Stored neighbours of 2 recipes of 1 users',
+                      out.getvalue())
+        self.assertEqual(
+            [row.neighbours[0]['score'] for row in
+             RecipeNeighbours.objects.filter(metric='cosine')], [1.0, 1.0])
+
+    def test_merge_duplicate_names(self):
+        """Test names clashing under a new normalisation are merged"""
+        user = get_user_model().objects.create_user('m@m.com', 'pass')
+        tomato = Ingredient.objects.create(user=user, name='tomato')
+        tomatoes = Ingredient.objects.create(user=user, name='Tomatoes')
+        recipe = Recipe.objects.create(user=user, title='salsa',
+                                       time_minute=5, price='2.00')
+        recipe.ingredients.add(tomato, tomatoes)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE OR REPLACE FUNCTION core_normalize_name(text) "
+                "RETURNS text LANGUAGE sql IMMUTABLE AS "
+                "$$ SELECT regexp_replace(lower($1), 'e?s$', '') $$")
+        out = StringIO()
+
+        call_command('merge_duplicate_names', stdout=out)
+
+        self.assertIn(f'user {user.id}: merged 1 ingredients', out.getvalue())
+        self.assertEqual(list(recipe.ingredients.all()), [tomato])
+        self.assertEqual(RecipeSummary.objects.get(recipe=recipe).ingredients,
+                         [{'id': tomato.id, 'name': 'tomato'}])
+        self.assertEqual(IngredientUsage.objects.get(
+            ingredient=tomato).recipe_count, 1)
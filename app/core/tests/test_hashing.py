@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.hashing import HashingUnavailable, get_hashing_pool
+
+
+CREATE_USER_URL = reverse('user:create')
+TOKEN_URL = reverse('user:token')
+
+
+class HashingPoolTests(TestCase):
+    """password hashing in the process pool"""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_disabled_by_default(self):
+        """without workers hashing stays on the request thread"""
+        with override_settings(PASSWORD_HASHING_POOL={'WORKERS': 0}):
+            self.assertIsNone(get_hashing_pool())
+
+    @override_settings(PASSWORD_HASHING_POOL={'WORKERS': 1},
+                       PASSWORD_HASHER_ITERATIONS=1000)
+    def test_signup_and_login_in_pool(self):
+        """users created and logged in through the pool"""
+        payload = {'email': 'pool@test.com', 'password': 'testpass'}
+        user = get_user_model().objects.create_user(**payload)
+
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertIn('$1000$', user.password)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(user.check_password('testpass'))
+        self.assertFalse(user.check_password('wrongpass'))
+
+    @override_settings(PASSWORD_HASHING_POOL={'WORKERS': 1,
+                                              'MAX_PENDING': 0})
+    def test_saturated_pool_rejects(self):
+        """a full queue answers with 503 instead of waiting"""
+        with self.assertRaises(HashingUnavailable):
+            get_user_model()().set_password('testpass')
+
+        res = self.client.post(CREATE_USER_URL, {
+            'email': 'busy@test.com', 'password': 'testpass', 'name': 'busy'})
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_503_SERVICE_UNAVAILABLE)
@@ -0,0 +1,118 @@
+import datetime
+import io
+import json
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core import renderers
+from core.models import Recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class FastJSONTests(TestCase):
+    """the fast json renderer and parser match the DRF ones"""
+
+    data = {
+        'price': Decimal('5.50'),
+        'title': 'crème brûlée  ',
+        'created': datetime.datetime(2020, 1, 2, 3, 4, 5, 678901,
+                                     tzinfo=datetime.timezone.utc),
+        'label': gettext_lazy('Recipe'),
+        'counts': {1: 2},
+        'image': 'http://testserver/media/uploads/recipe/ab/abcd.jpg',
+        'big': 2 ** 70,
+    }
+
+    def test_render_matches_json_renderer(self):
+        """Decimal, lazy strings, datetimes and escapes"""
+        for key in self.data:
+            value = {key: self.data[key]}
+            self.assertEqual(renderers.FastJSONRenderer().render(value),
+                             JSONRenderer().render(value))
+
+    def test_render_indent(self):
+        """indented output is left to the stdlib encoder"""
+        media_type = 'application/json; indent=4'
+        self.assertEqual(
+            renderers.FastJSONRenderer().render(self.data, media_type),
+            JSONRenderer().render(self.data, media_type))
+
+    def test_parse(self):
+        """bodies in utf-8 or another charset, errors are ParseError"""
+        parser = renderers.FastJSONParser()
+        body = json.dumps({'title': 'crème', 'tags': [1, 2]})
+
+        self.assertEqual(parser.parse(io.BytesIO(body.encode())),
+                         {'title': 'crème', 'tags': [1, 2]})
+        self.assertEqual(
+            parser.parse(io.BytesIO(body.encode('latin-1')),
+                         parser_context={'encoding': 'latin-1'}),
+            {'title': 'crème', 'tags': [1, 2]})
+        with self.assertRaises(ParseError):
+            parser.parse(io.BytesIO(b'{"title": '))
+
+
+@skipUnless(renderers.msgpack, 'msgpack is not installed')
+class MessagePackApiTests(TestCase):
+    """msgpack is negotiated for clients asking for it"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'pack@some.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_as_msgpack(self):
+        """the msgpack body holds the json representation"""
+        recipe = Recipe.objects.create(user=self.user, title='Dal',
+                                       time_minute=20, price='2.5')
+        recipe.image = 'uploads/recipe/ab/cd/abcd.jpg'
+        recipe.save()
+        url = reverse('recipe:recipe-detail', args=[recipe.id])
+
+        res = self.client.get(url, HTTP_ACCEPT='application/msgpack')
+        expected = self.client.get(url, HTTP_ACCEPT='application/json')
+
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        self.assertEqual(renderers.msgpack.unpackb(res.content),
+                         json.loads(expected.content))
+        self.assertEqual(renderers.msgpack.unpackb(res.content)['image'],
+                         'http://testserver/media/uploads/recipe/ab/cd/'
+                         'abcd.jpg')
+
+    def test_create_from_msgpack(self):
+        """msgpack request bodies are parsed"""
+        tag = Tag.objects.create(user=self.user, name='vegan')
+        body = renderers.msgpack.packb({
+            'title': 'Dal', 'time_minute': 20, 'price': '2.50',
+            'tags': [tag.id], 'ingredients': [],
+        })
+
+        res = self.client.post(RECIPES_URL, body,
+                               content_type='application/msgpack',
+                               HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(renderers.msgpack.unpackb(res.content)['price'],
+                         '2.50')
+        self.assertEqual(Recipe.objects.get().tags.get(), tag)
+
+    def test_invalid_msgpack(self):
+        """broken bodies are a bad request"""
+        res = self.client.post(RECIPES_URL, b'\xc1',
+                               content_type='application/msgpack')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
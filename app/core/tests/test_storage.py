@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.models import Recipe
+from core.storage import release_recipe_images
+
+
+def age(name, seconds=7200):
+    """backdate the last write of a blob"""
+    past = time.time() - seconds
+    os.utime(default_storage.path(name), (past, past))
+
+
+class ContentAddressedStorageTests(TestCase):
+    """blobs named by content, shared and collected"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+        self.user = get_user_model().objects.create_user('cas@cas.com',
+                                                         'caspass')
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root)
+
+    def recipe(self, image):
+        return Recipe.objects.create(user=self.user, title='soup',
+                                     time_minute=5, price=1, image=image)
+
+    def test_identical_content_is_stored_once(self):
+        """the same bytes get the same fanned out name"""
+        first = default_storage.save('uploads/recipe/a.JPG',
+                                     ContentFile(b'photo'))
+        second = default_storage.save('uploads/recipe/b.jpg',
+                                      ContentFile(b'photo'))
+        other = default_storage.save('uploads/recipe/c.jpg',
+                                     ContentFile(b'other photo'))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        digest = os.path.basename(first)[:-4]
+        self.assertEqual(first, f'uploads/recipe/{digest[:2]}/'
+                                f'{digest[2:4]}/{digest}.jpg')
+        self.assertEqual(len(os.listdir(os.path.dirname(
+            default_storage.path(first)))), 1)
+
+    def test_release_keeps_shared_blobs(self):
+        """a blob is deleted once the last recipe stops naming it"""
+        name = default_storage.save('uploads/recipe/a.jpg',
+                                    ContentFile(b'photo'))
+        age(name)
+        first, second = self.recipe(name), self.recipe(name)
+
+        first.delete()
+        release_recipe_images([name])
+        self.assertTrue(default_storage.exists(name))
+
+        second.delete()
+        release_recipe_images([name])
+        self.assertFalse(default_storage.exists(name))
+
+    def test_gc_media_removes_orphans(self):
+        """only unreferenced blobs past the minimum age are removed"""
+        kept = default_storage.save('uploads/recipe/a.jpg',
+                                    ContentFile(b'kept'))
+        orphan = default_storage.save('uploads/recipe/b.jpg',
+                                      ContentFile(b'orphan'))
+        recent = default_storage.save('uploads/recipe/c.jpg',
+                                      ContentFile(b'recent'))
+        self.recipe(kept)
+        age(kept)
+        age(orphan)
+        out = StringIO()
+
+        call_command('gc_media', stdout=out)
+
+        self.assertTrue(default_storage.exists(kept))
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertTrue(default_storage.exists(recent))
+        self.assertIn('Removed 1 blobs', out.getvalue())
@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.http import http_date
+
+HASHED = 'uploads/recipe/ab/cd/' + 'abcd' * 16 + '.jpg'
+
+
+class ServeMediaTests(TestCase):
+    """media files served with ranges and cache headers"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media_root)
+        self.override.enable()
+        self.content = bytes(range(256)) * 4
+        for name in (HASHED, 'plain.jpg'):
+            path = os.path.join(self.media_root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(self.content)
+        self.mtime = os.stat(os.path.join(self.media_root, HASHED)).st_mtime
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root)
+
+    def get(self, name, **headers):
+        return self.client.get(reverse('media', args=[name]), **headers)
+
+    def test_full_file(self):
+        """content addressed files are cached for good"""
+        res = self.get(HASHED)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), self.content)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertIn('immutable', res['Cache-Control'])
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+        self.assertNotIn('immutable', self.get('plain.jpg')['Cache-Control'])
+
+    def test_byte_ranges(self):
+        """single ranges are answered with 206"""
+        res = self.get(HASHED, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(b''.join(res.streaming_content), self.content[10:20])
+        self.assertEqual(res['Content-Range'], 'bytes 10-19/1024')
+
+        res = self.get(HASHED, HTTP_RANGE='bytes=-4')
+        self.assertEqual(b''.join(res.streaming_content), self.content[-4:])
+
+        res = self.get(HASHED, HTTP_RANGE='bytes=2000-')
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res['Content-Range'], 'bytes */1024')
+
+    def test_if_modified_since(self):
+        """an unchanged file is not sent again"""
+        res = self.get(HASHED, HTTP_IF_MODIFIED_SINCE=http_date(self.mtime))
+
+        self.assertEqual(res.status_code, 304)
+
+    @override_settings(MEDIA_SENDFILE='x-accel-redirect')
+    def test_accel_redirect(self):
+        """the body is left to the proxy"""
+        res = self.get(HASHED)
+
+        self.assertEqual(res['X-Accel-Redirect'], '/protected-media/' + HASHED)
+        self.assertEqual(res.content, b'')
+
+    def test_outside_media_root(self):
+        """paths escaping the media root are not found"""
+        self.assertEqual(self.get('../etc/passwd').status_code, 404)
+        self.assertEqual(self.get('missing.jpg').status_code, 404)
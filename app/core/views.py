@@ -1,3 +1,120 @@
-# from django.shortcuts import render
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
 
-# Create your views here.
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseNotModified, StreamingHttpResponse)
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+
+# names given by core.storage, the content behind them never changes
+HASHED_NAME = re.compile(r'(^|/)[0-9a-f]{64}\.\w+$')
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE = 'public, max-age=3600'
+
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """inclusive byte range of a single range header, None to send all
+
+    Raises ValueError when the range lies outside the file.
+    """
+    match = RANGE.match(header or '')
+    if not match or match.groups() == ('', ''):
+        # several ranges or a malformed header, answering 200 is allowed
+        return None
+    first, last = match.groups()
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise ValueError('unsatisfiable range')
+    return start, end
+
+
+def read_range(file, start, length):
+    """stream length bytes of the file from start"""
+    with file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def file_response(request, path, full_path, stats):
+    """body of the file, handed to the proxy when MEDIA_SENDFILE is set"""
+    sendfile = getattr(settings, 'MEDIA_SENDFILE', None)
+    if sendfile == 'x-accel-redirect':
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(path))
+        return response
+    if sendfile == 'x-sendfile':
+        response = HttpResponse()
+        response['X-Sendfile'] = full_path
+        return response
+
+    size = stats.st_size
+    try:
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if byte_range is None or (if_range and
+                              if_range != http_date(stats.st_mtime)):
+        # the server's sendfile takes over the file wrapper
+        return FileResponse(open(full_path, 'rb'))
+
+    start, end = byte_range
+    response = StreamingHttpResponse(
+        read_range(open(full_path, 'rb'), start, end - start + 1),
+        status=206)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(end - start + 1)
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """serve an uploaded file with range and caching support"""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stats = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404('Not found')
+    if not stat.S_ISREG(stats.st_mode):
+        raise Http404('Not found')
+
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'),
+                              stats.st_mtime, stats.st_size):
+        response = HttpResponseNotModified()
+    else:
+        response = file_response(request, path, full_path, stats)
+    if response.status_code in (200, 206):
+        content_type, encoding = mimetypes.guess_type(full_path)
+        response['Content-Type'] = (content_type or
+                                    'application/octet-stream')
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['Last-Modified'] = http_date(stats.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = (
+        IMMUTABLE_CACHE if HASHED_NAME.search(path) else DEFAULT_CACHE)
+    return response
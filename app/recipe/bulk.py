@@ -0,0 +1,270 @@
+from django.db import connections, transaction
+from django.db.models import Case, F, Value, When
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.serializers import as_serializer_error
+
+
+BATCH_SIZE = 1000
+
+
+def batches(items, size=BATCH_SIZE):
+    """split a list into chunks of size"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def bulk_update(queryset, objs, fields_per_obj):
+    """update many rows with one CASE WHEN statement per batch
+
+    fields_per_obj maps each object to the names of the fields it
+    changes, rows keep their current value for the other fields.
+    """
+    model = queryset.model
+    updated = 0
+    for batch in batches(objs):
+        updates = {}
+        names = {name for obj in batch for name in fields_per_obj[obj]}
+        for name in names:
+            field = model._meta.get_field(name)
+            whens = [
+                When(pk=obj.pk, then=Value(getattr(obj, field.attname),
+                                           output_field=field))
+                for obj in batch if name in fields_per_obj[obj]
+            ]
+            updates[field.attname] = Case(*whens, default=F(field.attname),
+                                          output_field=field)
+        if updates:
+            updated += queryset.filter(
+                pk__in=[obj.pk for obj in batch]).update(**updates)
+    return updated
+
+
+def parse_id(value):
+    """integer id of a json int or integer string, None for other values"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            return None
+    return None
+
+
+def extract_ids(data, param='ids'):
+    """list of integer ids from a request body"""
+    if isinstance(data, dict):
+        data = data.get(param)
+    if not isinstance(data, list):
+        raise ValidationError({param: 'Expected a list of ids.'})
+    ids = [parse_id(pk) for pk in data]
+    if None in ids:
+        raise ValidationError({param: 'Expected a list of ids.'})
+    return ids
+
+
+class BulkModelMixin:
+    """bulk create, update and delete through a single `bulk/` route
+
+    POST takes a list of objects, PATCH a list of partial objects with
+    their `id` and DELETE a list of ids. A batch is validated as a whole
+    and written in one transaction, the response holds one result or one
+    error dict per submitted item in submission order.
+    """
+    bulk_max_items = 10000
+    bulk_serializer_class = None
+    # m2m fields written through their through tables:
+    # name -> (related model, through model, through column)
+    bulk_relations = {}
+
+    def get_bulk_serializer(self, *args, **kwargs):
+        serializer_class = (self.bulk_serializer_class or
+                            self.get_serializer_class())
+        kwargs['context'] = self.get_serializer_context()
+        return serializer_class(*args, **kwargs)
+
+    def validate_items(self, pairs, partial=False):
+        """validate (instance, data) pairs with one serializer instance
+
+        Building the fields of a model serializer costs more than
+        validating an item, so they are built once for the whole batch.
+        """
+        serializer = self.get_bulk_serializer(partial=partial)
+        validated, errors = [], []
+        for instance, item in pairs:
+            serializer.instance = instance
+            try:
+                validated.append(serializer.run_validation(item))
+                errors.append({})
+            except ValidationError as exc:
+                validated.append({})
+                errors.append(dict(as_serializer_error(exc)))
+        return validated, errors
+
+    def get_bulk_items(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({'non_field_errors': ['Expected a list.']})
+        if len(items) > self.bulk_max_items:
+            raise ValidationError({'non_field_errors': [
+                f'At most {self.bulk_max_items} items per request.']})
+        return items
+
+    def item_ids(self, items):
+        """id of each item to update and an id error per invalid or repeated
+        id, a repeated id would write its row twice"""
+        ids, errors, seen = [], [], set()
+        for item in items:
+            pk = parse_id(item.get('id')) if isinstance(item, dict) else None
+            if pk is None:
+                errors.append({'id': ['A valid integer is required.']})
+            elif pk in seen:
+                errors.append({'id': ['Duplicate id.']})
+            else:
+                errors.append({})
+            seen.add(pk)
+            ids.append(pk)
+        return ids, errors
+
+    def resolve_relations(self, items, errors):
+        """check every submitted related id with one query per relation"""
+        for name, (model, _, _) in self.bulk_relations.items():
+            submitted = {pk for item in items
+                         for pk in item.get(name) or ()}
+            if not submitted:
+                continue
+            found = set(model.objects.filter(
+                user=self.request.user, pk__in=submitted
+            ).values_list('pk', flat=True))
+            for item, error in zip(items, errors):
+                missing = sorted(set(item.get(name) or ()) - found)
+                if missing:
+                    error[name] = [f'Invalid pk "{pk}" - object does not '
+                                   f'exist.' for pk in missing]
+
+    def write_relations(self, items, objs, replace=False):
+        """insert the through rows of every object in one statement"""
+        for name, (_, through, column) in self.bulk_relations.items():
+            changed = [(item, obj) for item, obj in zip(items, objs)
+                       if name in item]
+            if not changed:
+                continue
+            if replace:
+                through.objects.filter(
+                    recipe_id__in=[obj.pk for _, obj in changed]).delete()
+            through.objects.bulk_create([
+                through(recipe_id=obj.pk, **{f'{column}_id': pk})
+                for item, obj in changed for pk in dict.fromkeys(item[name])
+            ], batch_size=BATCH_SIZE)
+
+    def bulk_response(self, pks, status_code):
+        """serialise the written rows in submission order
+
+        Rows and related ids are read with one query each, instances and
+        per object prefetch caches would cost more than the writes.
+        """
+        rows = {row['id']: row for row in self.queryset.model.objects.filter(
+            pk__in=pks).values()}
+        for name, (_, through, column) in self.bulk_relations.items():
+            for row in rows.values():
+                row[name] = []
+            links = through.objects.filter(recipe_id__in=pks).order_by(
+                f'{column}_id').values_list('recipe_id', f'{column}_id')
+            for recipe_id, related_id in links:
+                rows[recipe_id][name].append(related_id)
+        serializer = self.get_bulk_serializer(
+            [rows[pk] for pk in pks], many=True)
+        return Response(serializer.data, status=status_code)
+
+    @action(methods=['post', 'patch', 'delete'], detail=False,
+            url_path='bulk')
+    def bulk(self, request):
+        """create, update or delete a batch of objects"""
+        if request.method == 'DELETE':
+            return self.bulk_destroy(request)
+        if request.method == 'PATCH':
+            return self.bulk_update(request)
+        return self.bulk_create(request)
+
+    def bulk_create(self, request):
+        items = self.get_bulk_items(request)
+        validated, errors = self.validate_items(
+            [(None, item) for item in items])
+        self.resolve_relations(validated, errors)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        model = self.queryset.model
+        objs = [
+            model(user=request.user, **{
+                name: value for name, value in item.items()
+                if name not in self.bulk_relations
+            })
+            for item in validated
+        ]
+        with transaction.atomic():
+            if connections[model.objects.db].features.\
+                    can_return_ids_from_bulk_insert:
+                objs = model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+            else:
+                # the backend does not report the ids of a bulk insert
+                for obj in objs:
+                    obj.save(force_insert=True)
+            self.write_relations(validated, objs)
+            self.perform_bulk_write([obj.pk for obj in objs])
+        return self.bulk_response([obj.pk for obj in objs],
+                                  status.HTTP_201_CREATED)
+
+    def bulk_update(self, request):
+        items = self.get_bulk_items(request)
+        ids, errors = self.item_ids(items)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        instances = self.get_queryset().filter(pk__in=ids).in_bulk()
+
+        validated, errors = self.validate_items(
+            [(instances.get(pk), item) for pk, item in zip(ids, items)],
+            partial=True)
+        for pk, error in zip(ids, errors):
+            if pk not in instances:
+                error.clear()
+                error['id'] = ['Not found.']
+        self.resolve_relations(validated, errors)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        objs, fields_per_obj = [], {}
+        for item, pk in zip(validated, ids):
+            obj = instances[pk]
+            fields = [name for name in item if name not in self.bulk_relations]
+            for name in fields:
+                setattr(obj, name, item[name])
+            objs.append(obj)
+            fields_per_obj[obj] = fields
+        with transaction.atomic():
+            bulk_update(self.queryset, objs, fields_per_obj)
+            self.write_relations(validated, objs, replace=True)
+            self.perform_bulk_write([obj.pk for obj in objs])
+        return self.bulk_response([obj.pk for obj in objs],
+                                  status.HTTP_200_OK)
+
+    def bulk_destroy(self, request):
+        ids = extract_ids(request.data)
+        with transaction.atomic():
+            pks = list(self.get_queryset().filter(
+                pk__in=ids).values_list('pk', flat=True))
+            self.perform_bulk_delete(pks)
+            self.perform_bulk_write(pks)
+        return Response({'deleted': pks}, status=status.HTTP_200_OK)
+
+    def perform_bulk_delete(self, pks):
+        """delete the rows of a bulk delete inside its transaction"""
+        self.queryset.model.objects.filter(pk__in=pks).delete()
+
+    def perform_bulk_write(self, pks):
+        """hook run inside the transaction after a bulk write"""
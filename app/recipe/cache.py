@@ -0,0 +1,132 @@
+"""per user response cache of the tag and ingredient listings
+
+Entries are keyed by user, collection, host and query params, plus the
+`core.CollectionVersion` counters every write bumps, which all workers
+share, and a version token per user and collection. Invalidating a
+collection drops the token, which also reaches orm writes made outside the
+api in the same process. Either way every cached listing of it becomes
+unreachable at once and ages out of the backend.
+"""
+import json
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.http import urlencode
+from django.utils.module_loading import import_string
+from rest_framework.response import Response
+
+from core.renderers import FastJSONRenderer
+
+
+class ListCache:
+    """cache of serialised list responses with hit/miss counters"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def version(self, user_id, collection):
+        return self.backend.add(f'version:{collection}:{user_id}',
+                                uuid.uuid4().hex, size=64)
+
+    def key(self, request, collection, versions=()):
+        params = urlencode(sorted(request.query_params.lists()), doseq=True)
+        version = '.'.join(map(str, versions))
+        token = self.version(request.user.id, collection)
+        return (f'list:{collection}:{request.user.id}:{version}:{token}:'
+                f'{request.get_host()}:{params}')
+
+    def get(self, key):
+        data = self.backend.get(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def set(self, key, data):
+        # store plain data, serialiser return lists keep their serialiser
+        rendered = FastJSONRenderer().render(data)
+        self.backend.set(key, json.loads(rendered.decode('utf-8')),
+                         size=len(rendered))
+
+    def invalidate(self, user_id, *collections):
+        for collection in collections:
+            self.backend.delete(f'version:{collection}:{user_id}')
+
+    def stats(self):
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+_list_cache = None
+
+
+def get_list_cache():
+    """list cache configured by RECIPE_LIST_CACHE, None when disabled"""
+    global _list_cache
+    if _list_cache is None:
+        config = getattr(settings, 'RECIPE_LIST_CACHE', None)
+        if not config or not config.get('BACKEND'):
+            return None
+        backend = import_string(config['BACKEND'])(
+            **config.get('OPTIONS', {}))
+        _list_cache = ListCache(backend)
+    return _list_cache
+
+
+def invalidate_lists(user_id, *collections):
+    """drop the cached listings of the user's collections
+
+    Dropped now for the reads of the writing transaction and again once it
+    commits, a listing read from the old rows in between is cached under
+    the new token.
+    """
+    cache = get_list_cache()
+    if cache is not None:
+        cache.invalidate(user_id, *collections)
+        transaction.on_commit(
+            lambda: cache.invalidate(user_id, *collections))
+
+
+@receiver(setting_changed)
+def reset_list_cache(setting, **kwargs):
+    global _list_cache
+    if setting == 'RECIPE_LIST_CACHE':
+        _list_cache = None
+
+
+class CachedListMixin:
+    """serve list responses from the list cache
+
+    Goes after `ConditionalGetMixin`, whose `etag_collections` key the
+    listings too: the etag has looked their versions up already, so a hit
+    costs that one query and the version token, no queryset or serialiser.
+    """
+    cache_collection = None
+
+    def list(self, request, *args, **kwargs):
+        cache = get_list_cache()
+        if cache is None:
+            return super().list(request, *args, **kwargs)
+
+        key = cache.key(request, self.cache_collection,
+                        self.collection_versions(self.etag_collections))
+        data = cache.get(key)
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+
+        response = super().list(request, *args, **kwargs)
+        cache.set(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
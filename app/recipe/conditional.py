@@ -0,0 +1,186 @@
+"""conditional GET of the recipe api driven by per user version counters
+
+Every write bumps the counter of the user's collection, and of the written
+objects, in `core.CollectionVersion`: the model signals cover the api, admin
+and ORM writes, the bulk api paths bump for the rows they write in bulk.
+Within an api write the bumps are collected and made once, at the end of the
+request. ETags hash the counters a response depends on with the request, so
+a poll that carries a current ETag is answered with 304 after a single
+lookup of the counters, before any queryset is built.
+"""
+import hashlib
+import threading
+from contextlib import contextmanager
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+from core.models import CollectionVersion
+
+from recipe.bulk import batches
+
+
+# stays below the bound parameter limit of sqlite
+VERSION_BATCH_SIZE = 500
+
+# bumped when recipe links change, assigned_only and usage_count of the tag
+# and ingredient listings follow them rather than every recipe write
+LINK_COLLECTIONS = ('tag_links', 'ingredient_links')
+
+
+def get_versions(user_id, collections):
+    """current version of each collection, 0 when never written"""
+    found = dict(CollectionVersion.objects.filter(
+        user_id=user_id, collection__in=collections
+    ).values_list('collection', 'version'))
+    return [found.get(collection, 0) for collection in collections]
+
+
+def bump_versions(user_id, collections):
+    """increment the counters of the collections with a few queries a batch
+    """
+    versions = CollectionVersion.objects.filter(user_id=user_id)
+    for batch in batches(sorted(set(collections)), VERSION_BATCH_SIZE):
+        for attempt in range(2):
+            try:
+                with transaction.atomic():
+                    existing = set(versions.filter(
+                        collection__in=batch
+                    ).values_list('collection', flat=True))
+                    versions.filter(collection__in=existing).update(
+                        version=F('version') + 1)
+                    CollectionVersion.objects.bulk_create(
+                        CollectionVersion(user_id=user_id,
+                                          collection=collection, version=1)
+                        for collection in batch if collection not in existing
+                    )
+                break
+            except IntegrityError:
+                # a concurrent write created one of the rows, update it now
+                if attempt:
+                    raise
+
+
+def written_collections(collection, pks=()):
+    """the collection and the object counters of the written rows"""
+    return [collection] + [f'{collection}:{pk}' for pk in pks]
+
+
+_batched = threading.local()
+
+
+@contextmanager
+def versions_batched():
+    """collect the bumps of the block and make them once when it ends"""
+    if getattr(_batched, 'bumps', None) is not None:
+        yield
+        return
+    _batched.bumps = {}
+    try:
+        yield
+    finally:
+        bumps, _batched.bumps = _batched.bumps, None
+        for user_id, collections in bumps.items():
+            bump_versions(user_id, collections)
+
+
+def note_versions(user_id, collections):
+    """bump the counters now, or at the end of the enclosing batch"""
+    bumps = getattr(_batched, 'bumps', None)
+    if bumps is None:
+        bump_versions(user_id, collections)
+    else:
+        bumps.setdefault(user_id, set()).update(collections)
+
+
+def etag_matches(header, etag):
+    """whether an If-None-Match header lists the etag"""
+    if not header:
+        return False
+    return any(
+        candidate[2:] == etag if candidate.startswith('W/')
+        else candidate == etag
+        for candidate in parse_etags(header)
+    )
+
+
+class ConditionalGetMixin:
+    """strong etags and 304 responses for list and retrieve
+
+    List etags depend on the `etag_collections`, detail etags on the object
+    counter plus the `etag_object_collections`. Unsafe requests batch the
+    bumps of the signals and of the bulk write hooks, which call
+    `bump_versions`, into one bump at the end of the request.
+    """
+    version_collection = None
+    etag_collections = ('recipe', 'tag', 'ingredient')
+    etag_object_collections = ('tag', 'ingredient')
+
+    def object_collection(self, pk):
+        return f'{self.version_collection}:{pk}'
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return super().dispatch(request, *args, **kwargs)
+        with versions_batched():
+            return super().dispatch(request, *args, **kwargs)
+
+    def bump_versions(self, pks=()):
+        note_versions(self.request.user.id,
+                      written_collections(self.version_collection, pks))
+
+    def collection_versions(self, collections):
+        """versions of the collections, looked up once per request"""
+        known = self.__dict__.setdefault('_collection_versions', {})
+        missing = [collection for collection in collections
+                   if collection not in known]
+        if missing:
+            known.update(zip(missing,
+                             get_versions(self.request.user.id, missing)))
+        return [known[collection] for collection in collections]
+
+    def get_etag(self, collections):
+        request = self.request
+        parts = [request.user.id, request.get_host(), request.get_full_path(),
+                 request.accepted_media_type]
+        parts.extend(self.collection_versions(collections))
+        digest = hashlib.sha1('\n'.join(map(str, parts)).encode('utf-8'))
+        return quote_etag(digest.hexdigest())
+
+    def conditional(self, etag):
+        """304 response when the client holds the etag, None otherwise"""
+        if etag_matches(self.request.META.get('HTTP_IF_NONE_MATCH'), etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers={'ETag': etag})
+        return None
+
+    def tag_response(self, response, etag):
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        etag = self.get_etag(self.etag_collections)
+        not_modified = self.conditional(etag)
+        if not_modified is not None:
+            return not_modified
+        return self.tag_response(
+            super().list(request, *args, **kwargs), etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        # /recipes/05/ is the same recipe, and etag, as /recipes/5/
+        try:
+            pk = int(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except ValueError:
+            raise NotFound()
+        etag = self.get_etag((self.object_collection(pk),) +
+                             tuple(self.etag_object_collections))
+        not_modified = self.conditional(etag)
+        if not_modified is not None:
+            return not_modified
+        return self.tag_response(
+            super().retrieve(request, *args, **kwargs), etag)
@@ -0,0 +1,55 @@
+"""streaming export of a user's recipe library
+
+The queryset is read with a server side cursor and serialised one chunk at
+a time, so memory stays flat however many recipes are exported.
+"""
+from itertools import islice
+
+from django.db.models import prefetch_related_objects
+
+from core.renderers import FastJSONRenderer
+
+
+# content type of every export format
+EXPORT_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+EXPORT_CHUNK_SIZE = 500
+
+
+def chunks(iterable, size):
+    """lists of up to size items of the iterable"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def serialised_recipes(queryset, serializer_class, context,
+                       chunk_size=EXPORT_CHUNK_SIZE):
+    """serialised recipes, prefetching the relations chunk by chunk"""
+    # iterator() skips prefetch_related, the relations are fetched per chunk
+    prefetches = getattr(serializer_class, 'prefetch_lookups', tuple)()
+    for chunk in chunks(queryset.iterator(chunk_size=chunk_size),
+                        chunk_size):
+        prefetch_related_objects(chunk, *prefetches)
+        yield from serializer_class(chunk, many=True, context=context).data
+
+
+def stream_export(items, export_format):
+    """encoded json array or newline delimited json of the items"""
+    renderer = FastJSONRenderer()
+    if export_format == 'ndjson':
+        for item in items:
+            yield renderer.render(item) + b'\n'
+        return
+
+    separator = b'['
+    for item in items:
+        yield separator + renderer.render(item)
+        separator = b','
+    yield b'[]' if separator == b'[' else b']'
@@ -0,0 +1,233 @@
+"""compiled read path of the recipe api serialisers
+
+DRF builds every representation through its field machinery, object by
+object. Here a serialiser class is compiled once per request into
+converters over `.values()` rows, and every many to many field is read with
+one query on its through table, in id order like the eager loading of the
+serialisers. The rendered output is identical to the serialiser's.
+"""
+import decimal
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from recipe.fields import RecipeSummaryField
+
+
+class NotCompilable(TypeError):
+    """the serialiser uses fields the fast path does not know"""
+
+
+def identity(value):
+    return value
+
+
+def decimal_converter(field):
+    """DecimalField.to_representation with the quantize context prepared"""
+    coerce_to_string = getattr(field, 'coerce_to_string',
+                               api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize:
+        return field.to_representation
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    exponent = None
+    if field.decimal_places is not None:
+        exponent = decimal.Decimal('.1') ** field.decimal_places
+    rounding = field.rounding
+
+    def convert(value):
+        if not isinstance(value, decimal.Decimal):
+            value = decimal.Decimal(str(value).strip())
+        if exponent is not None:
+            value = value.quantize(exponent, rounding=rounding,
+                                   context=context)
+        return '{:f}'.format(value)
+    return convert
+
+
+def file_converter(field, model_field, context):
+    """FileField.to_representation from the stored name"""
+    if not getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL):
+        return identity
+    storage = model_field.storage
+    request = context.get('request')
+
+    def convert(name):
+        if not name:
+            return None
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request else url
+    return convert
+
+
+SIMPLE_FIELDS = (serializers.IntegerField, serializers.CharField,
+                 serializers.BooleanField, serializers.FloatField)
+
+# a field read from a column of the row, required when it is a model column
+Column = namedtuple('Column', 'key column convert required')
+# a many to many field read from its through table, nested is None for
+# primary keys or the (key, converter) pairs of the nested columns
+Relation = namedtuple('Relation', 'key through source order columns nested')
+
+
+class CompiledSerializer:
+    """read only serialiser over values() rows
+
+    Fields without a model column, like annotations, are only written when
+    the queryset selects them, as DRF skips missing read only attributes.
+    """
+
+    def __init__(self, serializer_class, context):
+        serializer = serializer_class(context=context)
+        self.model = serializer.Meta.model
+        self.pk = self.model._meta.pk.attname
+        self.fields = []
+        for key, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if '.' in field.source or field.source == '*':
+                raise NotCompilable(f'{key}: unsupported source')
+            if isinstance(field, (ManyRelatedField,
+                                  serializers.ListSerializer)):
+                self.fields.append(self.compile_relation(key, field, context))
+            else:
+                self.fields.append(self.compile_column(key, field, context))
+
+    def compile_column(self, key, field, context):
+        if isinstance(field, RecipeSummaryField):
+            return Column(key, f'{field.source}__{field.key}', field.convert,
+                          True)
+        try:
+            model_field = self.model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            if not field.read_only:
+                raise NotCompilable(f'{key}: no model field')
+            model_field = None
+        if isinstance(field, serializers.DecimalField):
+            convert = decimal_converter(field)
+        elif isinstance(field, serializers.FileField) and model_field:
+            convert = file_converter(field, model_field, context)
+        elif isinstance(field, SIMPLE_FIELDS):
+            convert = identity
+        else:
+            raise NotCompilable(f'{key}: unsupported {type(field).__name__}')
+        if model_field is None:
+            return Column(key, field.source, convert, False)
+        return Column(key, model_field.attname, convert, True)
+
+    def compile_relation(self, key, field, context):
+        try:
+            m2m = self.model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            raise NotCompilable(f'{key}: no model field')
+        if not m2m.many_to_many or m2m.auto_created:
+            raise NotCompilable(f'{key}: not a many to many field')
+        through = m2m.remote_field.through
+        source = m2m.m2m_field_name() + '_id'
+        target = m2m.m2m_reverse_field_name()
+        order = f'{target}_id'
+        if isinstance(field, ManyRelatedField):
+            child = field.child_relation
+            if (not isinstance(child, PrimaryKeyRelatedField) or
+                    child.pk_field is not None):
+                raise NotCompilable(f'{key}: unsupported related field')
+            return Relation(key, through, source, order, [order], None)
+
+        nested = CompiledSerializer(type(field.child), context)
+        columns, pairs = [], []
+        for entry in nested.fields:
+            if isinstance(entry, Relation):
+                raise NotCompilable(f'{key}: nested relation')
+            if entry.required:
+                columns.append(f'{target}__{entry.column}')
+                pairs.append((entry.key, entry.convert))
+        return Relation(key, through, source, order, columns, pairs)
+
+    def columns(self, queryset):
+        """values() columns the serialiser reads from the queryset"""
+        annotations = queryset.query.annotations
+        columns = [self.pk]
+        for entry in self.fields:
+            if isinstance(entry, Column) and (
+                    entry.required or entry.column in annotations):
+                columns.append(entry.column)
+        # keyset pagination reads the ordering from the rows
+        for ordering in queryset.query.order_by:
+            name = ordering.lstrip('-')
+            if name != 'pk' and '__' not in name:
+                columns.append(name)
+        return list(dict.fromkeys(columns))
+
+    def rows(self, queryset):
+        """values() queryset of the serialised columns"""
+        return queryset.prefetch_related(None).values(*self.columns(queryset))
+
+    def fetch_relation(self, relation, pks):
+        """serialised related values of every pk"""
+        related = {}
+        rows = relation.through.objects.filter(
+            **{f'{relation.source}__in': pks}
+        ).order_by(relation.order).values_list(relation.source,
+                                               *relation.columns)
+        for row in rows:
+            if relation.nested is None:
+                value = row[1]
+            else:
+                value = {
+                    key: None if item is None else convert(item)
+                    for (key, convert), item in zip(relation.nested, row[1:])
+                }
+            related.setdefault(row[0], []).append(value)
+        return related
+
+    def serialize(self, rows):
+        rows = list(rows)
+        if not rows:
+            return []
+        pks = [row[self.pk] for row in rows]
+        # (key, column, converter) or (key, None, related values by pk)
+        plan = []
+        for entry in self.fields:
+            if isinstance(entry, Relation):
+                plan.append((entry.key, None,
+                             self.fetch_relation(entry, pks)))
+            elif entry.column in rows[0]:
+                plan.append((entry.key, entry.column, entry.convert))
+
+        data = []
+        for row in rows:
+            item = {}
+            for key, column, convert in plan:
+                if column is None:
+                    item[key] = convert.get(row[self.pk], [])
+                else:
+                    value = row[column]
+                    item[key] = None if value is None else convert(value)
+            data.append(item)
+        return data
+
+
+class FastListMixin:
+    """list through the compiled serialiser, see RECIPE_API_FAST_SERIALIZERS
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not getattr(settings, 'RECIPE_API_FAST_SERIALIZERS', False):
+            return super().list(request, *args, **kwargs)
+        try:
+            compiled = CompiledSerializer(self.get_serializer_class(),
+                                          self.get_serializer_context())
+        except NotCompilable:
+            return super().list(request, *args, **kwargs)
+
+        queryset = compiled.rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(compiled.serialize(page))
+        return Response(compiled.serialize(queryset))
@@ -0,0 +1,83 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+
+class BatchManyRelatedField(serializers.ManyRelatedField):
+    """many related field resolving the whole id list with one query
+
+    DRF resolves every submitted pk with its own `get()`, here the list is
+    looked up with a single `pk__in` query and every invalid or missing id
+    is reported at once.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        queryset = child.get_queryset()
+        pk_field = queryset.model._meta.pk
+        pks, errors = [], []
+        for item in data:
+            try:
+                if isinstance(item, (bool, list, dict)):
+                    raise TypeError
+                pks.append(pk_field.to_python(item))
+            except (TypeError, ValueError, DjangoValidationError):
+                errors.append(child.error_messages['incorrect_type'].format(
+                    data_type=type(item).__name__))
+
+        found = queryset.in_bulk(set(pks)) if pks else {}
+        errors.extend(
+            child.error_messages['does_not_exist'].format(pk_value=pk)
+            for pk in dict.fromkeys(pks) if pk not in found
+        )
+        if errors:
+            raise serializers.ValidationError(errors)
+        return [found[pk] for pk in pks]
+
+
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """primary key field limited to objects of the requesting user"""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BatchManyRelatedField(**list_kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is None or not request.user.is_authenticated:
+            return queryset.none()
+        return queryset.filter(user=request.user)
+
+
+class RecipeSummaryField(serializers.Field):
+    """tags or ingredients of a recipe read from its RecipeSummary
+
+    Renders the ids, or with `nested` the id and name objects, like the
+    related fields it stands in for. Recipes without a summary render null.
+    """
+
+    def __init__(self, key, nested=False, **kwargs):
+        kwargs.setdefault('source', 'summary')
+        kwargs['read_only'] = True
+        self.key = key
+        self.nested = nested
+        super().__init__(**kwargs)
+
+    def to_representation(self, summary):
+        return self.convert(getattr(summary, self.key))
+
+    def convert(self, items):
+        """representation of the stored [{"id": .., "name": ..}] list"""
+        if self.nested:
+            return items
+        return [item['id'] for item in items]
@@ -0,0 +1,133 @@
+"""background generation of the recipe image variants
+
+`upload_image` stores the original and schedules the recipe here once the
+transaction commits. A thread pool renders a thumbnail and a medium copy
+in RECIPE_IMAGE_FORMAT without EXIF data and records them on the recipe,
+unless the image was replaced in the meantime.
+"""
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from PIL import Image, ImageOps, features
+
+from core.models import Recipe
+from core.storage import release_recipe_images
+from recipe.conditional import bump_versions
+
+
+logger = logging.getLogger(__name__)
+
+# recipe field, file name suffix and bounding box of every variant
+VARIANTS = (
+    ('image_thumbnail', 'thumbnail', (200, 200)),
+    ('image_medium', 'medium', (1024, 1024)),
+)
+
+FORMATS = {
+    'WEBP': ('webp', {'quality': 80, 'method': 4}),
+    'JPEG': ('jpg', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+
+def open_image(file):
+    """decode an upload at the resolution the largest variant needs"""
+    image = Image.open(file)
+    # jpeg decodes straight to a fraction of the size, much cheaper for
+    # the megapixels of a phone photo
+    image.draft('RGB', max(size for _, _, size in VARIANTS))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGB')
+    return image
+
+
+def variant_format():
+    """RECIPE_IMAGE_FORMAT, jpeg when pillow was built without webp"""
+    image_format = settings.RECIPE_IMAGE_FORMAT
+    if image_format == 'WEBP' and not features.check('webp'):
+        return 'JPEG'
+    return image_format
+
+
+def render_variant(image, size, image_format):
+    """resized copy encoded without metadata, returns extension and bytes"""
+    extension, options = FORMATS[image_format]
+    variant = image.copy()
+    variant.thumbnail(size, Image.LANCZOS)
+    if image_format == 'JPEG' and variant.mode != 'RGB':
+        variant = variant.convert('RGB')
+    buffer = io.BytesIO()
+    variant.save(buffer, format=image_format, **options)
+    return extension, buffer.getvalue()
+
+
+def process_recipe_image(recipe):
+    """render the variants of the recipe image and record them"""
+    name = recipe.image.name
+    storage = recipe.image.storage
+    images = Recipe.objects.filter(pk=recipe.pk, image=name)
+    try:
+        with recipe.image.open('rb') as original:
+            image = open_image(original)
+            image_format = variant_format()
+            stem = os.path.splitext(name)[0]
+            variants = {}
+            for field, suffix, size in VARIANTS:
+                extension, data = render_variant(image, size, image_format)
+                variants[field] = storage.save(
+                    f'{stem}_{suffix}.{extension}', ContentFile(data))
+    except Exception:
+        logger.exception('Processing the image of recipe %s failed',
+                         recipe.pk)
+        status = {'image_status': Recipe.IMAGE_FAILED}
+        if images.update(**status):
+            bump_versions(recipe.user_id, ['recipe', f'recipe:{recipe.pk}'])
+        return
+
+    status = dict(variants, image_status=Recipe.IMAGE_READY)
+    if not images.update(**status):
+        # replaced while rendering, the new upload renders its own
+        release_recipe_images(variants.values(), storage)
+        return
+    for field, value in status.items():
+        setattr(recipe, field, value)
+    bump_versions(recipe.user_id, ['recipe', f'recipe:{recipe.pk}'])
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                settings.RECIPE_IMAGE_WORKERS,
+                thread_name_prefix='recipe-image')
+        return _executor
+
+
+def _process_in_worker(recipe_id):
+    try:
+        recipe = Recipe.objects.filter(pk=recipe_id).first()
+        if recipe is not None and recipe.image:
+            process_recipe_image(recipe)
+    finally:
+        connection.close()
+
+
+def schedule_image_processing(recipe):
+    """process in the pool after commit, inline without workers"""
+    if not settings.RECIPE_IMAGE_WORKERS:
+        process_recipe_image(recipe)
+        return
+    recipe_id = recipe.pk
+    transaction.on_commit(
+        lambda: get_executor().submit(_process_in_worker, recipe_id))
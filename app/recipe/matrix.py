@@ -0,0 +1,118 @@
+"""sparse recipe by key matrices of the recipes of a user
+
+Row i of a matrix is the recipe in slot i, slots ordered newest first, a
+column is a tag or an ingredient. The matrix is held by column in numpy
+arrays, like a compressed sparse column matrix, with the number of keys of
+each recipe. How many of a set of keys each recipe is linked to is then one
+`bincount` over the slots of the keys' columns, for all recipes at once.
+
+Indexes live in the process, the least recently used dropped past
+MAX_INDEXED_USERS. Each one records the versions of the collections it was
+built from and is rebuilt once they moved, so api writes through any
+process invalidate it; the signals drop it on writes outside the api.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from recipe.conditional import get_versions
+
+
+# indexes kept per process and kind
+MAX_INDEXED_USERS = 32
+
+
+class RecipeMatrix:
+    """recipes linked to each key by column, and the number of keys linked
+    to each recipe"""
+
+    def __init__(self, recipe_ids, links, versions=None):
+        """recipe ids newest first, (recipe id, key) links"""
+        self.versions = versions
+        self.recipe_ids = np.array(recipe_ids, dtype=np.int64)
+        self.size = len(self.recipe_ids)
+        slots = {recipe_id: slot for slot, recipe_id in enumerate(recipe_ids)}
+        self.columns = {}
+        link_slots, link_columns = [], []
+        for recipe_id, key in links:
+            slot = slots.get(recipe_id)
+            if slot is None:
+                continue
+            link_slots.append(slot)
+            link_columns.append(
+                self.columns.setdefault(key, len(self.columns)))
+        link_slots = np.array(link_slots, dtype=np.int32)
+        link_columns = np.array(link_columns, dtype=np.int32)
+
+        self.sizes = np.bincount(link_slots, minlength=self.size)
+        # slots of column j are indices[indptr[j]:indptr[j + 1]]
+        self.indices = link_slots[np.argsort(link_columns, kind='stable')]
+        self.indptr = np.zeros(len(self.columns) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(link_columns, minlength=len(self.columns)),
+                  out=self.indptr[1:])
+
+    def key_slots(self, key):
+        """slots of the recipes linked to the key"""
+        column = self.columns.get(key)
+        if column is None:
+            return self.indices[:0]
+        return self.indices[self.indptr[column]:self.indptr[column + 1]]
+
+    def count_keys(self, keys):
+        """number of the keys each recipe is linked to"""
+        slots = [self.key_slots(key) for key in set(keys)]
+        if not slots:
+            return np.zeros(self.size, dtype=np.int64)
+        return np.bincount(np.concatenate(slots), minlength=self.size)
+
+    def nbytes(self):
+        """bytes held by the arrays"""
+        return sum(array.nbytes for array in (
+            self.recipe_ids, self.sizes, self.indices, self.indptr))
+
+
+class IndexCache:
+    """indexes of the users current at the versions of the collections"""
+
+    def __init__(self, build, collections, max_users=MAX_INDEXED_USERS):
+        self.build = build
+        self.collections = collections
+        self.max_users = max_users
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+        _caches.append(self)
+
+    def get_versions(self, user_id):
+        return get_versions(user_id, self.collections)
+
+    def get(self, user_id, versions=None):
+        """index of the user at the versions, built when missing"""
+        if versions is None:
+            versions = self.get_versions(user_id)
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None and index.versions == versions:
+                self._indexes.move_to_end(user_id)
+                return index
+        # versions are read before the rows, a write in between rebuilds
+        index = self.build(user_id, versions)
+        with self._lock:
+            self._indexes[user_id] = index
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+        return index
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._indexes.pop(user_id, None)
+
+
+_caches = []
+
+
+def invalidate_indexes(user_id):
+    """drop the indexes of the user of every kind"""
+    for cache in _caches:
+        cache.invalidate(user_id)
@@ -0,0 +1,160 @@
+"""tag and ingredient names unique per user once normalised
+
+The database keeps the `normalized_name` of every tag and ingredient: the
+name trimmed, with runs of whitespace collapsed and lowercased by the
+`core_normalize_name` function of core migration 0015, so "Salt", "salt"
+and "salt " are one row per user. Normalising only happens in SQL, the
+same function answers every comparison.
+
+`resolve_names` turns a batch of names into ids, creating the missing
+rows, with a single INSERT .. ON CONFLICT DO NOTHING round trip.
+`merge_duplicates` merges rows whose names normalise alike, for after a
+change of the function.
+"""
+from functools import lru_cache
+
+from django.db import connection, transaction
+
+
+RESOLVE_SQL = """
+WITH input AS (
+    SELECT name, core_normalize_name(name) AS normalized, position
+    FROM unnest(%(names)s::text[]) WITH ORDINALITY AS t(name, position)
+), inserted AS (
+    INSERT INTO core_{model} (user_id, name, normalized_name)
+    SELECT DISTINCT ON (normalized) %(user)s, name, normalized
+    FROM input ORDER BY normalized, position
+    ON CONFLICT (user_id, normalized_name) DO NOTHING
+    RETURNING id, name, normalized_name
+), resolved AS (
+    SELECT id, name, normalized_name, true AS created FROM inserted
+    UNION ALL
+    -- the snapshot of the statement does not see the rows it inserted
+    SELECT id, name, normalized_name, false FROM core_{model}
+    WHERE user_id = %(user)s
+        AND normalized_name IN (SELECT normalized FROM input)
+)
+SELECT r.id, r.name, r.created
+FROM input i JOIN resolved r ON r.normalized_name = i.normalized
+ORDER BY i.position
+"""
+
+CONFLICTS_SQL = """
+WITH input AS (
+    SELECT core_normalize_name(name) AS normalized, id, position
+    FROM unnest(%(names)s::text[], %(ids)s::integer[])
+        WITH ORDINALITY AS t(name, id, position)
+)
+SELECT position - 1 FROM input i
+WHERE EXISTS (
+    SELECT 1 FROM core_{model} x
+    WHERE x.user_id = %(user)s AND x.normalized_name = i.normalized
+        AND x.id IS DISTINCT FROM i.id
+) OR EXISTS (
+    SELECT 1 FROM input o
+    WHERE o.normalized = i.normalized AND o.position < i.position
+)
+"""
+
+# duplicates of a row are the newer rows normalising to the same name
+DUPLICATES_SQL = """
+CREATE TEMP TABLE merged_{model} AS
+SELECT id, keep, user_id FROM (
+    SELECT id, user_id, first_value(id) OVER (
+        PARTITION BY user_id, core_normalize_name(name) ORDER BY id) AS keep
+    FROM core_{model} {where}
+) x WHERE id <> keep
+"""
+
+# the link triggers move the usage counters and search vectors along
+MERGE_SQL = """
+INSERT INTO core_recipe_{table} (recipe_id, {model}_id)
+SELECT DISTINCT l.recipe_id, m.keep FROM core_recipe_{table} l
+JOIN merged_{model} m ON m.id = l.{model}_id
+ON CONFLICT (recipe_id, {model}_id) DO NOTHING;
+DELETE FROM core_recipe_{table} l USING merged_{model} m
+WHERE l.{model}_id = m.id;
+DELETE FROM core_{model}usage u USING merged_{model} m
+WHERE u.{model}_id = m.id;
+DELETE FROM core_{model} x USING merged_{model} m WHERE x.id = m.id;
+UPDATE core_{model} SET normalized_name = core_normalize_name(name)
+WHERE normalized_name <> core_normalize_name(name) {and_where};
+DROP TABLE merged_{model};
+"""
+
+MODEL_TABLES = {'tag': 'tags', 'ingredient': 'ingredients'}
+
+
+def name_table(model):
+    return model._meta.model_name, MODEL_TABLES[model._meta.model_name]
+
+
+def resolve_names(model, user_id, names):
+    """(id, name, created) of each name, created when missing"""
+    table, _ = name_table(model)
+    sql = RESOLVE_SQL.format(model=table)
+    params = {'user': user_id, 'names': list(names)}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        resolved = cursor.fetchall()
+        if len(resolved) < len(params['names']):
+            # rows a concurrent insert committed after the statement began
+            # conflict without showing in its snapshot, a new one sees them
+            created = {pk for pk, _, new in resolved if new}
+            cursor.execute(sql, params)
+            resolved = [(pk, name, new or pk in created)
+                        for pk, name, new in cursor.fetchall()]
+        return resolved
+
+
+def name_conflicts(model, user_id, names, ids=None):
+    """positions of the names, of new rows or of the rows with the ids,
+    clashing with another row of the user or an earlier name"""
+    table, _ = name_table(model)
+    ids = list(ids) if ids is not None else [None] * len(names)
+    with connection.cursor() as cursor:
+        cursor.execute(CONFLICTS_SQL.format(model=table),
+                       {'user': user_id, 'names': list(names), 'ids': ids})
+        return {position for position, in cursor.fetchall()}
+
+
+@lru_cache(maxsize=None)
+def name_constraint(model):
+    """name of the unique (user, normalized_name) constraint of the model"""
+    columns = {'user_id', 'normalized_name'}
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(
+            cursor, model._meta.db_table)
+    return next(name for name, constraint in constraints.items()
+                if constraint['unique'] and set(constraint['columns']) ==
+                columns)
+
+
+def is_name_conflict(exc, model):
+    """whether an IntegrityError comes from the unique normalised names"""
+    diag = getattr(exc.__cause__, 'diag', None)
+    return (diag is not None and
+            diag.constraint_name == name_constraint(model))
+
+
+def merge_duplicates(model, user_ids=None):
+    """merge the rows whose names normalise alike into the oldest, the
+    number merged per user and the recipes whose links moved"""
+    table, links = name_table(model)
+    params = {'users': list(user_ids or ())}
+    where = 'WHERE user_id = ANY(%(users)s)' if user_ids else ''
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(DUPLICATES_SQL.format(model=table, where=where),
+                       params)
+        cursor.execute(f'SELECT user_id, count(*) FROM merged_{table} '
+                       f'GROUP BY user_id ORDER BY user_id')
+        merged = dict(cursor.fetchall())
+        cursor.execute(f'SELECT DISTINCT l.recipe_id '
+                       f'FROM core_recipe_{links} l '
+                       f'JOIN merged_{table} m ON m.id = l.{table}_id')
+        recipe_ids = [recipe_id for recipe_id, in cursor.fetchall()]
+        cursor.execute(MERGE_SQL.format(
+            model=table, table=links,
+            and_where='AND user_id = ANY(%(users)s)' if user_ids else ''),
+            params)
+    return merged, recipe_ids
@@ -0,0 +1,175 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class RecipeLimitOffsetPagination(LimitOffsetPagination):
+    """limit/offset pagination for admin style browsing"""
+    default_limit = 100
+    max_limit = 1000
+
+
+class KeysetPagination(BasePagination):
+    """keyset (cursor) pagination following the ordering of the queryset
+
+    The ordering has to end in a unique column. The cursor holds the
+    ordering values of the last row served, so every page is a single
+    index range scan no matter how deep it is.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 100
+    max_page_size = 1000
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+
+        position = self.decode_cursor(request, queryset)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(position))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        self.next_position = None
+        if self.has_next:
+            self.next_position = self.get_position(results[-1])
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        """ordering of the queryset with a unique tie breaker last"""
+        ordering = tuple(queryset.query.order_by)
+        if not ordering or ordering[-1].lstrip('-') not in ('id', 'pk'):
+            ordering += ('id',)
+        return ordering
+
+    def get_position(self, row):
+        """ordering values of a row, an object or a values() dict"""
+        if isinstance(row, dict):
+            return [row[field.lstrip('-')] for field in self.ordering]
+        return [getattr(row, field.lstrip('-')) for field in self.ordering]
+
+    def keyset_filter(self, position):
+        """rows strictly after the position in the ordering"""
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            step = Q(**{f'{name}__{lookup}': position[index]})
+            for previous, value in zip(self.ordering[:index], position):
+                step &= Q(**{previous.lstrip('-'): value})
+            condition |= step
+        return condition
+
+    def ordering_field(self, queryset, name):
+        """model field or annotation output field ordered by"""
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        if name == 'pk':
+            return queryset.model._meta.pk
+        return queryset.model._meta.get_field(name)
+
+    def decode_cursor(self, request, queryset):
+        """position of the cursor as values of the ordering fields"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            position = json.loads(
+                base64.urlsafe_b64decode(encoded.encode('ascii')))
+        except (TypeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if (not isinstance(position, list) or
+                len(position) != len(self.ordering)):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            # validators refuse values out of the range of the columns
+            position = [
+                self.ordering_field(queryset, field.lstrip('-')).clean(
+                    value, None)
+                for field, value in zip(self.ordering, position)]
+        except (FieldDoesNotExist, TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in position:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, position):
+        encoded = json.dumps(position, cls=DjangoJSONEncoder)
+        return base64.urlsafe_b64encode(encoded.encode('utf-8')).decode()
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param,
+                                  self.page_size)
+        return replace_query_param(url, self.cursor_query_param,
+                                   self.encode_cursor(self.next_position))
+
+
+class RecipeApiPagination(BasePagination):
+    """choose the pagination mode from the query params
+
+    `cursor` or `page_size` selects keyset pagination, `limit` or
+    `offset` selects limit/offset pagination. Searches are paginated by
+    keyset, other requests fall back to `RECIPE_API_DEFAULT_PAGINATION` and
+    stay unpaginated when it is unset.
+    """
+    modes = {
+        'keyset': KeysetPagination,
+        'limit_offset': RecipeLimitOffsetPagination,
+    }
+    search_query_param = 'search'
+
+    def get_mode(self, request):
+        params = request.query_params
+        if (KeysetPagination.cursor_query_param in params or
+                KeysetPagination.page_size_query_param in params):
+            return 'keyset'
+        if (RecipeLimitOffsetPagination.limit_query_param in params or
+                RecipeLimitOffsetPagination.offset_query_param in params):
+            return 'limit_offset'
+        if params.get(self.search_query_param):
+            return 'keyset'
+        return getattr(settings, 'RECIPE_API_DEFAULT_PAGINATION', None) or None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        mode = self.get_mode(request)
+        if mode is None:
+            self.paginator = None
+            return None
+        self.paginator = self.modes[mode]()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
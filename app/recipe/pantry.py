@@ -0,0 +1,54 @@
+"""rank a user's recipes by how much of them a pantry covers
+
+A PantryIndex is a recipe by ingredient matrix of a user (see
+`recipe.matrix`). Matching a pantry counts the pantry ingredients of every
+recipe with one `bincount` and subtracts them from the ingredient counts,
+then sorts the recipes by the number missing, newest first among equals.
+"""
+import numpy as np
+
+from core.models import Recipe
+
+from recipe.matrix import IndexCache, RecipeMatrix
+
+
+class PantryIndex(RecipeMatrix):
+    """recipe by ingredient matrix of a user"""
+
+    @classmethod
+    def build(cls, user_id, versions=None):
+        """index of the recipes of the user as stored"""
+        recipes = Recipe.objects.filter(user_id=user_id)
+        recipe_ids = list(recipes.order_by('-id').values_list('id', flat=True))
+        links = Recipe.ingredients.through.objects.filter(
+            recipe__user_id=user_id
+        ).order_by().values_list('recipe_id', 'ingredient_id')
+        return cls(recipe_ids, links.iterator(), versions)
+
+    def match(self, pantry, offset=0, limit=20, max_missing=None):
+        """number of matching recipes and a page of (recipe id, missing
+        count) pairs, fully covered first, then by fewest missing ingredients
+        and newest
+
+        Recipes using no pantry ingredient are left out unless they have
+        no ingredients at all.
+        """
+        hits = self.count_keys(pantry)
+        missing = self.sizes - hits
+        matching = (hits > 0) | (self.sizes == 0)
+        if max_missing is not None:
+            matching &= missing <= max_missing
+        slots = np.flatnonzero(matching)
+        # a stable sort keeps the slots, newest first, among equals
+        slots = slots[np.argsort(missing[slots], kind='stable')]
+        page = slots[offset:offset + limit]
+        return len(slots), list(zip(self.recipe_ids[page].tolist(),
+                                    missing[page].tolist()))
+
+
+_indexes = IndexCache(PantryIndex.build, ('recipe', 'ingredient'))
+
+
+def get_index(user_id):
+    """pantry index of the user at the current versions"""
+    return _indexes.get(user_id)
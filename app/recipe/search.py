@@ -0,0 +1,114 @@
+"""full text and typo tolerant search of a user's library
+
+Recipes carry a weighted tsvector of their title, tag names and ingredient
+names, kept up to date by triggers (core migration 0010) and GIN indexed.
+Every word of a search also matches the words of the user's tag and
+ingredient names trigram similar to it, so "tomatoe" or "chikcen" still
+find their recipes through the same index.
+"""
+import operator
+import re
+from functools import reduce
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            TrigramSimilarity)
+from django.db.models import F, FloatField, IntegerField, Q, Value
+from django.db.models.functions import Cast
+
+from core.models import Tag, Ingredient
+
+
+# text search configuration of the search vectors, see core migration 0010
+SEARCH_CONFIG = 'english'
+# words of a search taken into account
+MAX_SEARCH_WORDS = 8
+# trigram similarity making a word a typo match of another, the pg_trgm
+# default of the % operator
+SIMILARITY_THRESHOLD = 0.3
+# typo matches added per word
+MAX_SIMILAR_WORDS = 5
+# ranks are integers so keyset cursors compare them exactly
+RANK_SCALE = 1000000
+
+
+def search_words(text):
+    return re.findall(r'\w+', text.lower())
+
+
+def trigrams(word):
+    """trigrams of a word as pg_trgm pads and splits it"""
+    padded = f'  {word} '
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def similarity(word, other):
+    """pg_trgm similarity of two words"""
+    word, other = trigrams(word), trigrams(other)
+    return len(word & other) / len(word | other)
+
+
+def scaled_rank(expression):
+    """integer rank of a float expression"""
+    return Cast(expression * Value(RANK_SCALE, output_field=FloatField()),
+                IntegerField())
+
+
+def similar_words(user, words):
+    """words of the user's tag and ingredient names similar to each word
+
+    The trigram index finds the names close to any of the words, the words
+    of those names are then compared one by one.
+    """
+    matches = reduce(operator.or_, (Q(name__trigram_similar=word)
+                                    for word in words))
+    names = Tag.objects.filter(user=user).filter(matches).values_list(
+        'name', flat=True
+    ).union(Ingredient.objects.filter(user=user).filter(matches).values_list(
+        'name', flat=True))
+    vocabulary = {token for name in names for token in search_words(name)}
+    similar = {}
+    for word in words:
+        scored = sorted(
+            (score, token) for token, score in (
+                (token, similarity(word, token)) for token in vocabulary)
+            if score >= SIMILARITY_THRESHOLD and token != word)
+        similar[word] = [token for _, token in
+                         reversed(scored[-MAX_SIMILAR_WORDS:])]
+    return similar
+
+
+def search_query(user, text):
+    """tsquery of every word, or of a word similar to it, None if empty"""
+    words = search_words(text)[:MAX_SEARCH_WORDS]
+    if not words:
+        return None
+    similar = similar_words(user, words)
+    terms = []
+    for word in words:
+        term = SearchQuery(word, config=SEARCH_CONFIG)
+        for other in similar[word]:
+            term |= SearchQuery(other, config=SEARCH_CONFIG)
+        terms.append(term)
+    return reduce(operator.and_, terms)
+
+
+def search_recipes(queryset, user, text):
+    """every recipe matching the search, best first, newest among equals"""
+    query = search_query(user, text)
+    if query is None:
+        return queryset
+    return queryset.filter(search_vector=query).annotate(
+        search_rank=scaled_rank(SearchRank(F('search_vector'), query))
+    ).order_by('-search_rank', '-id')
+
+
+def search_names(queryset, text):
+    """tags or ingredients named like the search, most similar first"""
+    text = text.strip()
+    if not text:
+        return queryset
+    return queryset.filter(
+        Q(name__trigram_similar=text) | Q(name__icontains=text)
+    ).annotate(
+        search_rank=scaled_rank(TrigramSimilarity('name', text))
+    ).order_by('-search_rank', 'id')
@@ -1,32 +1,47 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
 
 from core.models import Tag, Ingredient, Recipe
+from recipe.fields import RecipeSummaryField, UserPrimaryKeyRelatedField
 
 
 class TagSerializer(serializers.ModelSerializer):
     """Serializer for tag object"""
+    # only rendered when the queryset is annotated with it
+    usage_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Tag
-        fields = ('id', 'name')
+        fields = ('id', 'name', 'usage_count')
         read_only_Fields = ('id',)
 
 
 class IngredientSerializer(serializers.ModelSerializer):
     """serialiser for ingredient"""
+    usage_count = serializers.IntegerField(read_only=True)
+
     class Meta:
         model = Ingredient
-        fields = ('id', 'name')
+        fields = ('id', 'name', 'usage_count')
         read_only_Fields = ('id',)
 
 
+class NameListField(serializers.ListField):
+    """non empty list of tag or ingredient names"""
+    child = serializers.CharField(max_length=255)
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('min_length', 1)
+        super().__init__(**kwargs)
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     """ serialiser for recipe"""
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
@@ -37,15 +52,73 @@ class RecipeSerializer(serializers.ModelSerializer):
                   'tags', 'ingredients', 'link')
         read_only_Fields = ('id')
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """prefetch the related ids rendered by the serialiser"""
+        return queryset.prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.only('id').order_by('id')),
+            Prefetch('ingredients',
+                     queryset=Ingredient.objects.only('id').order_by('id')),
+        )
+
 
 class RecipeDetailSerializer(RecipeSerializer):
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
 
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + (
+            'image', 'image_thumbnail', 'image_medium', 'image_status')
+        read_only_fields = ('image',)
+
+    @staticmethod
+    def prefetch_lookups():
+        """prefetches of the nested tags and ingredients"""
+        return (
+            Prefetch('tags', queryset=Tag.objects.order_by('id')),
+            Prefetch('ingredients',
+                     queryset=Ingredient.objects.order_by('id')),
+        )
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """prefetch the nested tags and ingredients"""
+        return queryset.prefetch_related(
+            *RecipeDetailSerializer.prefetch_lookups())
+
+
+class RecipeSummarySerializer(RecipeSerializer):
+    """recipe with its tag and ingredient ids read from its summary"""
+    tags = RecipeSummaryField('tags')
+    ingredients = RecipeSummaryField('ingredients')
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """join the summaries instead of prefetching the relations"""
+        return queryset.select_related('summary')
+
+
+class RecipeSummaryDetailSerializer(RecipeDetailSerializer):
+    """recipe detail with its tags and ingredients read from its summary"""
+    tags = RecipeSummaryField('tags', nested=True)
+    ingredients = RecipeSummaryField('ingredients', nested=True)
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """join the summaries instead of prefetching the relations"""
+        return queryset.select_related('summary')
+
+
+class RecipeBulkSerializer(RecipeSerializer):
+    """recipe payload of bulk writes, related ids are checked per batch"""
+    tags = serializers.ListField(child=serializers.IntegerField())
+    ingredients = serializers.ListField(child=serializers.IntegerField())
+
 
 class UploadImageSerializer(serializers.ModelSerializer):
     """image upload serialiser"""
     class Meta:
         model = Recipe
-        fields = ('id', 'image')
+        fields = ('id', 'image', 'image_thumbnail', 'image_medium',
+                  'image_status')
         read_only_Fields = ('id',)
@@ -0,0 +1,116 @@
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from core.models import Tag, Ingredient, Recipe
+from core.storage import IMAGE_FIELDS, release_recipe_images
+from recipe.matrix import invalidate_indexes
+from recipe.cache import invalidate_lists
+from recipe.conditional import (LINK_COLLECTIONS, note_versions,
+                                written_collections)
+from recipe.summary import (linked_recipe_ids, refresh_summaries,
+                            summaries_are_deferred)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    note_versions(instance.user_id, ['tag'])
+    invalidate_lists(instance.user_id, 'tag')
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    note_versions(instance.user_id, ['ingredient'])
+    invalidate_lists(instance.user_id, 'ingredient')
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def related_index_deleted(sender, instance, **kwargs):
+    # api writes also move the versions the indexes are checked against
+    invalidate_indexes(instance.user_id)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def related_saved(sender, instance, created, **kwargs):
+    # a rename shows in the summaries of the recipes linking it
+    if not created:
+        refresh_summaries(linked_recipe_ids(instance))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def related_deleting(sender, instance, **kwargs):
+    # the through rows go with it without m2m_changed, bulk api deletes
+    # refresh the summaries of the whole batch themselves
+    if not summaries_are_deferred():
+        instance._summary_recipe_ids = linked_recipe_ids(instance)
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def related_deleted(sender, instance, **kwargs):
+    refresh_summaries(getattr(instance, '_summary_recipe_ids', ()))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate_lists(instance.user_id, 'tag')
+        invalidate_indexes(instance.user_id)
+    links_changed(instance, action, 'tag_links', **kwargs)
+
+
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_ingredients_changed(sender, instance, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate_lists(instance.user_id, 'ingredient')
+        invalidate_indexes(instance.user_id)
+    links_changed(instance, action, 'ingredient_links', **kwargs)
+
+
+def links_changed(instance, action, links, reverse, pk_set, **kwargs):
+    """refresh the summaries and versions of the recipes whose links changed
+
+    From the tag or ingredient side, pk_set holds the recipes, which a
+    clear only names before the links are gone.
+    """
+    if reverse and action == 'pre_clear':
+        instance._summary_recipe_ids = linked_recipe_ids(instance)
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        recipe_ids = [instance.pk]
+    elif action == 'post_clear':
+        recipe_ids = instance._summary_recipe_ids
+    else:
+        recipe_ids = pk_set
+    refresh_summaries(recipe_ids)
+    note_versions(instance.user_id,
+                  written_collections('recipe', recipe_ids) + [links])
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, **kwargs):
+    # a created recipe has never been served, only the list changes
+    note_versions(instance.user_id, written_collections(
+        'recipe', [] if created else [instance.pk]))
+    if created:
+        refresh_summaries([instance.pk])
+        invalidate_indexes(instance.user_id)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    # the through rows go with the recipe without m2m_changed
+    note_versions(instance.user_id, written_collections(
+        'recipe', [instance.pk]) + list(LINK_COLLECTIONS))
+    invalidate_lists(instance.user_id, 'tag', 'ingredient')
+    invalidate_indexes(instance.user_id)
+    images = [getattr(instance, field).name for field in IMAGE_FIELDS]
+    if any(images):
+        transaction.on_commit(lambda: release_recipe_images(images))
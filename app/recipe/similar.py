@@ -0,0 +1,151 @@
+"""recipes of a user most similar to one by their tags and ingredients
+
+A SimilarityIndex is a recipe by tag and ingredient matrix of a user (see
+`recipe.matrix`). How many keys each recipe shares with the query recipe is
+counted for all recipes at once, the jaccard or cosine similarity of every
+recipe follows from that count and its own number of keys as numpy array
+operations, never a pair at a time.
+
+`precompute_similar_recipes` stores the neighbours of every recipe of a
+user with the versions of the collections they were computed at. They are
+served until an api write moves the versions, after which the neighbours
+are computed live from the cached index.
+"""
+from itertools import chain
+
+import numpy as np
+from django.db import transaction
+
+from core.models import Recipe, RecipeNeighbours
+
+from recipe.bulk import batches
+from recipe.matrix import IndexCache, RecipeMatrix
+
+
+METRICS = ('jaccard', 'cosine')
+
+# similar recipes served by default and at most
+SIMILAR_LIMIT = 10
+MAX_SIMILAR_LIMIT = 50
+
+# neighbours stored per recipe by precompute_similar_recipes
+PRECOMPUTED_NEIGHBOURS = 20
+PRECOMPUTE_BATCH_SIZE = 1000
+
+
+def similarity_keys(metric, shared, size, other_sizes):
+    """similarities of recipes with the sizes sharing shared keys with a
+    recipe of the size, squared for cosine
+
+    Each is one division of integers, so equal similarities are equal
+    floats and rank as ties.
+    """
+    if metric == 'cosine':
+        return shared * shared / (size * other_sizes)
+    return shared / (size + other_sizes - shared)
+
+
+def similarity_scores(metric, keys):
+    scores = np.sqrt(keys) if metric == 'cosine' else keys
+    return [round(score, 4) for score in scores.tolist()]
+
+
+def recipe_links(user_id):
+    """(recipe id, key) links of the user's recipes to tags and ingredients
+    """
+    tags = Recipe.tags.through.objects.filter(
+        recipe__user_id=user_id
+    ).order_by().values_list('recipe_id', 'tag_id')
+    ingredients = Recipe.ingredients.through.objects.filter(
+        recipe__user_id=user_id
+    ).order_by().values_list('recipe_id', 'ingredient_id')
+    return chain(
+        ((recipe_id, ('tag', pk)) for recipe_id, pk in tags.iterator()),
+        ((recipe_id, ('ingredient', pk))
+         for recipe_id, pk in ingredients.iterator()),
+    )
+
+
+def recipe_keys(recipe):
+    """tag and ingredient keys of a recipe"""
+    return ([('tag', tag.pk) for tag in recipe.tags.all()] +
+            [('ingredient', ingredient.pk)
+             for ingredient in recipe.ingredients.all()])
+
+
+class SimilarityIndex(RecipeMatrix):
+    """recipe by tag and ingredient matrix of a user"""
+
+    @classmethod
+    def build(cls, user_id, versions=None):
+        """index of the recipes of the user as stored"""
+        recipes = Recipe.objects.filter(user_id=user_id)
+        recipe_ids = list(recipes.order_by('-id').values_list('id', flat=True))
+        return cls(recipe_ids, recipe_links(user_id), versions)
+
+    def similar(self, keys, limit=SIMILAR_LIMIT, metric='jaccard',
+                exclude=None):
+        """(recipe id, score) pairs of the recipes most similar to a recipe
+        with the keys, newest first among equals"""
+        keys = set(keys)
+        shared = self.count_keys(keys)
+        sharing = shared > 0
+        if exclude is not None:
+            sharing &= self.recipe_ids != exclude
+        slots = np.flatnonzero(sharing)
+        values = similarity_keys(metric, shared[slots], len(keys),
+                                 self.sizes[slots])
+        if len(slots) > limit:
+            # the limit best and their ties, before sorting them
+            threshold = -np.partition(-values, limit - 1)[limit - 1]
+            best = values >= threshold
+            slots, values = slots[best], values[best]
+        order = np.lexsort((slots, -values))[:limit]
+        return list(zip(self.recipe_ids[slots[order]].tolist(),
+                        similarity_scores(metric, values[order])))
+
+
+_indexes = IndexCache(SimilarityIndex.build, ('recipe', 'tag', 'ingredient'))
+
+
+def similar_recipes(recipe, limit=SIMILAR_LIMIT, metric='jaccard'):
+    """(recipe id, score) pairs of the recipes most similar to the recipe,
+    precomputed when current, else from the cached index"""
+    versions = _indexes.get_versions(recipe.user_id)
+    stored = RecipeNeighbours.objects.filter(
+        recipe=recipe, metric=metric).first()
+    if stored is not None and stored.versions == versions:
+        neighbours = stored.neighbours
+        # fewer than stored in full means there are no more
+        if limit <= len(neighbours) or \
+                len(neighbours) < PRECOMPUTED_NEIGHBOURS:
+            return [(item['id'], item['score'])
+                    for item in neighbours[:limit]]
+    index = _indexes.get(recipe.user_id, versions)
+    return index.similar(recipe_keys(recipe), limit, metric, recipe.pk)
+
+
+def precompute_user(user_id, metric='jaccard'):
+    """store the neighbours of every recipe of the user, the number stored
+    """
+    versions = _indexes.get_versions(user_id)
+    index = SimilarityIndex.build(user_id, versions)
+    keys = {}
+    for recipe_id, key in recipe_links(user_id):
+        keys.setdefault(recipe_id, []).append(key)
+
+    def neighbours(recipe_id):
+        return RecipeNeighbours(
+            recipe_id=recipe_id, metric=metric, versions=versions,
+            neighbours=[{'id': pk, 'score': score} for pk, score in
+                        index.similar(keys.get(recipe_id, ()),
+                                      PRECOMPUTED_NEIGHBOURS, metric,
+                                      recipe_id)])
+
+    with transaction.atomic():
+        RecipeNeighbours.objects.filter(
+            recipe__user_id=user_id, metric=metric).delete()
+        for recipe_ids in batches(index.recipe_ids, PRECOMPUTE_BATCH_SIZE):
+            RecipeNeighbours.objects.bulk_create(
+                [neighbours(recipe_id) for recipe_id in recipe_ids])
+    return len(index.recipe_ids)
@@ -0,0 +1,115 @@
+"""per user recipe statistics read from counter tables
+
+RecipeStats holds the number of recipes of a user and the totals of their
+time and price, TagUsage and IngredientUsage the number of recipes linking
+each tag and ingredient. Triggers of core migration 0013 move them within
+the transaction writing the recipes or links, so reading them costs the
+same for any library size. `reconcile_recipe_stats` recomputes them from
+the rows and corrects any drift.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+
+from core.models import RecipeStats, TagUsage, IngredientUsage, Recipe
+
+
+# most used tags and ingredients listed by default and at most
+TOP_LIMIT = 10
+MAX_TOP_LIMIT = 100
+
+RECONCILE_RECIPES_SQL = """
+INSERT INTO core_recipestats AS s
+    (user_id, recipe_count, time_minute_total, price_total)
+SELECT %(user)s, count(*), coalesce(sum(time_minute), 0),
+    coalesce(sum(price), 0)
+FROM core_recipe WHERE user_id = %(user)s
+ON CONFLICT (user_id) DO UPDATE SET
+    recipe_count = EXCLUDED.recipe_count,
+    time_minute_total = EXCLUDED.time_minute_total,
+    price_total = EXCLUDED.price_total
+WHERE (s.recipe_count, s.time_minute_total, s.price_total) IS DISTINCT FROM
+    (EXCLUDED.recipe_count, EXCLUDED.time_minute_total, EXCLUDED.price_total)
+"""
+
+RECONCILE_USAGE_SQL = """
+INSERT INTO core_{model}usage AS u ({model}_id, user_id, recipe_count)
+SELECT x.id, x.user_id, count(*)
+FROM core_{model} x JOIN core_recipe_{table} l ON l.{model}_id = x.id
+WHERE x.user_id = %(user)s
+GROUP BY x.id
+ON CONFLICT ({model}_id) DO UPDATE SET recipe_count = EXCLUDED.recipe_count
+WHERE u.recipe_count <> EXCLUDED.recipe_count
+"""
+
+RECONCILE_UNUSED_SQL = """
+UPDATE core_{model}usage u SET recipe_count = 0
+WHERE u.user_id = %(user)s AND u.recipe_count <> 0 AND NOT EXISTS (
+    SELECT 1 FROM core_recipe_{table} l WHERE l.{model}_id = u.{model}_id)
+"""
+
+LOCK_SQL = """
+SELECT 1 FROM core_recipestats WHERE user_id = %(user)s FOR UPDATE;
+SELECT 1 FROM core_tagusage WHERE user_id = %(user)s FOR UPDATE;
+SELECT 1 FROM core_ingredientusage WHERE user_id = %(user)s FOR UPDATE;
+"""
+
+USAGE_TABLES = (('tag', 'tags'), ('ingredient', 'ingredients'))
+
+
+def top_used(usage_model, related, user, limit):
+    """most used tags or ingredients of the user with their usage_count"""
+    rows = usage_model.objects.filter(
+        user=user, recipe_count__gt=0
+    ).order_by('-recipe_count', related).values_list(
+        related, f'{related}__name', 'recipe_count')[:limit]
+    return [{'id': pk, 'name': name, 'usage_count': count}
+            for pk, name, count in rows]
+
+
+def user_stats(user, limit=TOP_LIMIT):
+    """statistics of the user's library"""
+    stats = RecipeStats.objects.filter(user=user).first() or RecipeStats()
+    average_time = average_price = None
+    count = stats.recipe_count
+    if count:
+        average_time = round(stats.time_minute_total / count, 2)
+        average_price = (stats.price_total / count).quantize(Decimal('.01'))
+    return {
+        'recipe_count': count,
+        'average_time_minute': average_time,
+        'average_price': average_price,
+        'top_tags': top_used(TagUsage, 'tag', user, limit),
+        'top_ingredients': top_used(IngredientUsage, 'ingredient', user,
+                                    limit),
+    }
+
+
+def reconcile_user(user_id):
+    """recompute the counters of a user, the number corrected
+
+    The counter rows are locked first, so writes racing the recount wait
+    for it and then apply their change on top of it.
+    """
+    params = {'user': user_id}
+    corrected = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(LOCK_SQL, params)
+        cursor.execute(RECONCILE_RECIPES_SQL, params)
+        corrected += cursor.rowcount
+        for model, table in USAGE_TABLES:
+            for sql in (RECONCILE_USAGE_SQL, RECONCILE_UNUSED_SQL):
+                cursor.execute(sql.format(model=model, table=table), params)
+                corrected += cursor.rowcount
+    return corrected
+
+
+def counted_user_ids():
+    """users with recipes or counters"""
+    return list(get_user_model().objects.annotate(
+        has_recipes=Exists(Recipe.objects.filter(user=OuterRef('pk')))
+    ).filter(
+        Q(has_recipes=True) | Q(recipe_stats__isnull=False)
+    ).order_by('pk').values_list('pk', flat=True))
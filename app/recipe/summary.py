@@ -0,0 +1,111 @@
+"""denormalised tag and ingredient summaries of recipes
+
+Every recipe has a RecipeSummary row holding the ids and names of its tags
+and ingredients as json, so a page of recipes is read with one query
+instead of joining both through tables and related tables. The summaries
+are written by `recipe.signals` and the bulk writes of the recipe api,
+`rebuild_recipe_summaries` recomputes them and `check_recipe_summaries`
+reports the ones out of date.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import connection
+from django.db.models import Max, Min
+
+from core.models import Tag, Ingredient, Recipe, RecipeSummary
+
+
+# number of recipes refreshed per statement by the commands
+REFRESH_BATCH_SIZE = 10000
+
+
+def related_json(through, related, column):
+    """sql of the json array of a recipe's related ids and names"""
+    return (
+        f"coalesce((SELECT jsonb_agg(jsonb_build_object("
+        f"'id', x.id, 'name', x.name) ORDER BY x.id) "
+        f"FROM {through._meta.db_table} l "
+        f"JOIN {related._meta.db_table} x ON x.id = l.{column} "
+        f"WHERE l.recipe_id = r.id), '[]'::jsonb)"
+    )
+
+
+TAGS_JSON = related_json(Recipe.tags.through, Tag, 'tag_id')
+INGREDIENTS_JSON = related_json(Recipe.ingredients.through, Ingredient,
+                                'ingredient_id')
+
+REFRESH_SQL = f"""
+INSERT INTO {RecipeSummary._meta.db_table} (recipe_id, tags, ingredients)
+SELECT r.id, {TAGS_JSON}, {INGREDIENTS_JSON}
+FROM {Recipe._meta.db_table} r WHERE {{where}}
+ON CONFLICT (recipe_id) DO UPDATE
+SET tags = EXCLUDED.tags, ingredients = EXCLUDED.ingredients
+"""
+
+STALE_SQL = f"""
+SELECT r.id FROM {Recipe._meta.db_table} r
+LEFT JOIN {RecipeSummary._meta.db_table} s ON s.recipe_id = r.id
+WHERE r.id >= %s AND r.id < %s AND (
+    s.recipe_id IS NULL OR
+    s.tags IS DISTINCT FROM {TAGS_JSON} OR
+    s.ingredients IS DISTINCT FROM {INGREDIENTS_JSON})
+ORDER BY r.id
+"""
+
+
+def refresh_summaries(recipe_ids):
+    """recompute the summaries of the recipes with one statement"""
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(REFRESH_SQL.format(where='r.id = ANY(%s)'),
+                       [recipe_ids])
+
+
+_deferred = threading.local()
+
+
+@contextmanager
+def summaries_deferred():
+    """skip the per object summary signals, the caller refreshes the batch
+    """
+    _deferred.active = True
+    try:
+        yield
+    finally:
+        _deferred.active = False
+
+
+def summaries_are_deferred():
+    return getattr(_deferred, 'active', False)
+
+
+def linked_recipe_ids(instance):
+    """ids of the recipes linking a tag or ingredient"""
+    return list(instance.recipe_set.values_list('id', flat=True))
+
+
+def id_ranges(batch_size=REFRESH_BATCH_SIZE):
+    """[start, stop) recipe id ranges covering every recipe"""
+    bounds = Recipe.objects.aggregate(first=Min('id'), last=Max('id'))
+    if bounds['first'] is None:
+        return
+    for start in range(bounds['first'], bounds['last'] + 1, batch_size):
+        yield start, start + batch_size
+
+
+def refresh_range(start, stop):
+    """recompute the summaries of the recipe ids in [start, stop)"""
+    with connection.cursor() as cursor:
+        cursor.execute(REFRESH_SQL.format(where='r.id >= %s AND r.id < %s'),
+                       [start, stop])
+        return cursor.rowcount
+
+
+def stale_summaries(start, stop):
+    """ids in [start, stop) with a missing or out of date summary"""
+    with connection.cursor() as cursor:
+        cursor.execute(STALE_SQL, [start, stop])
+        return [row[0] for row in cursor.fetchall()]
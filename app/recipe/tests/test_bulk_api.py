@@ -0,0 +1,184 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+RECIPE_BULK_URL = reverse('recipe:recipe-bulk')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+
+
+class BulkRecipeApiTests(TestCase):
+    """bulk create, update and delete of recipes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'bulk@some.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, name='vegan')
+        self.ingredient = Ingredient.objects.create(user=self.user,
+                                                    name='rice')
+
+    def payload(self, count):
+        return [{
+            'title': f'recipe {i}',
+            'time_minute': 10,
+            'price': '5.00',
+            'tags': [self.tag.id],
+            'ingredients': [self.ingredient.id],
+        } for i in range(count)]
+
+    def test_bulk_create(self):
+        """every item is created with its relations"""
+        res = self.client.post(RECIPE_BULK_URL, self.payload(3),
+                               format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['title'] for item in res.data],
+                         ['recipe 0', 'recipe 1', 'recipe 2'])
+        recipes = Recipe.objects.filter(user=self.user)
+        self.assertEqual(recipes.count(), 3)
+        for recipe in recipes:
+            self.assertEqual(list(recipe.tags.all()), [self.tag])
+
+    @skipUnlessDBFeature('can_return_ids_from_bulk_insert')
+    def test_bulk_create_query_count_is_flat(self):
+        """the number of queries does not grow with the batch"""
+        def count_queries(size):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(RECIPE_BULK_URL, self.payload(size),
+                                 format='json')
+            return len(queries)
+
+        self.assertEqual(count_queries(2), count_queries(20))
+
+    def test_bulk_create_reports_errors_per_item(self):
+        """invalid items are reported in place and nothing is written"""
+        other = get_user_model().objects.create_user('o@o.com', 'otherpass')
+        foreign_tag = Tag.objects.create(user=other, name='foreign')
+        items = self.payload(3)
+        items[1]['title'] = ''
+        items[2]['tags'] = [foreign_tag.id, 0]
+
+        res = self.client.post(RECIPE_BULK_URL, items, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('title', res.data[1])
+        self.assertEqual(len(res.data[2]['tags']), 2)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_update(self):
+        """scalar fields and relations of many recipes are updated"""
+        self.client.post(RECIPE_BULK_URL, self.payload(2), format='json')
+        first, second = Recipe.objects.order_by('id')
+        new_tag = Tag.objects.create(user=self.user, name='spicy')
+
+        res = self.client.patch(RECIPE_BULK_URL, [
+            {'id': first.id, 'title': 'renamed'},
+            {'id': second.id, 'price': '7.50', 'tags': [new_tag.id]},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.title, 'renamed')
+        self.assertEqual(list(first.tags.all()), [self.tag])
+        self.assertEqual(str(second.price), '7.50')
+        self.assertEqual(second.title, 'recipe 1')
+        self.assertEqual(list(second.tags.all()), [new_tag])
+
+    def test_bulk_update_unknown_id(self):
+        """ids of other users are not found"""
+        other = get_user_model().objects.create_user('o@o.com', 'otherpass')
+        recipe = Recipe.objects.create(user=other, title='theirs',
+                                       time_minute=5, price=1)
+
+        res = self.client.patch(RECIPE_BULK_URL,
+                                [{'id': recipe.id, 'title': 'mine'}],
+                                format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {'id': ['Not found.']})
+
+    def test_bulk_update_repeated_or_invalid_id(self):
+        """repeated, boolean and non integer ids are rejected per item"""
+        recipe = Recipe.objects.create(user=self.user, title='dal',
+                                       time_minute=5, price=1)
+        recipe.tags.add(self.tag)
+
+        repeated = self.client.patch(RECIPE_BULK_URL, [
+            {'id': recipe.id, 'tags': [self.tag.id]},
+            {'id': recipe.id, 'tags': [self.tag.id]},
+        ], format='json')
+        invalid = self.client.patch(RECIPE_BULK_URL, [
+            {'id': recipe.id, 'title': 'one'}, {'id': True, 'title': 'two'},
+            {'id': 1.5}, {'title': 'three'},
+        ], format='json')
+        deleted = self.client.delete(RECIPE_BULK_URL, [True], format='json')
+
+        self.assertEqual(repeated.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(repeated.data, [{}, {'id': ['Duplicate id.']}])
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(invalid.data[0], {})
+        for error in invalid.data[1:]:
+            self.assertEqual(error, {'id': ['A valid integer is required.']})
+        self.assertEqual(deleted.status_code, status.HTTP_400_BAD_REQUEST)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'dal')
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_bulk_delete(self):
+        """only the user's recipes are deleted"""
+        self.client.post(RECIPE_BULK_URL, self.payload(3), format='json')
+        ids = list(Recipe.objects.values_list('id', flat=True))
+
+        res = self.client.delete(RECIPE_BULK_URL, ids[:2], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(res.data['deleted']), sorted(ids[:2]))
+        self.assertEqual(list(Recipe.objects.values_list('id', flat=True)),
+                         ids[2:])
+
+
+class BulkTagApiTests(TestCase):
+    """bulk writes of tags"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'bulktags@some.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_and_rename_tags(self):
+        """tags are created and renamed in batches"""
+        res = self.client.post(TAGS_BULK_URL,
+                               [{'name': 'vegan'}, {'name': 'spicy'}],
+                               format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        vegan = Tag.objects.get(name='vegan')
+        res = self.client.patch(TAGS_BULK_URL,
+                                [{'id': vegan.id, 'name': 'plant based'}],
+                                format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['name'], 'plant based')
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_requires_list(self):
+        """a single object is a bad request"""
+        res = self.client.post(TAGS_BULK_URL, {'name': 'vegan'},
+                               format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
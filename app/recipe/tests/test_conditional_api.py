@@ -0,0 +1,167 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import CollectionVersion, Recipe, Tag
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    """return recipe detail url"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ConditionalGetTests(TestCase):
+    """etags and 304 responses of the recipe api"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'etag@some.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(user=self.user, title='soup',
+                                            time_minute=10, price=5)
+
+    def get(self, url, etag=None, **params):
+        if etag is None:
+            return self.client.get(url, params)
+        return self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_list_is_not_modified(self):
+        """a current etag is answered with 304 and no body"""
+        etag = self.get(RECIPES_URL)['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.get(RECIPES_URL, etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(len(queries), 1)
+
+    def test_etag_depends_on_query_params(self):
+        """every query string has its own etag"""
+        self.assertNotEqual(self.get(RECIPES_URL)['ETag'],
+                            self.get(RECIPES_URL, limit=1)['ETag'])
+
+    def test_write_changes_list_etag(self):
+        """creating a recipe through the api invalidates the etag"""
+        etag = self.get(RECIPES_URL)['ETag']
+        self.client.post(RECIPES_URL, {'title': 'stew', 'time_minute': 5,
+                                       'price': '2.00'})
+
+        res = self.get(RECIPES_URL, etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 2)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_tag_create_changes_tag_and_recipe_etags(self):
+        """tag writes reach the listings that show tags"""
+        tags_etag = self.get(TAGS_URL)['ETag']
+        detail_etag = self.get(detail_url(self.recipe.id))['ETag']
+        self.client.post(TAGS_URL, {'name': 'vegan'})
+
+        self.assertEqual(self.get(TAGS_URL, tags_etag).status_code,
+                         status.HTTP_200_OK)
+        self.assertEqual(
+            self.get(detail_url(self.recipe.id), detail_etag).status_code,
+            status.HTTP_200_OK)
+
+    def test_detail_etag_is_per_object(self):
+        """updating one recipe leaves the etag of others untouched"""
+        other = Recipe.objects.create(user=self.user, title='salad',
+                                      time_minute=5, price=3)
+        etag = self.get(detail_url(self.recipe.id))['ETag']
+        other_etag = self.get(detail_url(other.id))['ETag']
+
+        self.client.patch(detail_url(other.id), {'title': 'green salad'})
+
+        self.assertEqual(
+            self.get(detail_url(self.recipe.id), etag).status_code,
+            status.HTTP_304_NOT_MODIFIED)
+        res = self.get(detail_url(other.id), other_etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'green salad')
+
+    def test_deleted_recipe_is_not_found(self):
+        """a stale etag of a deleted recipe does not hide the 404"""
+        etag = self.get(detail_url(self.recipe.id))['ETag']
+        self.client.delete(detail_url(self.recipe.id))
+
+        res = self.get(detail_url(self.recipe.id), etag)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(res.has_header('ETag'))
+
+    def test_etag_is_per_user(self):
+        """another user does not match the etag"""
+        etag = self.get(RECIPES_URL)['ETag']
+        other = get_user_model().objects.create_user('o@o.com', 'otherpass')
+        Tag.objects.create(user=other, name='vegan')
+        self.client.force_authenticate(other)
+
+        res = self.get(RECIPES_URL, etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_padded_pk_shares_object_version(self):
+        """an update reaches the etag of /recipes/05/ as of /recipes/5/"""
+        padded = f'{RECIPES_URL}0{self.recipe.id}/'
+        etag = self.get(padded)['ETag']
+
+        self.client.patch(detail_url(self.recipe.id), {'title': 'broth'})
+
+        res = self.get(padded, etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'broth')
+
+    def test_non_numeric_pk_is_not_found(self):
+        """a pk that is no number is a 404 before any version lookup"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.get(f'{RECIPES_URL}soup/')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(len(queries), 0)
+
+    def test_orm_writes_change_etags(self):
+        """writes outside the api invalidate the etags too"""
+        tag = Tag.objects.create(user=self.user, name='vegan')
+        detail_etag = self.get(detail_url(self.recipe.id))['ETag']
+        list_etag = self.get(RECIPES_URL)['ETag']
+
+        self.recipe.tags.add(tag)
+        self.assertEqual(
+            self.get(detail_url(self.recipe.id), detail_etag).status_code,
+            status.HTTP_200_OK)
+
+        detail_etag = self.get(detail_url(self.recipe.id))['ETag']
+        Recipe.objects.get(id=self.recipe.id).save()
+        self.assertEqual(
+            self.get(detail_url(self.recipe.id), detail_etag).status_code,
+            status.HTTP_200_OK)
+        self.assertEqual(self.get(RECIPES_URL, list_etag).status_code,
+                         status.HTTP_200_OK)
+
+    def test_api_write_bumps_once(self):
+        """the signals of an api write bump each counter once"""
+        tag = Tag.objects.create(user=self.user, name='vegan')
+        versions = CollectionVersion.objects.filter(user=self.user)
+        before = dict(versions.values_list('collection', 'version'))
+
+        self.client.patch(detail_url(self.recipe.id),
+                          {'title': 'broth', 'tags': [tag.id]})
+
+        after = dict(versions.values_list('collection', 'version'))
+        for collection in ('recipe', f'recipe:{self.recipe.id}'):
+            self.assertEqual(after[collection],
+                             before.get(collection, 0) + 1)
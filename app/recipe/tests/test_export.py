@@ -0,0 +1,82 @@
+import json
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.views import RecipeViewSet
+
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class RecipeExportTests(TestCase):
+    """streaming export of the recipe library"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'export@some.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        tag = Tag.objects.create(user=self.user, name='vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='rice')
+        for i in range(5):
+            recipe = Recipe.objects.create(user=self.user, title=f'dish {i}',
+                                           time_minute=10, price='4.50')
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+
+    def export(self, **params):
+        res = self.client.get(EXPORT_URL, params)
+        return res, b''.join(res.streaming_content)
+
+    def test_export_json_matches_detail(self):
+        """the export is the detail representation of every recipe"""
+        res, body = self.export()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        exported = json.loads(body.decode('utf-8'))
+        recipe = Recipe.objects.order_by('-id').first()
+        detail = self.client.get(
+            reverse('recipe:recipe-detail', args=[recipe.id]))
+        self.assertEqual(len(exported), 5)
+        self.assertEqual(exported[0], json.loads(detail.content))
+
+    def test_export_ndjson(self):
+        """one recipe per line"""
+        res, body = self.export(export_format='ndjson')
+
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = body.decode('utf-8').splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines],
+                         [f'dish {i}' for i in reversed(range(5))])
+
+    def test_export_empty_and_filtered(self):
+        """filters apply, an empty export is an empty array"""
+        _, body = self.export(tags='0')
+
+        self.assertEqual(body, b'[]')
+
+    def test_export_prefetches_per_chunk(self):
+        """relations cost two queries per chunk, not per recipe"""
+        with patch.object(RecipeViewSet, 'export_chunk_size', 2), \
+                CaptureQueriesContext(connection) as queries:
+            self.export()
+
+        # the recipes, then tags and ingredients for each of three chunks
+        self.assertEqual(len(queries), 1 + 3 * 2)
+
+    def test_invalid_format(self):
+        """unknown export formats are rejected"""
+        res = self.client.get(EXPORT_URL, {'export_format': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
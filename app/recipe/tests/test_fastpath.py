@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import Recipe, Tag, Ingredient
+from core.profiling import viewset_queryset
+from recipe.fastpath import CompiledSerializer
+from recipe.serialisers import (TagSerializer, IngredientSerializer,
+                                RecipeSerializer, RecipeDetailSerializer)
+from recipe.views import TagViewSet, IngredientViewSet, RecipeViewSet
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class FastPathParityTests(TestCase):
+    """the compiled serialisers render byte for byte like DRF"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'fast@some.com',
+            'testpass'
+        )
+        self.request = Request(APIRequestFactory().get('/'))
+        self.request.user = self.user
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ('vegan', 'spicy', 'quick')]
+        ingredients = [Ingredient.objects.create(user=self.user, name=name)
+                       for name in ('rice', 'dal')]
+        for i, price in enumerate(('5.5', '0.01', '999.99', '12')):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'dish {i} é', time_minute=i,
+                price=price, link='' if i % 2 else f'http://x.com/{i}')
+            recipe.tags.set(tags[:i])
+            recipe.ingredients.set(ingredients[:i])
+        recipe.image = 'uploads/recipe/ab/cd/abcd.jpg'
+        recipe.image_status = Recipe.IMAGE_READY
+        recipe.save()
+
+    def assert_parity(self, serializer_class, queryset):
+        context = {'request': self.request}
+        expected = serializer_class(queryset, many=True, context=context).data
+        compiled = CompiledSerializer(serializer_class, context)
+        actual = compiled.serialize(compiled.rows(queryset))
+
+        self.assertEqual(JSONRenderer().render(actual),
+                         JSONRenderer().render(expected))
+
+    def test_tags_and_ingredients(self):
+        """plain and annotated listings"""
+        for viewset, serializer in ((TagViewSet, TagSerializer),
+                                    (IngredientViewSet, IngredientSerializer)):
+            for params in ({}, {'usage_count': 1},
+                           {'assigned_only': 1, 'usage_count': 1}):
+                self.assert_parity(
+                    serializer, viewset_queryset(viewset, self.user, params))
+
+    def test_recipes(self):
+        """related ids, prices and blank links"""
+        self.assert_parity(RecipeSerializer,
+                           viewset_queryset(RecipeViewSet, self.user))
+
+    def test_recipe_details(self):
+        """nested tags and ingredients and image urls"""
+        self.assert_parity(RecipeDetailSerializer,
+                           viewset_queryset(RecipeViewSet, self.user,
+                                            action='retrieve'))
+
+    def test_api_responses(self):
+        """list responses match with the fast path on and off"""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        for url, params in ((RECIPES_URL, {}), (RECIPES_URL, {'limit': 2}),
+                            (RECIPES_URL, {'page_size': 2}),
+                            (TAGS_URL, {'usage_count': 1})):
+            with override_settings(RECIPE_API_FAST_SERIALIZERS=False):
+                expected = client.get(url, params).content
+            with override_settings(RECIPE_API_FAST_SERIALIZERS=True):
+                actual = client.get(url, params).content
+            self.assertEqual(actual, expected)
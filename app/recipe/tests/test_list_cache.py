@@ -0,0 +1,146 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.cache import get_list_cache, invalidate_lists
+from recipe.conditional import bump_versions
+
+
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+CACHE_STATS_URL = reverse('recipe:cache-stats')
+
+
+class ListCacheTests(TestCase):
+    """cached tag and ingredient listings"""
+
+    def setUp(self):
+        get_list_cache().backend.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'cache@some.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_hit_skips_database(self):
+        """a repeated listing only queries the etag version counters"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        first = self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(1):
+            second = self.client.get(TAGS_URL)
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.data, second.data)
+
+    def test_create_invalidates(self):
+        """creating a tag drops the cached listing"""
+        self.client.get(TAGS_URL)
+
+        self.client.post(TAGS_URL, {'name': 'Dessert'})
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual([tag['name'] for tag in res.data], ['Dessert'])
+
+    def test_recipe_link_invalidates_assigned_only(self):
+        """linking a recipe updates the assigned_only listing"""
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe = Recipe.objects.create(user=self.user, title='Dal',
+                                       time_minute=20, price=2.00)
+        params = {'assigned_only': 1}
+        self.assertEqual(self.client.get(INGREDIENTS_URL, params).data, [])
+
+        recipe.ingredients.add(ingredient)
+        res = self.client.get(INGREDIENTS_URL, params)
+
+        self.assertEqual([item['id'] for item in res.data], [ingredient.id])
+
+    def test_recipe_edit_keeps_listing(self):
+        """recipe writes that leave the links alone keep the listing cached
+        """
+        Tag.objects.create(user=self.user, name='Vegan')
+        recipe = Recipe.objects.create(user=self.user, title='Dal',
+                                       time_minute=20, price=2.00)
+        self.client.get(TAGS_URL)
+
+        self.client.patch(reverse('recipe:recipe-detail', args=[recipe.id]),
+                          {'title': 'Tadka dal'})
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'HIT')
+
+    def test_other_worker_link_invalidates(self):
+        """a link change seen only through the version counters misses"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = Recipe.objects.create(user=self.user, title='Dal',
+                                       time_minute=20, price=2.00)
+        params = {'assigned_only': 1}
+        self.client.get(TAGS_URL, params)
+        Recipe.tags.through.objects.create(recipe=recipe, tag=tag)
+        bump_versions(self.user.id, ['tag_links'])
+
+        res = self.client.get(TAGS_URL, params)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual([item['id'] for item in res.data], [tag.id])
+
+    def test_users_do_not_share_entries(self):
+        """each user gets their own listing"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+        other = get_user_model().objects.create_user('o@o.com', 'otherpass')
+        self.client.force_authenticate(other)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data, [])
+
+    @override_settings(RECIPE_LIST_CACHE=None)
+    def test_cache_disabled(self):
+        """without a backend listings are not cached"""
+        res = self.client.get(TAGS_URL)
+
+        self.assertNotIn('X-Cache', res)
+
+    def test_stats_require_admin(self):
+        """hit and miss counters are admin only"""
+        res = self.client.get(CACHE_STATS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.user.is_staff = True
+        self.user.save()
+        res = self.client.get(CACHE_STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('hits', res.data)
+
+    def test_other_worker_write_invalidates(self):
+        """an api write seen only through the version counters misses"""
+        self.client.get(TAGS_URL)
+        Tag.objects.bulk_create([Tag(user=self.user, name='Vegan')])
+        bump_versions(self.user.id, ['tag'])
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual([tag['name'] for tag in res.data], ['Vegan'])
+
+
+class ListCacheCommitTests(TransactionTestCase):
+    """invalidation once the write commits"""
+
+    def test_invalidated_on_commit(self):
+        """a listing cached before the commit is not served after it"""
+        cache = get_list_cache()
+        with transaction.atomic():
+            invalidate_lists(1, 'tag')
+            token = cache.version(1, 'tag')
+
+        self.assertNotEqual(cache.version(1, 'tag'), token)
@@ -0,0 +1,123 @@
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+from recipe.names import is_name_conflict
+
+
+TAGS_URL = reverse('recipe:tag-list')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+RESOLVE_URL = reverse('recipe:ingredient-resolve')
+
+
+class NormalizedNameTests(TestCase):
+    """names are unique per user once trimmed and lowercased"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'names@some.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_normalized_by_the_database(self):
+        """every write stores the normalised name"""
+        tag = Tag.objects.create(user=self.user, name='  Gluten   Free ')
+        tag.refresh_from_db()
+        self.assertEqual(tag.normalized_name, 'gluten free')
+
+        tag.name = 'Vegan'
+        tag.save()
+        tag.refresh_from_db()
+        self.assertEqual(tag.normalized_name, 'vegan')
+
+    def test_duplicate_create(self):
+        """a name normalising like an existing one is a bad request"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        other = get_user_model().objects.create_user('o@some.com', 'pass')
+        Tag.objects.create(user=other, name='vegan')
+
+        res = self.client.post(TAGS_URL, {'name': 'vegan '})
+        created = self.client.post(TAGS_URL, {'name': 'vegetarian'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['name'],
+                         ['Tag with this name already exists.'])
+        self.assertEqual(created.status_code, status.HTTP_201_CREATED)
+
+    def test_name_conflict_by_constraint(self):
+        """only the unique names constraint of the model is a conflict"""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        errors = []
+        for write in (lambda: Tag.objects.create(user=self.user, name='vegan'),
+                      lambda: Tag.objects.filter(id=tag.id).update(name=None)):
+            with self.assertRaises(IntegrityError) as raised, \
+                    transaction.atomic():
+                write()
+            errors.append(raised.exception)
+
+        self.assertTrue(is_name_conflict(errors[0], Tag))
+        self.assertFalse(is_name_conflict(errors[0], Ingredient))
+        self.assertFalse(is_name_conflict(errors[1], Tag))
+
+    def test_duplicate_bulk_writes(self):
+        """clashing items of a batch are flagged, nothing is written"""
+        vegan = Tag.objects.create(user=self.user, name='vegan')
+        quick = Tag.objects.create(user=self.user, name='quick')
+        error = {'name': ['Tag with this name already exists.']}
+
+        res = self.client.post(TAGS_BULK_URL, [
+            {'name': 'spicy'}, {'name': 'VEGAN'}, {'name': 'Spicy'},
+        ], format='json')
+        renamed = self.client.patch(TAGS_BULK_URL, [
+            {'id': vegan.id, 'name': 'Vegan'},
+            {'id': quick.id, 'name': 'vegan'},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data, [{}, error, error])
+        self.assertEqual(renamed.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(renamed.data, [{}, error])
+        self.assertEqual(
+            sorted(Tag.objects.values_list('name', flat=True)),
+            ['quick', 'vegan'])
+
+    def test_resolve(self):
+        """names resolve in order to existing or created rows"""
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+
+        res = self.client.post(RESOLVE_URL, [
+            'salt ', 'Black Pepper', 'SALT', 'black  pepper'], format='json')
+        again = self.client.post(RESOLVE_URL, ['black pepper'],
+                                 format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        pepper = Ingredient.objects.get(normalized_name='black pepper')
+        self.assertEqual(res.data, [
+            {'id': salt.id, 'name': 'Salt', 'created': False},
+            {'id': pepper.id, 'name': 'Black Pepper', 'created': True},
+            {'id': salt.id, 'name': 'Salt', 'created': False},
+            {'id': pepper.id, 'name': 'Black Pepper', 'created': True},
+        ])
+        self.assertEqual(again.data, [
+            {'id': pepper.id, 'name': 'Black Pepper', 'created': False}])
+        self.assertEqual(Ingredient.objects.count(), 2)
+
+    def test_resolve_single_statement(self):
+        """resolving known names is one statement in its transaction"""
+        Ingredient.objects.create(user=self.user, name='salt')
+
+        with self.assertNumQueries(3):
+            self.client.post(RESOLVE_URL, ['Salt'] * 50, format='json')
+
+    def test_resolve_invalid(self):
+        """resolve takes a non empty list of names"""
+        for payload in ({'names': ['salt']}, [], [''], ['x' * 256]):
+            res = self.client.post(RESOLVE_URL, payload, format='json')
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
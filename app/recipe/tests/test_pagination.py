@@ -0,0 +1,113 @@
+import base64
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class PaginationTests(TestCase):
+    """limit/offset and keyset pagination of the list endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'pages@some.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def walk_pages(self, url, params):
+        """follow next links and collect every page"""
+        pages = []
+        res = self.client.get(url, params)
+        while True:
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(res.data['results'])
+            if res.data['next'] is None:
+                return pages
+            res = self.client.get(res.data['next'])
+
+    def test_unpaginated_by_default(self):
+        """without pagination params the full list is returned"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+
+    @override_settings(RECIPE_API_DEFAULT_PAGINATION='keyset')
+    def test_default_pagination_setting(self):
+        """the configured default mode applies without params"""
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertIsNone(res.data['next'])
+
+    def test_limit_offset(self):
+        """limit and offset select a slice with a total count"""
+        for name in 'abcde':
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'limit': 2, 'offset': 1})
+
+        self.assertEqual(res.data['count'], 5)
+        self.assertEqual([tag['name'] for tag in res.data['results']],
+                         ['d', 'c'])
+
+    def test_keyset_tags(self):
+        """keyset pages of tags follow the names without gaps or repeats"""
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ['a', 'b', 'B 2', 'b 3', 'c']]
+
+        pages = self.walk_pages(TAGS_URL, {'page_size': 2})
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        ids = [tag['id'] for page in pages for tag in page]
+        expected = sorted(tags, key=lambda tag: tag.id)
+        expected = sorted(expected, key=lambda tag: tag.name, reverse=True)
+        self.assertEqual(ids, [tag.id for tag in expected])
+
+    def test_keyset_recipes(self):
+        """keyset pages of recipes follow the list ordering"""
+        recipes = [
+            Recipe.objects.create(user=self.user, title=f'recipe {i}',
+                                  time_minute=10, price=5.00)
+            for i in range(5)
+        ]
+
+        pages = self.walk_pages(RECIPE_URL, {'page_size': 3})
+
+        ids = [recipe['id'] for page in pages for recipe in page]
+        self.assertEqual(ids, [recipe.id for recipe in reversed(recipes)])
+
+    def test_invalid_cursor(self):
+        """a malformed cursor is rejected"""
+        res = self.client.get(RECIPE_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_with_invalid_values(self):
+        """a well formed cursor of the wrong value types is rejected"""
+        Tag.objects.create(user=self.user, name='vegan')
+        for url, params, position in (
+                (RECIPE_URL, {}, ['abc']), (RECIPE_URL, {}, [[1]]),
+                (RECIPE_URL, {}, [None]), (TAGS_URL, {}, ['a', 'zz']),
+                (RECIPE_URL, {'ordering': 'price'}, ['1e999999999', 1])):
+            cursor = base64.urlsafe_b64encode(
+                json.dumps(position).encode('utf-8')).decode()
+
+            res = self.client.get(url, dict(params, cursor=cursor))
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,155 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, RecipeSummary, Ingredient
+from recipe.pantry import PantryIndex
+
+
+COOK_URL = reverse('recipe:recipe-cook')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class PantryIndexTests(SimpleTestCase):
+    """matrix matching agrees with counting each recipe"""
+
+    def test_matches_brute_force(self):
+        rng = random.Random(0)
+        recipes = {recipe_id: set(rng.sample(range(40), rng.randint(0, 12)))
+                   for recipe_id in range(1, 400)}
+        links = [(recipe_id, ingredient_id)
+                 for recipe_id, ingredients in recipes.items()
+                 for ingredient_id in ingredients]
+        index = PantryIndex(sorted(recipes, reverse=True), links)
+
+        for pantry_size in (1, 5, 20):
+            pantry = set(rng.sample(range(45), pantry_size))
+            expected = sorted(
+                (len(ingredients - pantry), -recipe_id)
+                for recipe_id, ingredients in recipes.items()
+                if ingredients & pantry or not ingredients)
+            count, page = index.match(pantry, offset=3, limit=50)
+
+            self.assertEqual(count, len(expected))
+            self.assertEqual(page, [(-recipe_id, missing) for missing,
+                                    recipe_id in expected[3:53]])
+
+
+class PantryApiTests(TestCase):
+    """recipes ranked by the ingredients at hand"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'pantry@some.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.rice, self.dal, self.ghee, self.salt = (
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ('rice', 'dal', 'ghee', 'salt'))
+
+    def recipe(self, title, *ingredients, user=None):
+        recipe = Recipe.objects.create(user=user or self.user, title=title,
+                                       time_minute=10, price='1.00')
+        recipe.ingredients.add(*ingredients)
+        return recipe
+
+    def cook(self, pantry, **params):
+        res = self.client.get(COOK_URL, dict(params, pantry=','.join(
+            str(ingredient.id) for ingredient in pantry)))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_ranked_by_missing(self):
+        """makeable first, then fewest missing, newest among equals"""
+        khichdi = self.recipe('khichdi', self.rice, self.dal)
+        tadka = self.recipe('tadka', self.rice, self.dal, self.ghee)
+        self.recipe('ghee roast', self.ghee)
+        water = self.recipe('water')
+        pulao = self.recipe('pulao', self.rice, self.salt, self.ghee)
+        other = get_user_model().objects.create_user('o@some.com', 'pass')
+        self.recipe('rice', Ingredient.objects.create(user=other, name='r'),
+                    user=other)
+
+        data = self.cook([self.rice, self.dal])
+
+        self.assertEqual(data['count'], 4)
+        self.assertEqual(
+            [(recipe['id'], recipe['missing_ingredients'])
+             for recipe in data['results']],
+            [(water.id, []), (khichdi.id, []), (tadka.id, [self.ghee.id]),
+             (pulao.id, [self.ghee.id, self.salt.id])])
+        self.assertEqual(data['results'][3]['missing_count'], 2)
+
+    @override_settings(RECIPE_API_SUMMARIES=True)
+    def test_served_from_summaries(self):
+        """recipes without a summary read their ingredients from the links
+        """
+        khichdi = self.recipe('khichdi', self.rice, self.dal)
+        tadka = self.recipe('tadka', self.rice, self.dal, self.ghee)
+        RecipeSummary.objects.filter(recipe=tadka).delete()
+
+        data = self.cook([self.rice, self.dal])
+
+        self.assertEqual(
+            [(recipe['id'], recipe['missing_ingredients'])
+             for recipe in data['results']],
+            [(khichdi.id, []), (tadka.id, [self.ghee.id])])
+
+    def test_paging_and_max_missing(self):
+        """offset and limit page the ranking, max_missing cuts it"""
+        tadka = self.recipe('tadka', self.rice, self.dal, self.ghee)
+        khichdi = self.recipe('khichdi', self.rice, self.dal)
+        self.recipe('pulao', self.rice, self.salt, self.ghee)
+
+        page = self.cook([self.rice, self.dal], limit=1, offset=1)
+        makeable = self.cook([self.rice, self.dal], max_missing=1)
+
+        self.assertEqual(page['count'], 3)
+        self.assertEqual([r['id'] for r in page['results']], [tadka.id])
+        self.assertEqual(makeable['count'], 2)
+        self.assertEqual([r['id'] for r in makeable['results']],
+                         [khichdi.id, tadka.id])
+
+    def test_index_follows_writes(self):
+        """orm and api writes both show in the next match"""
+        khichdi = self.recipe('khichdi', self.rice, self.dal)
+        self.assertEqual(self.cook([self.rice])['count'], 1)
+
+        khichdi.ingredients.remove(self.dal)
+        self.assertEqual(self.cook([self.rice])['results'][0]
+                         ['missing_count'], 0)
+        self.client.patch(detail_url(khichdi.id),
+                          {'ingredients': [self.ghee.id]}, format='json')
+        self.assertEqual(self.cook([self.rice])['count'], 0)
+        self.client.post(reverse('recipe:recipe-bulk'), [
+            {'title': 'rice', 'time_minute': 5, 'price': '1.00',
+             'tags': [], 'ingredients': [self.rice.id]}], format='json')
+        self.assertEqual(self.cook([self.rice])['count'], 1)
+
+    def test_cached_index(self):
+        """a match against a current index queries only the page"""
+        for _ in range(10):
+            self.recipe('khichdi', self.rice, self.dal)
+        self.cook([self.rice])
+
+        with self.assertNumQueries(4):
+            self.cook([self.rice])
+
+    def test_invalid_params(self):
+        """missing pantry and out of range numbers are a bad request"""
+        for params in ({}, {'pantry': 'rice'}, {'pantry': '1', 'limit': 0},
+                       {'pantry': '1', 'limit': 101},
+                       {'pantry': '1', 'max_missing': -1},
+                       {'pantry': '1', 'offset': 'x'}):
+            res = self.client.get(COOK_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
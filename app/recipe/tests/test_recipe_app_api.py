@@ -1,7 +1,9 @@
 import tempfile
 import os
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APIClient
 from core.models import Recipe, Tag, Ingredient
@@ -136,10 +138,32 @@ class ImageUploadTest(TestCase):
             res = self.client.post(url, {'image': ntf}, format='multipart')
 
         self.recipe.refresh_from_db()
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
         self.assertIn('image', res.data)
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_PROCESSING)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    @override_settings(RECIPE_IMAGE_WORKERS=0, RECIPE_IMAGE_FORMAT='JPEG')
+    def test_image_variants(self):
+        """resized variants are rendered without exif data"""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            exif = Image.Exif()
+            exif[0x0110] = 'phone model'
+            Image.new('RGB', (2000, 1000)).save(ntf, format='JPEG',
+                                                exif=exif)
+            ntf.seek(0)
+            res = self.client.post(url, {'image': ntf}, format='multipart')
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.data['image_status'], Recipe.IMAGE_READY)
+        for variant, width in ((self.recipe.image_thumbnail, 200),
+                               (self.recipe.image_medium, 1024)):
+            with Image.open(variant.path) as image:
+                self.assertEqual(image.size, (width, width // 2))
+                self.assertEqual(len(image.getexif()), 0)
+            variant.delete(save=False)
+
     def test_upload_image_bad_request(self):
         """Test uploading an invalid image"""
         url = image_upload_url(self.recipe.id)
@@ -190,3 +214,216 @@ class ImageUploadTest(TestCase):
         self.assertIn(serialiser1.data, res.data)
         self.assertIn(serialiser2.data, res.data)
         self.assertNotIn(serialiser3.data, res.data)
+
+
+class RecipeFilterTests(TestCase):
+    """tag and ingredient filter semantics"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'filter@some.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag1 = sample_tag(user=self.user, name='vegan')
+        self.tag2 = sample_tag(user=self.user, name='spicy')
+        self.both = sample_recipe(user=self.user, title='chana masala')
+        self.both.tags.add(self.tag1, self.tag2)
+        self.one = sample_recipe(user=self.user, title='salad')
+        self.one.tags.add(self.tag1)
+
+    def test_filter_any_without_duplicates(self):
+        """a recipe matching several ids is returned once"""
+        res = self.client.get(RECIPE_URL,
+                              {'tags': f'{self.tag1.id},{self.tag2.id}'})
+
+        ids = [recipe['id'] for recipe in res.data]
+        self.assertEqual(sorted(ids), sorted([self.both.id, self.one.id]))
+
+    def test_filter_match_all(self):
+        """match=all only returns recipes carrying every id"""
+        res = self.client.get(RECIPE_URL, {
+            'tags': f'{self.tag1.id},{self.tag2.id}',
+            'match': 'all'
+        })
+
+        self.assertEqual([recipe['id'] for recipe in res.data],
+                         [self.both.id])
+
+    def test_filter_malformed_ids(self):
+        """malformed id lists are a bad request"""
+        res = self.client.get(RECIPE_URL, {'tags': '1,x'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', res.data)
+
+    def test_filter_invalid_match(self):
+        """unknown match modes are a bad request"""
+        res = self.client.get(RECIPE_URL, {'tags': '1', 'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RecipeRangeOrderingTests(TestCase):
+    """time and price ranges and the ordering param"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'range@some.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = sample_tag(user=self.user, name='quick')
+        self.quick = sample_recipe(user=self.user, time_minute=15,
+                                   price='12.00')
+        self.quick.tags.add(self.tag)
+        self.cheap = sample_recipe(user=self.user, time_minute=45,
+                                   price='4.50')
+        self.both = sample_recipe(user=self.user, time_minute=20,
+                                  price='8.00')
+        self.slow = sample_recipe(user=self.user, time_minute=90,
+                                  price='8.00')
+        self.slow.tags.add(self.tag)
+
+    def ids(self, params):
+        res = self.client.get(RECIPE_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in res.data]
+
+    def test_filter_ranges(self):
+        """bounds are inclusive and combine with each other and tags"""
+        self.assertEqual(self.ids({'time_minute__lte': 30}),
+                         [self.both.id, self.quick.id])
+        self.assertEqual(self.ids({'price__lte': '8', 'price__gte': 5}),
+                         [self.slow.id, self.both.id])
+        self.assertEqual(
+            self.ids({'time_minute__lte': 30, 'price__lte': 10}),
+            [self.both.id])
+        self.assertEqual(
+            self.ids({'time_minute__gte': 20, 'tags': self.tag.id}),
+            [self.slow.id])
+
+    def test_filter_ranges_beyond_columns(self):
+        """bounds outside the range of the columns are clamped to it"""
+        everything = self.ids({})
+        for params in ({'price__lte': '1e999999999'},
+                       {'price__gte': '-1e999999999'},
+                       {'price__gte': '1e-999999999'},
+                       {'time_minute__lte': 2 ** 40}):
+            self.assertEqual(self.ids(params), everything)
+        for params in ({'price__gte': '1e999999999'},
+                       {'price__lte': '-1e-999999999'},
+                       {'time_minute__gte': 2 ** 40}):
+            self.assertEqual(self.ids(params), [])
+        self.assertEqual(self.ids({'price__gte': '7.999',
+                                   'price__lte': '8.001'}),
+                         [self.slow.id, self.both.id])
+
+    def test_ordering(self):
+        """ordering fields in either direction, ties broken by id"""
+        self.assertEqual(
+            self.ids({'ordering': 'price'}),
+            [self.cheap.id, self.both.id, self.slow.id, self.quick.id])
+        self.assertEqual(
+            self.ids({'ordering': '-price'}),
+            [self.quick.id, self.slow.id, self.both.id, self.cheap.id])
+        self.assertEqual(
+            self.ids({'ordering': 'price,-time_minute',
+                      'time_minute__gte': 20}),
+            [self.cheap.id, self.slow.id, self.both.id])
+
+    def test_ordering_keyset_pages(self):
+        """the cursor carries the price of the last recipe"""
+        pages, res = [], self.client.get(
+            RECIPE_URL, {'ordering': 'price', 'page_size': 1})
+        while True:
+            pages.extend(recipe['id'] for recipe in res.data['results'])
+            if res.data['next'] is None:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(pages, self.ids({'ordering': 'price'}))
+
+    def test_invalid_params(self):
+        """malformed bounds and unknown ordering fields are rejected"""
+        for params in ({'price__lte': 'cheap'}, {'price__gte': 'NaN'},
+                       {'time_minute__gte': '1.5'},
+                       {'ordering': 'user'}, {'ordering': 'price,'}):
+            res = self.client.get(RECIPE_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(next(iter(params)), res.data)
+
+
+class RecipeRelatedIdsTests(TestCase):
+    """validation of submitted tag and ingredient ids"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'related@some.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def payload(self, tags, ingredients=()):
+        return {
+            'title': 'thali',
+            'time_minute': 30,
+            'price': '9.00',
+            'tags': [tag.id for tag in tags],
+            'ingredients': [ingredient.id for ingredient in ingredients],
+        }
+
+    def count_create_queries(self, tags):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(RECIPE_URL, self.payload(tags),
+                                   format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return len(queries)
+
+    def test_create_with_tags(self):
+        """a recipe is created with its tags and ingredients"""
+        tag = sample_tag(user=self.user)
+        ingredient = sample_ingredient(user=self.user)
+
+        res = self.client.post(RECIPE_URL, self.payload([tag], [ingredient]),
+                               format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(list(recipe.tags.all()), [tag])
+        self.assertEqual(list(recipe.ingredients.all()), [ingredient])
+
+    def test_tag_lookup_is_batched(self):
+        """fifty tags cost as many queries as one"""
+        tags = [sample_tag(user=self.user, name=f'tag {i}')
+                for i in range(50)]
+        # the first write creates the version counters of the user
+        self.count_create_queries(tags[:1])
+
+        self.assertEqual(self.count_create_queries(tags[:1]),
+                         self.count_create_queries(tags))
+
+    def test_other_users_tags_rejected(self):
+        """tags of another user can not be referenced"""
+        other = get_user_model().objects.create_user('o@o.com', 'otherpass')
+        foreign = sample_tag(user=other)
+
+        res = self.client.post(RECIPE_URL, self.payload([foreign]),
+                               format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_all_missing_ids_reported(self):
+        """every invalid id is reported in one response"""
+        payload = self.payload([])
+        payload['tags'] = [0, -1, 'x']
+
+        res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data['tags']), 3)
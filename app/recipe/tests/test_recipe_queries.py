@@ -0,0 +1,86 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    """return details of recipe"""
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def seed_recipes(user, count):
+    """bulk create recipes each linked to two tags and two ingredients"""
+    tags = [Tag.objects.create(user=user, name=f'tag {i}') for i in range(2)]
+    ingredients = [
+        Ingredient.objects.create(user=user, name=f'ingredient {i}')
+        for i in range(2)
+    ]
+    Recipe.objects.bulk_create([
+        Recipe(user=user, title=f'recipe {i}', time_minute=10, price=5.00)
+        for i in range(count)
+    ])
+    recipes = list(Recipe.objects.filter(user=user))
+    Recipe.tags.through.objects.bulk_create([
+        Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+        for recipe in recipes for tag in tags
+    ])
+    Recipe.ingredients.through.objects.bulk_create([
+        Recipe.ingredients.through(
+            recipe_id=recipe.id, ingredient_id=ingredient.id)
+        for recipe in recipes for ingredient in ingredients
+    ])
+    return recipes
+
+
+class RecipeQueryCountTests(TestCase):
+    """query count stays fixed regardless of the number of recipes"""
+
+    # etag version counters, recipes, tags and ingredients
+    EXPECTED_QUERIES = 4
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'queries@some.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+
+    def assert_list_queries(self, count):
+        seed_recipes(self.user, count)
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), count)
+        self.assertEqual(len(res.data[0]['tags']), 2)
+        self.assertEqual(len(res.data[0]['ingredients']), 2)
+
+    def test_list_one_recipe(self):
+        """list a single recipe"""
+        self.assert_list_queries(1)
+
+    def test_list_ten_recipes(self):
+        """list ten recipes"""
+        self.assert_list_queries(10)
+
+    def test_list_five_hundred_recipes(self):
+        """list five hundred recipes"""
+        self.assert_list_queries(500)
+
+    def test_retrieve_recipe(self):
+        """retrieve a recipe with nested tags and ingredients"""
+        recipe = seed_recipes(self.user, 10)[0]
+        with self.assertNumQueries(self.EXPECTED_QUERIES):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['tags']), 2)
+        self.assertEqual(res.data['tags'][0]['name'], 'tag 0')
@@ -0,0 +1,118 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+class RecipeSearchTests(TestCase):
+    """full text and typo tolerant search"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'search@some.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.chicken = Tag.objects.create(user=self.user, name='chicken')
+        self.tomato = Ingredient.objects.create(user=self.user,
+                                                name='tomatoes')
+        self.curry = self.recipe('Butter chicken curry')
+        self.soup = self.recipe('Creamy soup', tags=[self.chicken],
+                                ingredients=[self.tomato])
+        self.salad = self.recipe('Tomato salad')
+
+    def recipe(self, title, user=None, tags=(), ingredients=()):
+        recipe = Recipe.objects.create(user=user or self.user, title=title,
+                                       time_minute=10, price='5.00')
+        recipe.tags.add(*tags)
+        recipe.ingredients.add(*ingredients)
+        return recipe
+
+    def search(self, text, url=RECIPES_URL, **params):
+        res = self.client.get(url, {'search': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [item['id'] for item in res.data['results']]
+
+    def test_title_tags_and_ingredients(self):
+        """titles rank above tag names, word forms are stemmed"""
+        self.assertEqual(self.search('chicken'),
+                         [self.curry.id, self.soup.id])
+        self.assertEqual(self.search('tomato'),
+                         [self.salad.id, self.soup.id])
+        self.assertEqual(self.search('creamy chicken soup'),
+                         [self.soup.id])
+
+    def test_typos_of_names(self):
+        """words close to a tag or ingredient name match it"""
+        self.assertEqual(self.search('chikcen soup'), [self.soup.id])
+        self.assertEqual(self.search('tomatoe'),
+                         [self.salad.id, self.soup.id])
+
+    def test_user_and_filters(self):
+        """other users' recipes never match, filters still apply"""
+        other = get_user_model().objects.create_user('o@some.com', 'pass')
+        self.recipe('Chicken pie', user=other)
+
+        self.assertEqual(self.search('chicken', tags=self.chicken.id),
+                         [self.soup.id])
+        self.assertEqual(self.search('pie'), [])
+
+    def test_vector_follows_changes(self):
+        """renames and relation changes are searchable at once"""
+        self.chicken.name = 'poultry'
+        self.chicken.save()
+        self.soup.ingredients.remove(self.tomato)
+        self.salad.title = 'Green salad'
+        self.salad.save()
+
+        self.assertEqual(self.search('poultry'), [self.soup.id])
+        self.assertEqual(self.search('tomato'), [])
+
+    def test_keyset_pages(self):
+        """ranked results are paginated, the cursor keeps the rank"""
+        for i in range(4):
+            self.recipe(f'Chicken {"chicken " * i}wings')
+
+        pages, res = [], self.client.get(
+            RECIPES_URL, {'search': 'chicken', 'page_size': 2})
+        while True:
+            pages.extend(item['id'] for item in res.data['results'])
+            if res.data['next'] is None:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(len(pages), 6)
+        self.assertEqual(pages, self.search('chicken', page_size=10))
+        self.assertEqual(len(set(pages)), 6)
+
+    def test_older_matches_ranked(self):
+        """the best match is first however many newer ones match"""
+        stock = Ingredient.objects.create(user=self.user, name='soup stock')
+        stews = Recipe.objects.bulk_create([
+            Recipe(user=self.user, title=f'Stew {i}', time_minute=10,
+                   price='5.00') for i in range(1500)])
+        Recipe.ingredients.through.objects.bulk_create([
+            Recipe.ingredients.through(recipe_id=stew.id,
+                                       ingredient_id=stock.id)
+            for stew in stews])
+
+        self.assertEqual(self.search('soup', page_size=2),
+                         [self.soup.id, stews[-1].id])
+
+    def test_search_names(self):
+        """tags and ingredients by similar or partial name"""
+        Tag.objects.create(user=self.user, name='vegan')
+
+        self.assertEqual(self.search('chiken', url=TAGS_URL),
+                         [self.chicken.id])
+        self.assertEqual(self.search('tomat', url=INGREDIENTS_URL),
+                         [self.tomato.id])
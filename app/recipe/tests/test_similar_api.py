@@ -0,0 +1,142 @@
+import math
+import random
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, RecipeNeighbours, Tag, Ingredient
+from recipe.similar import SimilarityIndex, precompute_user
+
+
+def similar_url(recipe_id):
+    return reverse('recipe:recipe-similar', args=[recipe_id])
+
+
+class SimilarityIndexTests(SimpleTestCase):
+    """vectorised ranking agrees with scoring each pair"""
+
+    def test_matches_brute_force(self):
+        rng = random.Random(0)
+        recipes = {recipe_id: set(rng.sample(range(30), rng.randint(0, 10)))
+                   for recipe_id in range(1, 1000)}
+        links = [(recipe_id, key) for recipe_id, keys in recipes.items()
+                 for key in keys]
+        index = SimilarityIndex(sorted(recipes, reverse=True), links)
+        metrics = {
+            'jaccard': lambda a, b: len(a & b) / len(a | b),
+            'cosine': lambda a, b: len(a & b) / math.sqrt(len(a) * len(b)),
+        }
+
+        for metric, score in metrics.items():
+            for recipe_id in rng.sample(sorted(recipes), 20):
+                keys = recipes[recipe_id]
+                expected = sorted(
+                    (-round(score(keys, other), 4), -other_id)
+                    for other_id, other in recipes.items()
+                    if other_id != recipe_id and keys & other)[:50]
+
+                found = index.similar(keys, 50, metric, recipe_id)
+
+                self.assertEqual(found, [(-other_id, -value)
+                                         for value, other_id in expected])
+
+
+class SimilarApiTests(TestCase):
+    """recipes sharing tags and ingredients with one of the user's"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'similar@some.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='vegan')
+        self.rice, self.dal, self.ghee = (
+            Ingredient.objects.create(user=self.user, name=name)
+            for name in ('rice', 'dal', 'ghee'))
+
+    def recipe(self, title, tags=(), ingredients=(), user=None):
+        recipe = Recipe.objects.create(user=user or self.user, title=title,
+                                       time_minute=10, price='1.00')
+        recipe.tags.add(*tags)
+        recipe.ingredients.add(*ingredients)
+        return recipe
+
+    def similar(self, recipe, **params):
+        res = self.client.get(similar_url(recipe.id), params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [(item['id'], item['similarity']) for item in res.data]
+
+    def test_ranked_by_similarity(self):
+        """most shared tags and ingredients first, itself left out"""
+        khichdi = self.recipe('khichdi', [self.vegan], [self.rice, self.dal])
+        dal = self.recipe('dal', [self.vegan], [self.dal])
+        pulao = self.recipe('pulao', [], [self.rice, self.ghee])
+        tadka = self.recipe('tadka', [self.vegan], [self.rice, self.dal,
+                                                    self.ghee])
+        self.recipe('water')
+        other = get_user_model().objects.create_user('o@some.com', 'pass')
+        self.recipe('dal', [Tag.objects.create(user=other, name='v')],
+                    user=other)
+
+        self.assertEqual(self.similar(khichdi), [
+            (tadka.id, 0.75), (dal.id, 0.6667), (pulao.id, 0.25)])
+        self.assertEqual(self.similar(khichdi, metric='cosine', limit=2), [
+            (tadka.id, 0.866), (dal.id, 0.8165)])
+
+    def test_index_follows_writes(self):
+        """orm and api writes both show in the next ranking"""
+        khichdi = self.recipe('khichdi', [self.vegan], [self.rice])
+        dal = self.recipe('dal', [], [self.dal])
+        self.assertEqual(self.similar(khichdi), [])
+
+        dal.tags.add(self.vegan)
+        self.assertEqual(self.similar(khichdi), [(dal.id, 0.3333)])
+        self.client.patch(reverse('recipe:recipe-detail', args=[dal.id]),
+                          {'ingredients': [self.rice.id]}, format='json')
+        self.assertEqual(self.similar(khichdi), [(dal.id, 1.0)])
+
+    def test_precomputed_neighbours(self):
+        """stored neighbours are served until an api write"""
+        khichdi = self.recipe('khichdi', [self.vegan], [self.rice])
+        dal = self.recipe('dal', [self.vegan], [self.dal])
+        self.assertEqual(precompute_user(self.user.id), 2)
+        self.assertEqual(RecipeNeighbours.objects.get(recipe=khichdi)
+                         .neighbours, [{'id': dal.id, 'score': 0.3333}])
+
+        # recipe, prefetches, versions, neighbours, recipes and prefetches
+        with self.assertNumQueries(8):
+            self.assertEqual(self.similar(khichdi), [(dal.id, 0.3333)])
+        self.client.patch(reverse('recipe:recipe-detail', args=[dal.id]),
+                          {'ingredients': [self.rice.id]}, format='json')
+        self.assertEqual(self.similar(khichdi), [(dal.id, 1.0)])
+
+    def test_precomputed_per_metric(self):
+        """each metric keeps its own stored neighbours"""
+        khichdi = self.recipe('khichdi', [self.vegan], [self.rice])
+        self.recipe('dal', [self.vegan], [self.dal])
+
+        precompute_user(self.user.id, 'jaccard')
+        precompute_user(self.user.id, 'cosine')
+        precompute_user(self.user.id, 'cosine')
+
+        self.assertEqual(sorted(RecipeNeighbours.objects.filter(
+            recipe=khichdi).values_list('metric', flat=True)),
+            ['cosine', 'jaccard'])
+
+    def test_invalid_params(self):
+        """unknown metrics, out of range limits and others' recipes fail"""
+        recipe = self.recipe('khichdi')
+        other = get_user_model().objects.create_user('o@some.com', 'pass')
+        theirs = self.recipe('dal', user=other)
+
+        for params in ({'metric': 'euclid'}, {'limit': 0}, {'limit': 51}):
+            res = self.client.get(similar_url(recipe.id), params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get(similar_url(theirs.id))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+STATS_URL = reverse('recipe:stats')
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+class RecipeStatsApiTests(TestCase):
+    """statistics served from the counter tables"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'stats@some.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='vegan')
+        self.quick = Tag.objects.create(user=self.user, name='quick')
+        self.rice = Ingredient.objects.create(user=self.user, name='rice')
+
+    def recipe(self, time_minute, price, tags=(), ingredients=()):
+        recipe = Recipe.objects.create(user=self.user, title='dish',
+                                       time_minute=time_minute, price=price)
+        recipe.tags.add(*tags)
+        recipe.ingredients.add(*ingredients)
+        return recipe
+
+    def stats(self, **params):
+        res = self.client.get(STATS_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_empty_library(self):
+        """no recipes, no averages"""
+        self.assertEqual(self.stats(), {
+            'recipe_count': 0, 'average_time_minute': None,
+            'average_price': None, 'top_tags': [], 'top_ingredients': [],
+        })
+
+    def test_counters_follow_writes(self):
+        """creates, updates, deletes and link changes move the counters"""
+        dal = self.recipe(30, '4.00', tags=[self.vegan, self.quick],
+                          ingredients=[self.rice])
+        self.recipe(10, '2.50', tags=[self.vegan])
+        pie = self.recipe(60, '9.99', tags=[self.quick])
+        dal.time_minute = 20
+        dal.save()
+        dal.tags.remove(self.quick)
+        pie.delete()
+        other = get_user_model().objects.create_user('o@some.com', 'pass')
+        Recipe.objects.create(user=other, title='x', time_minute=1,
+                              price='1.00')
+
+        data = self.stats()
+
+        self.assertEqual(data['recipe_count'], 2)
+        self.assertEqual(data['average_time_minute'], 15)
+        self.assertEqual(str(data['average_price']), '3.25')
+        self.assertEqual(data['top_tags'], [
+            {'id': self.vegan.id, 'name': 'vegan', 'usage_count': 2}])
+        self.assertEqual(data['top_ingredients'], [
+            {'id': self.rice.id, 'name': 'rice', 'usage_count': 1}])
+
+    def test_bulk_writes_and_limit(self):
+        """bulk created recipes are counted, limit caps the top lists"""
+        res = self.client.post(BULK_URL, [
+            {'title': f'dish {i}', 'time_minute': 10, 'price': '1.00',
+             'tags': [self.vegan.id] + [self.quick.id] * (i % 2),
+             'ingredients': []}
+            for i in range(5)
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        data = self.stats(limit=1)
+
+        self.assertEqual(data['recipe_count'], 5)
+        self.assertEqual(data['top_tags'], [
+            {'id': self.vegan.id, 'name': 'vegan', 'usage_count': 5}])
+
+    def test_constant_queries(self):
+        """one query per counter table whatever the library size"""
+        for _ in range(20):
+            self.recipe(10, '1.00', tags=[self.vegan],
+                        ingredients=[self.rice])
+
+        with self.assertNumQueries(3):
+            self.client.get(STATS_URL)
+
+    def test_invalid_limit(self):
+        """limits outside 1..100 are a bad request"""
+        for limit in ('0', '101', 'ten'):
+            res = self.client.get(STATS_URL, {'limit': limit})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,130 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Recipe, RecipeSummary, Tag, Ingredient
+from recipe.summary import id_ranges, stale_summaries
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class RecipeSummaryTests(TestCase):
+    """summaries follow every change of the links and names"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'summary@some.com',
+            'testpass'
+        )
+        self.client.force_authenticate(self.user)
+        self.vegan = Tag.objects.create(user=self.user, name='vegan')
+        self.quick = Tag.objects.create(user=self.user, name='quick')
+        self.rice = Ingredient.objects.create(user=self.user, name='rice')
+        self.recipe = Recipe.objects.create(user=self.user, title='pulao',
+                                            time_minute=20, price='4.00')
+
+    def summary(self, recipe=None):
+        return RecipeSummary.objects.get(recipe=recipe or self.recipe)
+
+    def assert_consistent(self):
+        self.assertEqual([recipe_id for start, stop in id_ranges()
+                          for recipe_id in stale_summaries(start, stop)], [])
+
+    def test_links_from_both_sides(self):
+        """adds, removes and clears from the recipe or the tag"""
+        self.assertEqual(self.summary().tags, [])
+        self.recipe.tags.add(self.quick, self.vegan)
+        self.recipe.ingredients.add(self.rice)
+
+        summary = self.summary()
+        self.assertEqual(summary.tags, [
+            {'id': self.vegan.id, 'name': 'vegan'},
+            {'id': self.quick.id, 'name': 'quick'},
+        ])
+        self.assertEqual(summary.ingredients,
+                         [{'id': self.rice.id, 'name': 'rice'}])
+
+        self.recipe.tags.remove(self.vegan)
+        self.vegan.recipe_set.add(self.recipe)
+        self.quick.recipe_set.clear()
+        self.assertEqual([tag['id'] for tag in self.summary().tags],
+                         [self.vegan.id])
+        self.recipe.ingredients.clear()
+        self.assertEqual(self.summary().ingredients, [])
+        self.assert_consistent()
+
+    def test_rename_and_delete(self):
+        """renamed and deleted tags leave the summaries"""
+        self.recipe.tags.add(self.vegan, self.quick)
+        self.vegan.name = 'plant based'
+        self.vegan.save()
+        self.quick.delete()
+
+        self.assertEqual(self.summary().tags,
+                         [{'id': self.vegan.id, 'name': 'plant based'}])
+        self.assert_consistent()
+
+    def test_bulk_writes(self):
+        """bulk created and patched recipes get their summaries"""
+        res = self.client.post(BULK_URL, [{
+            'title': 'dal', 'time_minute': 30, 'price': '3.00',
+            'tags': [self.vegan.id], 'ingredients': [self.rice.id],
+        }], format='json')
+        created = res.data[0]['id']
+        self.client.patch(BULK_URL, [{'id': created, 'tags': []}],
+                          format='json')
+        self.client.patch(reverse('recipe:ingredient-bulk'), [
+            {'id': self.rice.id, 'name': 'basmati'}], format='json')
+
+        summary = self.summary(created)
+        self.assertEqual(summary.tags, [])
+        self.assertEqual(summary.ingredients,
+                         [{'id': self.rice.id, 'name': 'basmati'}])
+        self.assert_consistent()
+
+    def test_bulk_delete_refreshes_batch(self):
+        """bulk deleted tags leave the summaries in a flat number of queries
+        """
+        tags = [Tag.objects.create(user=self.user, name=f'tag {i}')
+                for i in range(20)]
+        self.recipe.tags.add(self.vegan, *tags)
+        url = reverse('recipe:tag-bulk')
+
+        with CaptureQueriesContext(connection) as few:
+            self.client.delete(url, [tag.id for tag in tags[:2]],
+                               format='json')
+        with CaptureQueriesContext(connection) as many:
+            self.client.delete(url, [tag.id for tag in tags[2:]],
+                               format='json')
+
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(self.summary().tags,
+                         [{'id': self.vegan.id, 'name': 'vegan'}])
+        self.assert_consistent()
+
+    def test_api_parity(self):
+        """list and detail render the same from the summaries"""
+        self.recipe.tags.add(self.vegan, self.quick)
+        self.recipe.ingredients.add(self.rice)
+        Recipe.objects.create(user=self.user, title='toast', time_minute=5,
+                              price='1.00')
+        for fast in (False, True):
+            for url in (RECIPES_URL, detail_url(self.recipe.id)):
+                with override_settings(RECIPE_API_FAST_SERIALIZERS=fast,
+                                       RECIPE_API_SUMMARIES=False):
+                    expected = self.client.get(url).content
+                with override_settings(RECIPE_API_FAST_SERIALIZERS=fast,
+                                       RECIPE_API_SUMMARIES=True):
+                    actual = self.client.get(url).content
+
+                self.assertEqual(actual, expected)
@@ -103,3 +103,27 @@ class PrivateTagsApiTests(TestCase):
         recipe2.tags.add(tag1)
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
         self.assertEqual(len(res.data), 1)
+
+    def test_tags_usage_count(self):
+        """usage_count annotates how many recipes use each tag"""
+        tag1 = Tag.objects.create(user=self.user, name='Lunch')
+        tag2 = Tag.objects.create(user=self.user, name='Dinner')
+        for _ in range(2):
+            recipe = Recipe.objects.create(
+                title='Methi paratha',
+                time_minute=10,
+                price=5.00,
+                user=self.user
+            )
+            recipe.tags.add(tag1)
+
+        res = self.client.get(TAGS_URL, {'usage_count': 1})
+
+        counts = {tag['id']: tag['usage_count'] for tag in res.data}
+        self.assertEqual(counts, {tag1.id: 2, tag2.id: 0})
+
+    def test_assigned_only_invalid(self):
+        """a malformed assigned_only flag is a bad request"""
+        res = self.client.get(TAGS_URL, {'assigned_only': 'yes'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
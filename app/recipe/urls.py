@@ -12,4 +12,7 @@ app_name = 'recipe'
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('stats/', views.RecipeStatsView.as_view(), name='stats'),
+    path('cache-stats/', views.ListCacheStatsView.as_view(),
+         name='cache-stats'),
 ]
@@ -1,36 +1,173 @@
+from decimal import ROUND_CEILING, ROUND_FLOOR, Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, DecimalField, Exists, F, OuterRef
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.views import APIView
 
 from core.models import Tag, Ingredient, Recipe
+from core.storage import release_recipe_images
+from user.authentication import CachedTokenAuthentication
 
 from recipe.serialisers import (
     TagSerializer, IngredientSerializer, RecipeSerializer,
-    RecipeDetailSerializer, UploadImageSerializer)
+    RecipeDetailSerializer, UploadImageSerializer, RecipeBulkSerializer,
+    RecipeSummarySerializer, RecipeSummaryDetailSerializer, NameListField)
+from recipe.pagination import RecipeApiPagination
+from recipe.bulk import BulkModelMixin
+from recipe.cache import CachedListMixin, get_list_cache, invalidate_lists
+from recipe.conditional import (LINK_COLLECTIONS, ConditionalGetMixin,
+                                note_versions)
+from recipe.fastpath import FastListMixin
+from recipe.export import (EXPORT_CHUNK_SIZE, EXPORT_FORMATS,
+                           serialised_recipes, stream_export)
+from recipe.images import schedule_image_processing
+from recipe.names import is_name_conflict, name_conflicts, resolve_names
+from recipe.pantry import get_index
+from recipe.search import search_names, search_recipes
+from recipe.similar import (MAX_SIMILAR_LIMIT, METRICS, SIMILAR_LIMIT,
+                            similar_recipes)
+from recipe.stats import MAX_TOP_LIMIT, TOP_LIMIT, user_stats
+from recipe.summary import refresh_summaries, summaries_deferred
 
 
-class BaseRecipeViewSet(viewsets.GenericViewSet, mixins.ListModelMixin,
-                        mixins.CreateModelMixin):
+class BaseRecipeViewSet(ConditionalGetMixin, CachedListMixin, FastListMixin,
+                        BulkModelMixin, viewsets.GenericViewSet,
+                        mixins.ListModelMixin, mixins.CreateModelMixin):
     """common base class for tags and recipe"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeApiPagination
+
+    # through table linking recipes to the model and the column pointing at it
+    recipe_through = None
+    recipe_through_field = None
+
+    def _flag_param(self, name):
+        """read a 0/1 query param"""
+        try:
+            return bool(int(self.request.query_params.get(name, 0)))
+        except ValueError:
+            raise ValidationError({name: 'Expected 0 or 1.'})
+
+    def _recipe_usages(self):
+        """through table rows correlated to the outer object"""
+        return self.recipe_through.objects.filter(
+            **{self.recipe_through_field: OuterRef('pk')}
+        ).order_by()
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', 0))
-        )
-        queryset = self.queryset
+        assigned_only = self._flag_param('assigned_only')
+        usage_count = self._flag_param('usage_count')
+        queryset = self.queryset.filter(user=self.request.user)
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
-        return queryset.filter(user=self.request.user
-                               ).order_by('-name').distinct()
+            # semi join, one probe per object instead of a deduped fan-out
+            queryset = queryset.annotate(
+                assigned=Exists(self._recipe_usages())
+            ).filter(assigned=True)
+        if usage_count:
+            # counter kept by the triggers of core migration 0013
+            queryset = queryset.annotate(
+                usage_count=Coalesce(F('usage__recipe_count'), 0))
+        queryset = queryset.order_by('-name', 'id')
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = search_names(queryset, search)
+        return queryset
+
+    def duplicate_name_message(self):
+        model = self.queryset.model._meta.verbose_name
+        return f'{model.capitalize()} with this name already exists.'
 
     def perform_create(self, serializer):
         """create objects"""
-        serializer.save(user=self.request.user)
+        try:
+            with transaction.atomic():
+                serializer.save(user=self.request.user)
+        except IntegrityError as exc:
+            if not is_name_conflict(exc, self.queryset.model):
+                raise
+            raise ValidationError({'name': [self.duplicate_name_message()]})
+        invalidate_lists(self.request.user.id, self.cache_collection)
+
+    def name_conflicts_response(self, items, with_ids):
+        """per item errors of a batch refused by the unique names"""
+        named = [(position, item) for position, item in enumerate(items)
+                 if isinstance(item, dict) and 'name' in item]
+        conflicts = name_conflicts(
+            self.queryset.model, self.request.user.id,
+            [str(item['name']) for _, item in named],
+            [item.get('id') for _, item in named] if with_ids else None)
+        # a concurrent write took the name, every named item may clash
+        conflicts = conflicts or range(len(named))
+        errors = [{} for _ in items]
+        for index in conflicts:
+            errors[named[index][0]]['name'] = [self.duplicate_name_message()]
+        return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def bulk_create(self, request):
+        try:
+            return super().bulk_create(request)
+        except IntegrityError as exc:
+            if not is_name_conflict(exc, self.queryset.model):
+                raise
+            return self.name_conflicts_response(request.data, False)
+
+    def bulk_update(self, request):
+        try:
+            return super().bulk_update(request)
+        except IntegrityError as exc:
+            if not is_name_conflict(exc, self.queryset.model):
+                raise
+            return self.name_conflicts_response(request.data, True)
+
+    @action(methods=['POST'], detail=False, url_path='resolve')
+    def resolve(self, request):
+        """ids of a list of names, creating the missing ones
+
+        Names resolve to the row of the user whose name normalises alike,
+        in one INSERT .. ON CONFLICT statement, in submission order.
+        """
+        names = NameListField(max_length=self.bulk_max_items).run_validation(
+            request.data)
+        with transaction.atomic():
+            resolved = resolve_names(self.queryset.model, request.user.id,
+                                     names)
+            if any(created for _, _, created in resolved):
+                self.bump_versions()
+                invalidate_lists(request.user.id, self.cache_collection)
+        return Response([
+            {'id': pk, 'name': name, 'created': created}
+            for pk, name, created in resolved
+        ])
+
+    def linked_recipe_ids(self, pks):
+        """ids of the recipes linking any of the objects, in one query"""
+        return list(self.recipe_through.objects.filter(
+            **{f'{self.recipe_through_field}__in': pks}
+        ).values_list('recipe_id', flat=True).distinct())
+
+    def perform_bulk_delete(self, pks):
+        # one refresh for the batch instead of the per object signals
+        recipe_ids = self.linked_recipe_ids(pks)
+        with summaries_deferred():
+            super().perform_bulk_delete(pks)
+        refresh_summaries(recipe_ids)
+
+    def perform_bulk_write(self, pks):
+        self.bump_versions()
+        invalidate_lists(self.request.user.id, self.cache_collection)
+        if self.request.method == 'PATCH':
+            # renames show in the summaries of the recipes linking them
+            refresh_summaries(self.linked_recipe_ids(pks))
 
 
 class TagViewSet(BaseRecipeViewSet):
@@ -38,45 +175,200 @@ class TagViewSet(BaseRecipeViewSet):
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    cache_collection = 'tag'
+    version_collection = 'tag'
+    etag_collections = ('tag', 'tag_links')
+    recipe_through = Recipe.tags.through
+    recipe_through_field = 'tag'
 
 
 class IngredientViewSet(BaseRecipeViewSet):
     """manage ingredients"""
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    cache_collection = 'ingredient'
+    version_collection = 'ingredient'
+    etag_collections = ('ingredient', 'ingredient_links')
+    recipe_through = Recipe.ingredients.through
+    recipe_through_field = 'ingredient'
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin, FastListMixin, BulkModelMixin,
+                    viewsets.ModelViewSet):
     """manage recipes"""
-    queryset = Recipe.objects.all()
+    # the search vector is only read by the database
+    queryset = Recipe.objects.defer('search_vector')
     serializer_class = RecipeSerializer
-    authentication_classes = (TokenAuthentication,)
+    bulk_serializer_class = RecipeBulkSerializer
+    bulk_relations = {
+        'tags': (Tag, Recipe.tags.through, 'tag'),
+        'ingredients': (Ingredient, Recipe.ingredients.through, 'ingredient'),
+    }
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeApiPagination
+    version_collection = 'recipe'
+    export_chunk_size = EXPORT_CHUNK_SIZE
 
-    def _filter_extract_params(self, qs):
+    match_modes = ('any', 'all')
+    # range filters as `<field>__lte` / `<field>__gte` and their value types
+    range_filters = {
+        'time_minute': int,
+        'price': Decimal,
+    }
+    # `ordering` accepts these fields, `-` prefixed for descending
+    ordering_fields = ('id', 'time_minute', 'price', 'title')
+    # page size of the pantry matches by default and at most
+    cook_limit = 20
+    max_cook_limit = 100
+
+    def _filter_extract_params(self, qs, param='ids'):
         """extract params in list"""
-        return [int(id) for id in qs.split(',')]
+        try:
+            ids = {int(id) for id in qs.split(',')}
+        except ValueError:
+            raise ValidationError(
+                {param: 'Expected a comma separated list of ids.'})
+        return sorted(ids)
+
+    def _filter_ranges(self, queryset):
+        """apply the `<field>__lte` / `<field>__gte` params"""
+        for field, cast in self.range_filters.items():
+            for lookup in ('gte', 'lte'):
+                param = f'{field}__{lookup}'
+                value = self.request.query_params.get(param)
+                if value is None:
+                    continue
+                try:
+                    value = cast(value)
+                    valid = Decimal(value).is_finite()
+                except (ValueError, InvalidOperation):
+                    valid = False
+                if not valid:
+                    raise ValidationError({param: 'Expected a number.'})
+                queryset = queryset.filter(
+                    **{param: self._clamp_bound(field, lookup, value)})
+        return queryset
+
+    def _clamp_bound(self, field, lookup, value):
+        """bound within the range of the column, the database refuses
+        parameters overflowing it, the rows matched stay the same"""
+        model_field = Recipe._meta.get_field(field)
+        if isinstance(model_field, DecimalField):
+            places = Decimal(10) ** -model_field.decimal_places
+            high = Decimal(10) ** (model_field.max_digits -
+                                   model_field.decimal_places) - places
+            low = -high
+        else:
+            low, high = connection.ops.integer_field_range(
+                model_field.get_internal_type())
+        value = min(max(value, low), high)
+        if isinstance(model_field, DecimalField):
+            # the stored values have no more places
+            value = value.quantize(places, rounding=(
+                ROUND_CEILING if lookup == 'gte' else ROUND_FLOOR))
+        return value
+
+    def _ordering(self):
+        """ordering param as order_by() fields ending in an id tie breaker
+
+        The tie breaker follows the direction of the last field, so the
+        (user, field, id) indexes serve the ordering in either direction.
+        """
+        param = self.request.query_params.get('ordering')
+        if not param:
+            return None
+        ordering = [field.strip() for field in param.split(',')]
+        for field in ordering:
+            if field.lstrip('-') not in self.ordering_fields:
+                raise ValidationError({'ordering': (
+                    f'Expected a comma separated list of '
+                    f'{", ".join(self.ordering_fields)}.')})
+        ordering = list(dict.fromkeys(ordering))
+        if ordering[-1].lstrip('-') != 'id':
+            ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        return ordering
+
+    def _int_param(self, name, default, minimum=0, maximum=None):
+        """read an int query param within bounds"""
+        value = self.request.query_params.get(name)
+        if value is None:
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            value = minimum - 1
+        if maximum is None and value < minimum:
+            raise ValidationError(
+                {name: f'Expected a number of at least {minimum}.'})
+        if maximum is not None and not minimum <= value <= maximum:
+            raise ValidationError(
+                {name: f'Expected a number from {minimum} to {maximum}.'})
+        return value
+
+    def _filter_related(self, queryset, through, field, ids, match):
+        """recipes linked to any or all of the ids, without duplicates"""
+        links = through.objects.filter(**{f'{field}__in': ids}).order_by()
+        if match == 'all':
+            # one grouped pass over the through table, HAVING all ids
+            matching = links.values('recipe_id').annotate(
+                matched=Count(field)
+            ).filter(matched=len(ids)).values('recipe_id')
+            return queryset.filter(pk__in=matching)
+        return queryset.annotate(**{
+            f'{field}_matched': Exists(links.filter(recipe_id=OuterRef('pk')))
+        }).filter(**{f'{field}_matched': True})
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
+        match = self.request.query_params.get('match', 'any')
+        if match not in self.match_modes:
+            raise ValidationError(
+                {'match': f'Expected one of {", ".join(self.match_modes)}.'})
         queryset = self.queryset
         if tags:
-            tag_id = self._filter_extract_params(tags)
-            queryset = queryset.filter(tags__id__in=tag_id)
+            tag_id = self._filter_extract_params(tags, 'tags')
+            queryset = self._filter_related(
+                queryset, Recipe.tags.through, 'tag', tag_id, match)
         if ingredients:
-            ingredient_id = self._filter_extract_params(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_id)
-        return queryset.filter(user=self.request.user)
+            ingredient_id = self._filter_extract_params(
+                ingredients, 'ingredients')
+            queryset = self._filter_related(
+                queryset, Recipe.ingredients.through, 'ingredient',
+                ingredient_id, match)
+        queryset = self._filter_ranges(queryset)
+        ordering = self._ordering()
+        queryset = self._setup_eager_loading(queryset)
+        queryset = queryset.filter(user=self.request.user).order_by('-id')
+        search = self.request.query_params.get('search')
+        if search:
+            queryset = search_recipes(queryset, self.request.user, search)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
+
+    def _setup_eager_loading(self, queryset):
+        """prefetch relations needed by the serialiser of this action"""
+        serializer_class = self.get_serializer_class()
+        setup = getattr(serializer_class, 'setup_eager_loading', None)
+        if setup is None:
+            return queryset
+        return setup(queryset)
 
     # to get details instead of id in retrieve
     def get_serializer_class(self):
         """Return appropriate serializer class"""
-        if self.action == 'retrieve':
+        summaries = getattr(settings, 'RECIPE_API_SUMMARIES', False)
+        if self.action == 'retrieve' and summaries:
+            return RecipeSummaryDetailSerializer
+        if self.action in ('retrieve', 'export'):
             return RecipeDetailSerializer
         elif self.action == 'upload_image':
             return UploadImageSerializer
+        elif self.action in ('list', 'cook', 'similar') and summaries:
+            return RecipeSummarySerializer
 
         return self.serializer_class
 
@@ -84,6 +376,111 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """create objects"""
         serializer.save(user=self.request.user)
 
+    def perform_bulk_write(self, pks):
+        # created recipes have never been served, only the list changes
+        self.bump_versions(pks if self.request.method != 'POST' else ())
+        note_versions(self.request.user.id, LINK_COLLECTIONS)
+        # assigned_only and usage_count of the listings follow the links
+        invalidate_lists(self.request.user.id, 'tag', 'ingredient')
+        if self.request.method != 'DELETE':
+            # the through rows were bulk written without m2m_changed
+            refresh_summaries(pks)
+
+    @action(methods=['GET'], detail=False, url_path='export')
+    def export(self, request):
+        """stream the filtered recipes as json or ndjson"""
+        export_format = request.query_params.get('export_format', 'json')
+        if export_format not in EXPORT_FORMATS:
+            raise ValidationError({'export_format': (
+                f'Expected one of {", ".join(EXPORT_FORMATS)}.')})
+        items = serialised_recipes(
+            self.filter_queryset(self.get_queryset()),
+            self.get_serializer_class(), self.get_serializer_context(),
+            self.export_chunk_size)
+        response = StreamingHttpResponse(
+            stream_export(items, export_format),
+            content_type=EXPORT_FORMATS[export_format])
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{export_format}"')
+        return response
+
+    def _unsummarised_ingredients(self, items):
+        """ingredient ids of the serialised recipes rendered without a
+        summary, read from the links with one query"""
+        recipe_ids = [data['id'] for data in items
+                      if data['ingredients'] is None]
+        links = {}
+        if recipe_ids:
+            for recipe_id, ingredient_id in Recipe.ingredients.through.\
+                    objects.filter(recipe_id__in=recipe_ids).order_by(
+                        'ingredient_id').values_list('recipe_id',
+                                                     'ingredient_id'):
+                links.setdefault(recipe_id, []).append(ingredient_id)
+        return links
+
+    @action(methods=['GET'], detail=False, url_path='cook')
+    def cook(self, request):
+        """recipes ranked by how much of them the pantry ingredients cover
+
+        Fully covered recipes come first, then those missing the fewest
+        ingredients, newest first among equals. Recipes sharing no
+        ingredient with the pantry are left out unless they have none.
+        """
+        pantry = request.query_params.get('pantry')
+        if not pantry:
+            raise ValidationError(
+                {'pantry': 'Expected a comma separated list of ids.'})
+        pantry = self._filter_extract_params(pantry, 'pantry')
+        max_missing = self._int_param('max_missing', None)
+        limit = self._int_param('limit', self.cook_limit, 1,
+                                self.max_cook_limit)
+        offset = self._int_param('offset', 0)
+
+        count, page = get_index(request.user.id).match(
+            pantry, offset, limit, max_missing)
+        recipes = self._setup_eager_loading(self.queryset).in_bulk(
+            [recipe_id for recipe_id, missing in page])
+        # recipes deleted since the index was checked are left out
+        serializer = self.get_serializer(
+            [recipes[recipe_id] for recipe_id, missing in page
+             if recipe_id in recipes], many=True)
+        pantry = set(pantry)
+        links = self._unsummarised_ingredients(serializer.data)
+        results = []
+        for data in serializer.data:
+            if data['ingredients'] is None:
+                data['ingredients'] = links.get(data['id'], [])
+            data['missing_ingredients'] = [
+                ingredient for ingredient in data['ingredients']
+                if ingredient not in pantry]
+            data['missing_count'] = len(data['missing_ingredients'])
+            results.append(data)
+        return Response({'count': count, 'results': results})
+
+    @action(methods=['GET'], detail=True, url_path='similar')
+    def similar(self, request, pk=None):
+        """recipes sharing the most tags and ingredients with the recipe"""
+        metric = request.query_params.get('metric', METRICS[0])
+        if metric not in METRICS:
+            raise ValidationError(
+                {'metric': f'Expected one of {", ".join(METRICS)}.'})
+        limit = self._int_param('limit', SIMILAR_LIMIT, 1, MAX_SIMILAR_LIMIT)
+        recipe = self.get_object()
+
+        found = similar_recipes(recipe, limit, metric)
+        recipes = self._setup_eager_loading(self.queryset).in_bulk(
+            [recipe_id for recipe_id, score in found])
+        # recipes deleted since the neighbours were computed are left out
+        serializer = self.get_serializer(
+            [recipes[recipe_id] for recipe_id, score in found
+             if recipe_id in recipes], many=True)
+        scores = dict(found)
+        results = []
+        for data in serializer.data:
+            data['similarity'] = scores[data['id']]
+            results.append(data)
+        return Response(results)
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
         """Upload an image to a recipe"""
@@ -94,13 +491,46 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
         if serializer.is_valid():
-            serializer.save()
+            replaced = [recipe.image.name, recipe.image_thumbnail.name,
+                        recipe.image_medium.name]
+            serializer.save(image_thumbnail=None, image_medium=None,
+                            image_status=Recipe.IMAGE_PROCESSING)
+            schedule_image_processing(recipe)
+            transaction.on_commit(lambda: release_recipe_images(replaced))
             return Response(
                 serializer.data,
-                status=status.HTTP_200_OK
+                status=status.HTTP_202_ACCEPTED
             )
 
         return Response(
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+
+class RecipeStatsView(APIView):
+    """recipe count, averages and most used tags and ingredients"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', TOP_LIMIT))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= MAX_TOP_LIMIT:
+            raise ValidationError(
+                {'limit': f'Expected a number from 1 to {MAX_TOP_LIMIT}.'})
+        return Response(user_stats(request.user, limit))
+
+
+class ListCacheStatsView(APIView):
+    """hit and miss counters of the list cache in this process"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        cache = get_list_cache()
+        if cache is None:
+            return Response({'backend': None})
+        return Response(cache.stats())
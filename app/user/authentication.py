@@ -0,0 +1,90 @@
+"""token authentication backed by a token -> user cache
+
+DRF looks the token and its user up with a query on every request. Here the
+token is cached for TOKEN_AUTH_CACHE['TIMEOUT'] seconds and dropped by the
+signals of `user.signals` when the token is deleted or the user is saved,
+which covers deactivation and password changes. The cache holds the field
+values of both, every request gets instances of its own to change.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from rest_framework.authentication import TokenAuthentication
+
+
+# estimated size of a cached token with its user
+TOKEN_ENTRY_SIZE = 1024
+
+_token_cache = None
+
+
+def get_token_cache():
+    """cache configured by TOKEN_AUTH_CACHE, None when disabled"""
+    global _token_cache
+    if _token_cache is None:
+        config = getattr(settings, 'TOKEN_AUTH_CACHE', None)
+        if not config or not config.get('BACKEND'):
+            return None
+        _token_cache = import_string(config['BACKEND'])(
+            **config.get('OPTIONS', {}))
+    return _token_cache
+
+
+def token_cache_timeout():
+    return settings.TOKEN_AUTH_CACHE.get('TIMEOUT', 60)
+
+
+def invalidate_tokens(*keys):
+    """drop the cached tokens"""
+    cache = get_token_cache()
+    if cache is not None:
+        for key in keys:
+            cache.delete(f'token:{key}')
+
+
+def field_values(instance):
+    """values of the concrete fields of a model instance"""
+    return tuple(getattr(instance, field.attname)
+                 for field in instance._meta.concrete_fields)
+
+
+def from_values(model, db, values):
+    """instance of the model as loaded from the database with the values"""
+    return model.from_db(
+        db, [field.attname for field in model._meta.concrete_fields],
+        values)
+
+
+@receiver(setting_changed)
+def reset_token_cache(setting, **kwargs):
+    global _token_cache
+    if setting == 'TOKEN_AUTH_CACHE':
+        _token_cache = None
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """token authentication skipping the token query while it is cached"""
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        if cache is None:
+            return super().authenticate_credentials(key)
+
+        entry = cache.get(f'token:{key}')
+        if entry is not None:
+            db, token_values, user_values, expires = entry
+            if expires > time.time():
+                token = from_values(self.get_model(), db, token_values)
+                token.user = from_values(get_user_model(), db, user_values)
+                return (token.user, token)
+
+        user, token = super().authenticate_credentials(key)
+        cache.set(f'token:{key}', (
+            token._state.db, field_values(token), field_values(user),
+            time.time() + token_cache_timeout(),
+        ), size=TOKEN_ENTRY_SIZE)
+        return (user, token)
@@ -37,13 +37,8 @@ class AuthtokenSerializer(serializers.Serializer):
         email = attrs.get('email')
         password = attrs.get('password')
 
-        # check if user exists
-        user_exists = get_user_model().objects.filter(email=email)
-        # raise exception if user does not exists
-        if not user_exists:
-            msg = _('user does not exists')
-            raise serializers.ValidationError(
-                {'email': msg}, code='authentication')
+        # a single lookup, the backend hashes the password of unknown
+        # emails too so both failures take the same time
         user = authenticate(
             request=self.context.get('request'), username=email,
             password=password
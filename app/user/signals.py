@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from user.authentication import invalidate_tokens
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_tokens(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # is_active and the password live on the user row, the login only
+    # touches last_login which the cached user may keep stale
+    if created or update_fields == frozenset(['last_login']):
+        return
+    invalidate_tokens(*Token.objects.filter(
+        user_id=instance.pk).values_list('key', flat=True))
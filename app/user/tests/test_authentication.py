@@ -0,0 +1,76 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework import status
+
+from user.authentication import CachedTokenAuthentication, get_token_cache
+
+USER_URL = reverse('user:user')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """token authentication served from the token cache"""
+
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            email='token@test.com',
+            password='testpass',
+            name='name'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_cached_token_skips_query(self):
+        """the second request does not look the token up"""
+        self.client.get(USER_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(USER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_requests_get_their_own_user(self):
+        """changes to the user of one request do not reach the next"""
+        self.client.get(USER_URL)
+        request = APIRequestFactory().get(
+            USER_URL, HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        user, token = CachedTokenAuthentication().authenticate(request)
+        user.name = 'unsaved'
+
+        res = self.client.get(USER_URL)
+
+        self.assertIs(token.user, user)
+        self.assertEqual(res.data['name'], 'name')
+
+    def test_deleted_token_is_rejected(self):
+        """deleting the token drops it from the cache"""
+        self.client.get(USER_URL)
+        self.token.delete()
+
+        res = self.client.get(USER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_is_rejected(self):
+        """saving the user drops its tokens from the cache"""
+        self.client.get(USER_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(USER_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_invalidates(self):
+        """changing the password drops the cached token"""
+        self.client.get(USER_URL)
+
+        self.client.patch(USER_URL, {'password': 'newpassword'})
+
+        self.assertIsNone(get_token_cache().get(f'token:{self.token.key}'))
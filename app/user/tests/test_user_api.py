@@ -1,4 +1,4 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
@@ -101,6 +101,23 @@ class PublicUserApiTest(TestCase):
         self.assertNotIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_login_rehashes_with_configured_iterations(self):
+        """a stored hash with other work factors is upgraded on login"""
+        payload = {
+            'email': 'someuser@test.com',
+            'password': 'testpass',
+        }
+        with override_settings(PASSWORD_HASHER_ITERATIONS=1000):
+            user = create_user(**payload)
+        self.assertIn('$1000$', user.password)
+
+        with override_settings(PASSWORD_HASHER_ITERATIONS=2000):
+            res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertIn('$2000$', user.password)
+
     def test_unauthorised_access(self):
         """make unauthorised request"""
         res = self.client.get(USER_URL, {})
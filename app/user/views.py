@@ -1,6 +1,7 @@
 from rest_framework.authtoken.views import ObtainAuthToken
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.settings import api_settings
+from user.authentication import CachedTokenAuthentication
 from user.serialisers import UserSerializer, AuthtokenSerializer
 # Create your views here.
 
@@ -19,7 +20,7 @@ class createTokenView(ObtainAuthToken):
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """manage user view"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):